@@ -0,0 +1 @@
+"""Offline benchmarks for gimer over synthetic local remotes."""
@@ -0,0 +1,315 @@
+"""Run the gimer benchmarks against synthetic local remotes.
+
+Usage:
+    python -m benchmarks.run [--size medium] [--repeat 3] [--save-baseline]
+
+Every case runs over file:// remotes generated by benchmarks.synthetic, so no
+network access is needed. The median of each case is compared against
+benchmarks/baseline.json and the run fails if a case got slower than the
+tolerance allows.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+import gimer.cli
+import gimer.git
+from benchmarks.synthetic import SIZES, create_remote
+from gimer.branch_index import BranchIndex
+from gimer.git import Git, GitError
+from gimer.repositories import get_github_repo_path
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+console = Console()
+Case = Callable[["Workspace"], Callable[[], object]]
+
+
+@contextmanager
+def _chdir(path: Path) -> Iterator[None]:
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextmanager
+def _silenced() -> Iterator[None]:
+    """Send the output of git subprocesses to /dev/null."""
+    sys.stdout.flush()
+    saved = os.dup(1), os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        yield
+    finally:
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (*saved, devnull):
+            os.close(fd)
+
+
+def _git(cwd: Path, *args: str) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+class Workspace:
+    """Temporary directory with a synthetic remote and a warm clone of it."""
+
+    def __init__(self, root: Path, remote: Path) -> None:
+        self.root = root
+        self.remote = remote
+        self.url = remote.as_uri()
+        self.clone = root / "clone"
+        self._counter = 0
+        _git(root, "clone", "--quiet", self.url, str(self.clone))
+
+    def fresh_path(self, name: str) -> Path:
+        self._counter += 1
+        path = self.root / f"{name}-{self._counter}"
+        path.mkdir(parents=True)
+        return path
+
+    def remote_copy(self) -> str:
+        """Cheap writable copy of the remote for cases that push."""
+        # A distinct parent directory gives every copy its own gimer cache entry
+        path = self.fresh_path("remote") / "repo.git"
+        _git(self.root, "clone", "--quiet", "--bare", "--local", str(self.remote), str(path))
+        return path.as_uri()
+
+    def reset_clone(self) -> None:
+        _git(self.clone, "merge", "--abort") if (self.clone / ".git" / "MERGE_HEAD").exists() else None
+        _git(self.clone, "checkout", "--quiet", "--force", "main")
+        _git(self.clone, "reset", "--quiet", "--hard", "origin/main")
+
+
+def _git_in(path: Path) -> Git:
+    return Git(no_confirm=True, cwd=path)
+
+
+def case_clone(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.fresh_path("clones"))
+    return lambda: git.clone_repository(ws.url)
+
+
+def case_fetch(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    return git.fetch
+
+
+def case_branch_listing(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    return git.get_branches
+
+
+def case_branch_index_refresh(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    return lambda: BranchIndex(ws.root / "branches.json").refresh(git.queries)
+
+
+def case_status(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    return git.check_working_directory_clean
+
+
+def case_status_fast_state(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    git.configure_fast_state()
+    # The first status after the config change writes the untracked cache
+    git.check_working_directory_clean()
+    return git.check_working_directory_clean
+
+
+def case_reset_dirty(ws: Workspace) -> Callable[[], object]:
+    ws.reset_clone()
+    for path in _git(ws.clone, "ls-files").splitlines()[:5]:
+        with (ws.clone / path).open("a") as f:
+            f.write("dirty\n")
+    (ws.clone / "untracked.txt").write_text("dirty\n")
+    git = _git_in(ws.clone)
+    return git.clean_working_directory
+
+
+def case_checkout(ws: Workspace) -> Callable[[], object]:
+    ws.reset_clone()
+    git = _git_in(ws.clone)
+    return lambda: git.checkout_branch("feature-0")
+
+
+def case_merge(ws: Workspace) -> Callable[[], object]:
+    ws.reset_clone()
+    git = _git_in(ws.clone)
+    return lambda: git.merge_branch("origin/feature-0")
+
+
+def case_merge_conflict(ws: Workspace) -> Callable[[], object]:
+    ws.reset_clone()
+    git = _git_in(ws.clone)
+
+    def merge_conflict() -> None:
+        try:
+            git.merge_branch("origin/conflict")
+        except GitError:
+            pass
+    return merge_conflict
+
+
+def case_merge_tree(ws: Workspace) -> Callable[[], object]:
+    git = _git_in(ws.clone)
+    return lambda: git.merge_tree("origin/main", "origin/feature-0")
+
+
+def case_push(ws: Workspace) -> Callable[[], object]:
+    ws.reset_clone()
+    url = ws.remote_copy()
+    _git(ws.clone, "remote", "set-url", "--push", "origin", url)
+    _git(ws.clone, "merge", "--quiet", "--no-edit", "origin/feature-0")
+    git = _git_in(ws.clone)
+    return lambda: git.push_branch("main")
+
+
+def _cli_merge_config() -> dict:
+    return {"dry_run": False, "no_confirm": True, "confirm_all": False}
+
+
+def case_cli_merge_cold(ws: Workspace) -> Callable[[], object]:
+    url = ws.remote_copy()
+    repo_path = get_github_repo_path(url)
+    return lambda: gimer.cli.merge(repo_path, url, "main", "feature-0", _cli_merge_config())
+
+
+def case_cli_merge_warm(ws: Workspace) -> Callable[[], object]:
+    url = ws.remote_copy()
+    repo_path = get_github_repo_path(url)
+    gimer.cli.merge(repo_path, url, "main", "feature-0", _cli_merge_config())
+    return lambda: gimer.cli.merge(repo_path, url, "main", "feature-1", _cli_merge_config())
+
+
+def case_startup(ws: Workspace) -> Callable[[], object]:
+    return lambda: subprocess.run([sys.executable, "-m", "gimer.cli", "--help"], check=True, capture_output=True)
+
+
+CASES: dict[str, Case] = {
+    "clone": case_clone,
+    "fetch (up to date)": case_fetch,
+    "branch listing": case_branch_listing,
+    "branch index refresh": case_branch_index_refresh,
+    "status": case_status,
+    "status (fast state)": case_status_fast_state,
+    "reset (dirty tree)": case_reset_dirty,
+    "checkout": case_checkout,
+    "merge": case_merge,
+    "merge (conflict)": case_merge_conflict,
+    "merge-tree": case_merge_tree,
+    "push": case_push,
+    "cli merge (cold cache)": case_cli_merge_cold,
+    "cli merge (warm cache)": case_cli_merge_warm,
+    "startup": case_startup,
+}
+
+
+def run_cases(ws: Workspace, repeat: int, selected: list[str]) -> dict[str, float]:
+    results = {}
+    for name in selected:
+        timings = []
+        for _ in range(repeat):
+            with _chdir(ws.root), _silenced():
+                action = CASES[name](ws)
+                start = time.perf_counter()
+                action()
+                timings.append(time.perf_counter() - start)
+        results[name] = statistics.median(timings)
+    return results
+
+
+def _print_results(
+    results: dict[str, float], baseline: dict[str, float], tolerance: float, min_delta: float
+) -> list[str]:
+    table = Table(title="Benchmarks")
+    table.add_column("Case")
+    table.add_column("Median", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Ratio", justify="right")
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base:
+            ratio = seconds / base
+            # Cases of a few milliseconds are dominated by process-spawn noise
+            regressed = ratio > tolerance and seconds - base > min_delta
+            style = "red" if regressed else None
+            if regressed:
+                regressions.append(name)
+            table.add_row(name, f"{seconds * 1000:.1f}ms", f"{base * 1000:.1f}ms", f"{ratio:.2f}x", style=style)
+        else:
+            table.add_row(name, f"{seconds * 1000:.1f}ms", "-", "-")
+    console.print(table)
+    return regressions
+
+
+@click.command()
+@click.option('--size', type=click.Choice(list(SIZES)), default='medium', show_default=True, help='Size of the synthetic repository')
+@click.option('--repeat', type=int, default=3, show_default=True, help='Runs per case; the median is reported')
+@click.option('--case', 'cases', multiple=True, type=click.Choice(list(CASES)), help='Run only these cases')
+@click.option('--baseline', type=click.Path(dir_okay=False, path_type=Path), default=BASELINE_PATH, show_default=True)
+@click.option('--tolerance', type=float, default=1.5, show_default=True, help='Slowdown against the baseline that counts as a regression')
+@click.option('--min-delta', type=float, default=10.0, show_default=True, help='Slowdown in milliseconds below which a case never counts as a regression')
+@click.option('--save-baseline', is_flag=True, help='Store the results as the new baseline')
+@click.option('--no-compare', is_flag=True, help='Only print the results')
+def main(  # noqa: PLR0913
+    size: str,
+    repeat: int,
+    cases: tuple[str, ...],
+    baseline: Path,
+    tolerance: float,
+    min_delta: float,
+    save_baseline: bool,
+    no_compare: bool,
+) -> None:
+    # Keep gimer's command echo and the user's real cache out of the measurements
+    quiet = Console(quiet=True)
+    gimer.git.console = quiet
+    gimer.cli.console = quiet
+    with tempfile.TemporaryDirectory(prefix="gimer-bench-") as tmp:
+        root = Path(tmp)
+        for variable in ("HOME", "LOCALAPPDATA", "TMPDIR"):
+            os.environ[variable] = str(root / "home")
+        # The global git config, and any identity in it, stays behind with the real HOME
+        for role in ("AUTHOR", "COMMITTER"):
+            os.environ[f"GIT_{role}_NAME"] = "gimer benchmark"
+            os.environ[f"GIT_{role}_EMAIL"] = "benchmark@gimer.invalid"
+        console.print(f"Generating {size} repository...")
+        remote = create_remote(root / "remote.git", SIZES[size])
+        ws = Workspace(root, remote)
+        results = run_cases(ws, repeat, list(cases or CASES))
+
+    stored = json.loads(baseline.read_text()) if baseline.exists() else {}
+    reference = {} if no_compare else stored.get(size, {})
+    regressions = _print_results(results, reference, tolerance, min_delta / 1000)
+    if save_baseline:
+        stored[size] = results
+        baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        console.print(f"Saved baseline to {baseline}")
+    elif regressions:
+        console.print(f"[red]Slower than baseline: {', '.join(regressions)}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Generate synthetic bare repositories to benchmark against."""
+
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+BASE_TIMESTAMP = 1_700_000_000
+
+
+@dataclass
+class RepoSize:
+    commits: int
+    files: int
+    branches: int
+    conflicts: int
+
+
+SIZES = {
+    "small": RepoSize(commits=50, files=20, branches=10, conflicts=2),
+    "medium": RepoSize(commits=2_000, files=500, branches=200, conflicts=5),
+    "large": RepoSize(commits=20_000, files=5_000, branches=5_000, conflicts=20),
+}
+
+
+class _FastImportStream:
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.mark = 0
+
+    def data(self, text: str) -> None:
+        payload = text.encode()
+        self.chunks.append(b"data %d\n" % len(payload) + payload + b"\n")
+
+    def commit(self, branch: str, message: str, files: dict[str, str], parent: int | None) -> int:
+        self.mark += 1
+        self.chunks.append(f"commit refs/heads/{branch}\nmark :{self.mark}\n".encode())
+        self.chunks.append(f"committer Bench <bench@example.com> {BASE_TIMESTAMP + self.mark} +0000\n".encode())
+        self.data(message)
+        if parent is not None:
+            self.chunks.append(f"from :{parent}\n".encode())
+        for path, content in files.items():
+            self.chunks.append(f"M 100644 inline {path}\n".encode())
+            self.data(content)
+        return self.mark
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self.chunks) + b"done\n"
+
+
+def _file_content(index: int, revision: int) -> str:
+    return "".join(f"file {index} line {line}\n" for line in range(20)) + f"revision {revision}\n"
+
+
+def create_remote(path: Path, size: RepoSize) -> Path:
+    """Create a bare repository with a main branch, clean feature branches and a conflicting branch.
+
+    - `main` has `size.commits` commits rewriting `size.files` files in turn.
+    - `feature-<n>` branches fork from the middle of main and add one file each,
+      so they merge cleanly.
+    - `conflict` forks from the same commit and rewrites the first
+      `size.conflicts` files, which main rewrites again at its tip.
+
+    Returns:
+        Path: Path of the bare repository
+    """
+    subprocess.run(["git", "init", "--quiet", "--bare", "-b", "main", str(path)], check=True)
+    stream = _FastImportStream()
+    initial = {f"src/file{i}.txt": _file_content(i, 0) for i in range(size.files)}
+    tip = stream.commit("main", "initial", initial, None)
+    base = tip
+    for revision in range(1, size.commits):
+        index = revision % size.files
+        tip = stream.commit("main", f"change {revision}", {f"src/file{index}.txt": _file_content(index, revision)}, tip)
+        if revision == size.commits // 2:
+            base = tip
+    stream.commit(
+        "main",
+        "touch conflicting files",
+        {f"src/file{i}.txt": _file_content(i, -1) for i in range(size.conflicts)},
+        tip,
+    )
+    for branch in range(size.branches):
+        stream.commit(f"feature-{branch}", f"feature {branch}", {f"features/{branch}.txt": f"{branch}\n"}, base)
+    stream.commit(
+        "conflict",
+        "conflicting change",
+        {f"src/file{i}.txt": _file_content(i, -2) for i in range(size.conflicts)},
+        base,
+    )
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=path, input=stream.to_bytes(), check=True)
+    return path
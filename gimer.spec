@@ -1,13 +1,30 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+from PyInstaller.utils.hooks import collect_submodules
 
 block_cipher = None
 
+# GIMER_ONEDIR=1 builds an unpacked dist/gimer/ directory instead of a single
+# file. The single-file binary extracts itself to a temporary directory on every
+# launch; the directory build starts immediately.
+onedir = os.environ.get("GIMER_ONEDIR") == "1"
+
 a = Analysis(
     ['gimer/cli.py'],
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # Imported lazily through gimer.lazy, so PyInstaller cannot see them
+    hiddenimports=[
+        *collect_submodules('gimer'),
+        'InquirerPy.inquirer',
+        'prompt_toolkit.completion',
+        'rich.console',
+        'rich.progress',
+        'rich.prompt',
+        'rich.table',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -23,15 +40,14 @@ pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
+    *([] if onedir else [a.binaries, a.zipfiles, a.datas]),
     [],
+    exclude_binaries=onedir,
     name='gimer',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=not onedir,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -40,4 +56,15 @@ exe = EXE(
     target_arch=None,
     codesign_identity=None,
     entitlements_file=None,
-) 
\ No newline at end of file
+)
+
+if onedir:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='gimer',
+    )
@@ -0,0 +1,20 @@
+"""Prompt completion backed by BranchSearch."""
+
+from collections.abc import Iterable
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+from gimer.branch_search import BranchSearch
+
+
+class BranchCompleter(Completer):
+    """Show the best matching branches as the user types."""
+
+    def __init__(self, search: BranchSearch) -> None:
+        self.search = search
+
+    def get_completions(self, document: Document, complete_event: CompleteEvent) -> Iterable[Completion]:
+        text = document.text_before_cursor
+        for branch in self.search.search(text):
+            yield Completion(branch, start_position=-len(text))
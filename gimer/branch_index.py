@@ -0,0 +1,87 @@
+"""On-disk index of the remote branches of a cached repository."""
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from gimer.queries import RepositoryQueries
+
+INDEX_VERSION = 1
+
+
+class BranchSort:
+    NAME = "name"
+    RECENT = "recent"
+
+
+@dataclass
+class BranchEntry:
+    name: str
+    commit: str
+    committed_at: int
+
+
+class BranchIndex:
+    """Branch names, tip commits and commit dates, kept between runs.
+
+    The picker can be filled from the index immediately while the fetch runs,
+    and a refresh only reads commit dates for branches whose tip moved.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, BranchEntry] = {}
+
+    @classmethod
+    def for_repository(cls, repo_path: Path) -> "BranchIndex":
+        return cls(repo_path / ".git" / "gimer" / "branches.json")
+
+    def load(self) -> "BranchIndex":
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return self
+        if data.get("version") != INDEX_VERSION:
+            return self
+        self.entries = {
+            name: BranchEntry(name, commit, committed_at)
+            for name, (commit, committed_at) in data["branches"].items()
+        }
+        return self
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "branches": {e.name: [e.commit, e.committed_at] for e in self.entries.values()},
+        }
+        # Runs that pick branches at the same time each write their own file
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data))
+        tmp_path.replace(self.path)
+
+    def refresh(self, queries: RepositoryQueries) -> list[str]:
+        """Sync the index with the remote-tracking refs.
+
+        Returns:
+            list[str]: Names of branches that are new or moved
+        """
+        tips = queries.remote_branch_tips()
+        unchanged = {
+            name: entry for name, entry in self.entries.items()
+            if tips.get(name) == entry.commit
+        }
+        changed = [name for name in tips if name not in unchanged]
+        dates = queries.commit_dates([tips[name] for name in changed])
+        self.entries = {
+            name: unchanged.get(name) or BranchEntry(name, commit, dates[commit])
+            for name, commit in tips.items()
+        }
+        return changed
+
+    def names(self, sort: str = BranchSort.NAME) -> list[str]:
+        if sort == BranchSort.RECENT:
+            entries = sorted(self.entries.values(), key=lambda e: (-e.committed_at, e.name))
+            return [e.name for e in entries]
+        return sorted(self.entries)
@@ -0,0 +1,96 @@
+"""Ranked branch search for very large sets of branches."""
+
+import heapq
+import threading
+from collections import defaultdict
+from collections.abc import Sequence
+
+NGRAM_SIZE = 3
+DEFAULT_LIMIT = 50
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class BranchSearch:
+    """Substring search over branch names backed by a trigram index.
+
+    The index is built once and shared by the source and target pickers.
+    Matches are ranked exact > prefix > prefix of a path segment (after `/`,
+    `-` or `_`) > any substring, keeping the order of the given branch list
+    (e.g. most recent first) within a rank. A query that extends the previous
+    one only filters the previous matches. Searches may run on completer
+    threads at the same time.
+    """
+
+    def __init__(self, branches: list[str], limit: int = DEFAULT_LIMIT) -> None:
+        self.branches = branches
+        self.limit = limit
+        self._names = [b.lower() for b in branches]
+        self._ngram_index: dict[str, list[int]] = defaultdict(list)
+        for i, name in enumerate(self._names):
+            for ngram in _ngrams(name):
+                self._ngram_index[ngram].append(i)
+        self._members = set(branches)
+        # The last query and its matches are read and replaced together
+        self._lock = threading.Lock()
+        self._last_query = ""
+        self._last_matches: list[int] = list(range(len(branches)))
+
+    def __len__(self) -> int:
+        return len(self.branches)
+
+    def __contains__(self, branch: object) -> bool:
+        return branch in self._members
+
+    def _candidates(self, term: str) -> list[int] | None:
+        """Indexes of names containing every trigram of a term, or None if the term is too short."""
+        postings = [self._ngram_index.get(ngram, []) for ngram in _ngrams(term)]
+        if not postings:
+            return None
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+        return sorted(candidates)
+
+    def _match(self, query: str) -> list[int]:
+        terms = query.split()
+        with self._lock:
+            last_query, last_matches = self._last_query, self._last_matches
+        candidates: Sequence[int]
+        if query.startswith(last_query) and last_query:
+            candidates = last_matches
+        else:
+            candidates = min(
+                (c for c in map(self._candidates, terms) if c is not None),
+                key=len,
+                default=range(len(self._names)),
+            )
+        matches = [i for i in candidates if all(term in self._names[i] for term in terms)]
+        with self._lock:
+            self._last_query, self._last_matches = query, matches
+        return matches
+
+    def _rank(self, index: int, term: str) -> int:
+        name = self._names[index]
+        if name == term:
+            return 0
+        if name.startswith(term):
+            return 1
+        position = name.find(term)
+        if name[position - 1] in "/-_":
+            return 2
+        return 3
+
+    def search(self, query: str, limit: int | None = None) -> list[str]:
+        """Return the best matching branches, at most `limit` of them."""
+        limit = limit or self.limit
+        query = query.strip().lower()
+        if not query:
+            return self.branches[:limit]
+        matches = self._match(query)
+        term = query.split()[0]
+        best = heapq.nsmallest(limit, matches, key=lambda i: (self._rank(i, term), i))
+        return [self.branches[i] for i in best]
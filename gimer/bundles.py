@@ -0,0 +1,177 @@
+"""Pre-warmed repository caches: cached repositories exported as git bundles.
+
+A bundle holds the objects, branches and tags of a cached repository in one
+file. Seeding a cache from bundles replaces a full clone with a local import
+and an incremental fetch, so a fleet of fresh CI runners does not download
+every repository from the Git host.
+
+An export is a directory, or a tar archive of one, with a bundle per
+repository at <namespace>.bundle and an index.json recording the URL and
+default branch of each.
+"""
+
+import json
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Literal
+
+from gimer.git import Git, GitError
+from gimer.locking import RepositoryLock
+from gimer.repositories import get_repo_namespace, get_repos_path
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+# Repositories are cached as <host>/<owner>/<name>
+NAMESPACE_PATTERN = re.compile(r"^[\w.-]+/[\w.-]+/[\w.-]+$")
+
+
+class BundleError(Exception):
+    """Exception raised when an export cannot be read."""
+
+
+class SeedOutcome:
+    SEEDED = "seeded"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+@dataclass
+class SeedResult:
+    namespace: str
+    outcome: str
+    seconds: float = 0.0
+    error: str = ""
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_safe_namespace(namespace: str) -> bool:
+    return bool(NAMESPACE_PATTERN.match(namespace)) and not any(part in {".", ".."} for part in namespace.split("/"))
+
+
+def export_repository(repo_path: Path, export_path: Path) -> dict[str, str | None]:
+    """Bundle one cached repository into an export directory. Returns its index entry."""
+    namespace = get_repo_namespace(repo_path)
+    bundle_path = export_path / f"{namespace}.bundle"
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    git = Git(no_confirm=True, cwd=repo_path)
+    # A merge running in the repository may move its branches, but not while the lock is shared
+    with RepositoryLock(repo_path).shared():
+        git.create_bundle(bundle_path)
+        return {
+            "namespace": namespace,
+            "url": git.remote_url(),
+            "head": git.default_branch(),
+            "bundle": f"{namespace}.bundle",
+        }
+
+
+def export_cache(repo_paths: list[Path], destination: Path) -> list[dict[str, str | None]]:
+    """Export cached repositories to a directory, or to a tar archive when `destination` ends in .tar or .tar.gz.
+
+    Returns:
+        list[dict]: The index entries of the exported repositories
+
+    Raises:
+        GitError: If a repository cannot be bundled
+    """
+    with tempfile.TemporaryDirectory(prefix="gimer-export-") as tmp_dir:
+        export_path = Path(tmp_dir) if is_archive(destination) else destination
+        export_path.mkdir(parents=True, exist_ok=True)
+        entries = [export_repository(repo_path, export_path) for repo_path in repo_paths]
+        (export_path / INDEX_NAME).write_text(json.dumps({"version": INDEX_VERSION, "repositories": entries}, indent=2))
+        if is_archive(destination):
+            # Bundles are compressed already; .tar.gz only saves on the index
+            mode: Literal["w", "w:gz"] = "w" if destination.name.endswith(".tar") else "w:gz"
+            with tarfile.open(destination, mode) as archive:
+                for path in sorted(export_path.rglob("*")):
+                    if path.is_file():
+                        archive.add(path, arcname=path.relative_to(export_path).as_posix(), recursive=False)
+    return entries
+
+
+def _extract(archive_path: Path, destination: Path) -> None:
+    """Extract the index and bundles of an export archive, and nothing else."""
+    with tarfile.open(archive_path, "r:*") as archive:
+        for member in archive:
+            name = PurePosixPath(member.name)
+            if not member.isfile() or name.is_absolute() or ".." in name.parts:
+                continue
+            if member.name != INDEX_NAME and not member.name.endswith(".bundle"):
+                continue
+            source = archive.extractfile(member)
+            assert source is not None
+            target = destination.joinpath(*name.parts)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with target.open("wb") as f:
+                shutil.copyfileobj(source, f)
+
+
+@contextmanager
+def open_export(source: Path) -> Iterator[tuple[Path, list[dict]]]:
+    """Yield the directory of an export and its index entries, extracting archives to a temporary directory.
+
+    Raises:
+        BundleError: If the source is not an export
+    """
+    with tempfile.TemporaryDirectory(prefix="gimer-seed-") as tmp_dir:
+        export_path = source
+        if source.is_file():
+            try:
+                _extract(source, Path(tmp_dir))
+            except tarfile.TarError as e:
+                raise BundleError(f"{source} is not an export archive: {e}") from e
+            export_path = Path(tmp_dir)
+        try:
+            index = json.loads((export_path / INDEX_NAME).read_text())
+        except (OSError, ValueError) as e:
+            raise BundleError(f"{source} has no readable {INDEX_NAME}") from e
+        if index.get("version") != INDEX_VERSION:
+            raise BundleError(f"{source} was exported by an unsupported version of gimer")
+        yield export_path, index["repositories"]
+
+
+def seed_repository(export_path: Path, entry: dict, fetch: bool = True) -> SeedResult:
+    """Create a cached repository from its bundle, then fetch what changed since the export.
+
+    Repositories already in the cache are left alone. A failed catch-up
+    fetch keeps the seeded repository; the next merge fetches anyway.
+    """
+    namespace = entry.get("namespace") or ""
+    bundle_path = export_path / (entry.get("bundle") or "")
+    if not _is_safe_namespace(namespace) or not entry.get("url") or not bundle_path.is_file():
+        return SeedResult(namespace, SeedOutcome.FAILED, error="Invalid index entry")
+    repo_path = get_repos_path() / namespace
+    if (repo_path / ".git").exists():
+        return SeedResult(namespace, SeedOutcome.SKIPPED, error="Already cached")
+
+    start = time.perf_counter()
+    repo_path.mkdir(parents=True, exist_ok=True)
+    git = Git(no_confirm=True, cwd=repo_path)
+    with RepositoryLock(repo_path).exclusive():
+        # Another run may have cloned it while we waited for the lock
+        if (repo_path / ".git").exists():
+            return SeedResult(namespace, SeedOutcome.SKIPPED, error="Already cached")
+        try:
+            git.import_bundle(bundle_path, entry["url"], entry.get("head"))
+        except GitError as e:
+            # Leave no half-made repository behind, so the next merge clones it
+            shutil.rmtree(repo_path, ignore_errors=True)
+            return SeedResult(namespace, SeedOutcome.FAILED, time.perf_counter() - start, str(e).splitlines()[0])
+        error = ""
+        if fetch:
+            try:
+                git.fetch()
+            except GitError as e:
+                error = f"Not updated: {str(e).splitlines()[0]}"
+    return SeedResult(namespace, SeedOutcome.SEEDED, time.perf_counter() - start, error)
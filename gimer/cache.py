@@ -0,0 +1,169 @@
+"""Size-bounded repository cache with least-recently-used eviction."""
+
+import json
+import os
+import re
+import shutil
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from gimer.locking import LockTimeoutError, RepositoryLock
+from gimer.repositories import get_repo_namespace, get_repos_path
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+SIZE_PATTERN = re.compile(r"^\s*(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>[KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+
+@dataclass
+class CacheEntry:
+    path: Path
+    namespace: str
+    size: int
+    last_used: float
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as `500M`, `20G` or `1.5GiB` into bytes."""
+    match = SIZE_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match["number"]) * SIZE_UNITS[match["unit"].upper()])
+
+
+def format_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:  # noqa: PLR2004
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TiB"
+
+
+def _usage_path(repo_path: Path) -> Path:
+    return repo_path / ".git" / "gimer" / "usage.json"
+
+
+def disk_usage(path: Path) -> int:
+    """Return the bytes used by a directory tree, counting hardlinked files once."""
+    total = 0
+    seen: set[tuple[int, int]] = set()
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_nlink > 1:
+                        if (stat.st_dev, stat.st_ino) in seen:
+                            continue
+                        seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        except OSError:
+            continue
+    return total
+
+
+def repository_size(repo_path: Path) -> int:
+    """Return the bytes used by the git data of a cached repository.
+
+    Checked-out files are left out: they are rebuilt from the git data, and
+    walking them after every merge takes as long as the merge in large trees.
+    """
+    git_dir = repo_path / ".git"
+    return disk_usage(git_dir if git_dir.is_dir() else repo_path)
+
+
+def record_use(repo_path: Path, measure: bool = False) -> None:
+    """Remember that a cached repository was just used, and optionally its size."""
+    if not (repo_path / ".git").is_dir():
+        return
+    usage = {"last_used": time.time(), "size": _read_usage(repo_path).get("size")}
+    if measure:
+        usage["size"] = repository_size(repo_path)
+    path = _usage_path(repo_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(usage))
+    tmp_path.replace(path)
+
+
+def _read_usage(repo_path: Path) -> dict[str, Any]:
+    try:
+        usage = json.loads(_usage_path(repo_path).read_text())
+    except (OSError, ValueError):
+        return {}
+    return usage if isinstance(usage, dict) else {}
+
+
+def _repository_paths() -> Iterator[Path]:
+    # Repositories are cached as <host>/<owner>/<name>
+    for path in get_repos_path().glob("*/*/*"):
+        if path.is_dir():
+            yield path
+
+
+def list_entries(measure: bool = True) -> list[CacheEntry]:
+    """List the cached repositories, least recently used first.
+
+    Without `measure`, sizes recorded by earlier runs are used where they
+    exist, which avoids walking every repository.
+    """
+    entries = []
+    for path in _repository_paths():
+        usage = _read_usage(path)
+        size = usage.get("size")
+        if measure or size is None:
+            size = repository_size(path)
+        last_used = usage.get("last_used")
+        if last_used is None:
+            try:
+                last_used = path.stat().st_mtime
+            except OSError:
+                continue
+        entries.append(CacheEntry(path, get_repo_namespace(path), size, last_used))
+    return sorted(entries, key=lambda e: e.last_used)
+
+
+def evict(entry: CacheEntry) -> bool:
+    """Remove a cached repository unless another gimer run is using it."""
+    try:
+        with RepositoryLock(entry.path, timeout=0).exclusive():
+            shutil.rmtree(entry.path)
+    except LockTimeoutError:
+        return False
+    return True
+
+
+def enforce_budget(
+    budget: int,
+    keep: set[Path] | None = None,
+    older_than: float | None = None,
+    measure: bool = False,
+) -> list[CacheEntry]:
+    """Evict least recently used repositories until the cache fits in `budget` bytes.
+
+    Repositories in `keep` and repositories in use are never evicted.
+    Repositories unused for `older_than` seconds are evicted whatever the size.
+
+    Returns:
+        list[CacheEntry]: The evicted repositories
+    """
+    keep = keep or set()
+    entries = list_entries(measure=measure)
+    total = sum(e.size for e in entries)
+    cutoff = None if older_than is None else time.time() - older_than
+    evicted = []
+    for entry in entries:
+        expired = cutoff is not None and entry.last_used < cutoff
+        if (total <= budget and not expired) or entry.path in keep:
+            continue
+        if evict(entry):
+            total -= entry.size
+            evicted.append(entry)
+    return evicted
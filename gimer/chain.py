@@ -0,0 +1,43 @@
+"""Progress of a merge chain, kept so an interrupted chain can be resumed."""
+
+import json
+from pathlib import Path
+
+
+class ChainState:
+    """The chain being merged and how many of its merges are done.
+
+    Finished merges only exist in local branches until the final push, so a
+    rerun of the same chain continues from the merge that stopped it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.chain: list[str] = []
+        self.completed = 0
+
+    @classmethod
+    def for_repository(cls, repo_path: Path) -> "ChainState":
+        return cls(repo_path / ".git" / "gimer" / "chain.json")
+
+    def load(self) -> "ChainState":
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return self
+        self.chain = data["chain"]
+        self.completed = data["completed"]
+        return self
+
+    def resume_point(self, chain: list[str]) -> int:
+        """Return the index of the first merge of the chain still to do."""
+        return self.completed if self.chain == chain else 0
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"chain": self.chain, "completed": self.completed}))
+        tmp_path.replace(self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -1,105 +1,1056 @@
 #!/usr/bin/env python3
 import os
 import shutil
+import sys
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager, ExitStack, nullcontext
+from datetime import datetime
 from pathlib import Path
+from typing import Any, cast
 
 import click
-from github import Github
-from InquirerPy import inquirer
-from rich.console import Console
-from rich.prompt import Confirm
 
-from gimer.git import Git, UserAbortedError
+from gimer.branch_index import BranchIndex, BranchSort
+from gimer.branch_search import BranchSearch
+from gimer.chain import ChainState
+from gimer.git import CLONE_STRATEGIES, Git, GitError, UserAbortedError
 from gimer.i18n import _
-from gimer.repositories import get_github_repo_path
+from gimer.lazy import LazyObject, lazy_import
+from gimer.locking import LockTimeoutError, RepositoryLock
+from gimer.profiling import Phase, Profiler
+from gimer.repositories import (
+    get_github_repo_path,
+    get_reference_store_path,
+    get_repo_namespace,
+    get_repos_path,
+    get_rerere_path,
+    get_workspaces_path,
+)
 
-console = Console()
-token = os.environ.get("GITHUB_TOKEN")
-gh = Github(token) if token else Github()
+# Interactive libraries are imported on first use so `gimer --help` and
+# non-interactive runs do not pay for them.
+console = LazyObject(lazy_import("rich.console", "Console"))
+inquirer = lazy_import("InquirerPy.inquirer")
+Confirm = lazy_import("rich.prompt", "Confirm")
+BranchCompleter = lazy_import("gimer.branch_completer", "BranchCompleter")
+ThreadedCompleter = lazy_import("prompt_toolkit.completion", "ThreadedCompleter")
+fleet = lazy_import("gimer.fleet")
+cache = lazy_import("gimer.cache")
+maintenance = lazy_import("gimer.maintenance")
+github_api = lazy_import("gimer.github_api")
+connections = lazy_import("gimer.connections")
+daemon = lazy_import("gimer.daemon")
+rerere = lazy_import("gimer.rerere")
+bundles = lazy_import("gimer.bundles")
 
-@click.command()
-@click.argument('repo_url')
-@click.option('--source', help='Source branch to merge from')
+# Above this many branches the fuzzy picker gets sluggish and the indexed
+# search is used instead
+FUZZY_CHOICES_LIMIT = 2000
+
+
+class MergeOutcome:
+    MERGED = "merged"
+    CONFLICT = "conflict"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+
+class DefaultCommandGroup(click.Group):
+    """A group that runs its default command when the arguments name no subcommand.
+
+    Keeps `gimer <repo_url> ...` working next to `gimer cache ...`. A bare
+    `gimer --help` shows the help of the group, listing every command.
+    """
+
+    def __init__(self, *args: Any, default_command: str, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args == ["--help"]:
+            return super().parse_args(ctx, args)
+        if not args or args[0] not in self.commands:
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+class ByteSize(click.ParamType):
+    name = "size"
+
+    def convert(self, value: str | int, param: click.Parameter | None, ctx: click.Context | None) -> int:
+        if isinstance(value, int):
+            return value
+        try:
+            return cast(int, cache.parse_size(value))
+        except ValueError:
+            self.fail(_("{0} is not a size such as 500M or 20G").format(value), param, ctx)
+
+
+@click.group(cls=DefaultCommandGroup, default_command="merge")
+def main() -> None:
+    """Merge git branches with ease.
+
+    Without a command, the arguments go to `gimer merge`; run
+    `gimer merge --help` for its options.
+    """
+
+
+@main.command("merge", epilog="Run `gimer --help` to list the other commands, such as cache, serve and rerere.")
+@click.argument('repo_urls', nargs=-1)
+@click.option(
+    '--manifest',
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help='File with one repository URL per line to merge in addition to the arguments',
+)
+@click.option(
+    '-j',
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help='Repositories merged at the same time when several are given',
+)
+@click.option('--source', multiple=True, help='Source branch to merge from; repeat to merge several into the target')
 @click.option('--target', help='Target branch to merge into')
 @click.option('--dry-run', is_flag=True, help='Show what would be done without actually doing it')
 @click.option('--cleanup', is_flag=True, help='Remove local repository after completion')
+@click.option(
+    '--clone-strategy',
+    type=click.Choice(list(CLONE_STRATEGIES)),
+    default='full',
+    show_default=True,
+    help='How to clone the repository when it is not cached yet',
+)
+@click.option('--shared-objects', is_flag=True, help='Share git objects between cached repositories (e.g. forks)')
+@click.option(
+    '--chain',
+    help='Comma-separated branches to merge one into the next, e.g. release/1.0,release/1.1,main',
+)
+@click.option('--workspace', is_flag=True, help='Merge in a throwaway working copy of the cached repository, so jobs on one repository can run in parallel')
+@click.option(
+    '--api',
+    is_flag=True,
+    help='Merge on GitHub through its API without cloning; a conflict falls back to a local merge. Needs GITHUB_TOKEN',
+)
+@click.option('--in-memory', is_flag=True, help='Merge without checking out branches; falls back to a checkout merge on conflicts')
+@click.option(
+    '--sort',
+    type=click.Choice([BranchSort.NAME, BranchSort.RECENT]),
+    default=BranchSort.NAME,
+    show_default=True,
+    help='Order of branches in the branch picker',
+)
+@click.option('--profile', is_flag=True, help='Print how long each git command and prompt took')
+@click.option(
+    '--trace',
+    type=click.Path(dir_okay=False, path_type=Path),
+    help='Write timings to a file: Chrome trace for .json, JSON lines otherwise',
+)
+@click.option(
+    '--lock-timeout',
+    type=click.FloatRange(min=0),
+    help='Seconds to wait for another gimer run on the same repository  [default: wait until it finishes]',
+)
+@click.option(
+    '--cache-budget',
+    type=ByteSize(),
+    envvar='GIMER_CACHE_BUDGET',
+    help='Evict the least recently used cached repositories beyond this size, e.g. 20G',
+)
+@click.option(
+    '--maintenance-budget',
+    type=click.FloatRange(min=0),
+    default=60,
+    show_default=True,
+    envvar='GIMER_MAINTENANCE_BUDGET',
+    help='Seconds of background maintenance per cached repository not maintained for a day; 0 disables it',
+)
+@click.option(
+    '--no-connection-sharing',
+    is_flag=True,
+    help='Open a new connection for every git command instead of sharing one SSH connection or credential cache per run',
+)
+@click.option('--no-rerere', is_flag=True, help='Do not record conflict resolutions or replay recorded ones')
 @click.option('-y', '--no-confirm', is_flag=True, help="Do not confirm before executing git commands")
 @click.option('--confirm-all', is_flag=True, help="Confirm before executing all git commands")
-def main(  # noqa: PLR0913
-    repo_url: str,
-    source: str | None,
+def merge_command(  # noqa: PLR0913
+    repo_urls: tuple[str, ...],
+    manifest: Path | None,
+    jobs: int,
+    source: tuple[str, ...],
     target: str | None,
     dry_run: bool,
     cleanup: bool,
     no_confirm: bool,
     confirm_all: bool,
+    clone_strategy: str,
+    shared_objects: bool,
+    workspace: bool,
+    in_memory: bool,
+    api: bool,
+    chain: str | None,
+    sort: str,
+    profile: bool,
+    trace: Path | None,
+    lock_timeout: float | None,
+    cache_budget: int | None,
+    maintenance_budget: float,
+    no_connection_sharing: bool,
+    no_rerere: bool,
 ) -> None:
+    """Merge branches of one or more repositories, picking them when --source or --target is missing."""
+    urls, target, source_branch, config = build_merge_request(click.get_current_context().params)
+    if len(urls) > 1:
+        results = fleet.run_fleet(urls, target, source_branch, config, jobs, cleanup)
+        if any(r.outcome in {MergeOutcome.CONFLICT, MergeOutcome.FAILED} for r in results):
+            sys.exit(1)
+        return
+
+    repo_url = urls[0]
     repo_path = get_github_repo_path(repo_url)
     try:
-        config = {"dry_run": dry_run, "no_confirm": no_confirm, "confirm_all": confirm_all}
-        merge(repo_path, repo_url, target, source, config)
+        merge(repo_path, repo_url, target, source_branch, config)
     except UserAbortedError:
         console.print(f"⚡[yellow]{_('Operation cancelled.')}[/yellow]")
+    except LockTimeoutError:
+        console.print(f"⚡[red]{_('The repository is in use by another gimer run.')}[/red]")
+        sys.exit(1)
     finally:
         if cleanup and repo_path:
             cleanup_repository(repo_path)
+    maintain_cache([repo_path], config["cache_budget"], config["maintenance_budget"])
+
+def build_merge_request(params: dict) -> tuple[list[str], str | None, str | None, dict]:
+    """Check the options of the merge command and turn them into a merge config.
+
+    Returns the repository URLs, the target and source branches, and the
+    config passed to `merge`. Raises click.UsageError for invalid combinations.
+    """
+    repo_urls, manifest, source, target = params["repo_urls"], params["manifest"], params["source"], params["target"]
+    chain, in_memory, api, dry_run = params["chain"], params["in_memory"], params["api"], params["dry_run"]
+    urls = list(dict.fromkeys([*repo_urls, *(fleet.read_manifest(manifest) if manifest else [])]))
+    if not urls:
+        raise click.UsageError(_("Pass a repository URL or --manifest."))
+    branches = [b.strip() for b in chain.split(",") if b.strip()] if chain else []
+    sources = list(dict.fromkeys(source))
+    if len(sources) > 1 and (not target or in_memory):
+        raise click.UsageError(_("Several --source branches need --target and cannot be combined with --in-memory."))
+    source_branch = sources[0] if len(sources) == 1 else None
+    if chain:
+        if len(branches) < 2:  # noqa: PLR2004
+            raise click.UsageError(_("--chain needs at least two branches."))
+        if source or target or in_memory:
+            raise click.UsageError(_("--chain cannot be combined with --source, --target or --in-memory."))
+        if params["workspace"]:
+            # The merged hops of a stopped chain live on local branches, which a workspace throws away
+            raise click.UsageError(_("--chain cannot be combined with --workspace."))
+    if api:
+        if chain or len(sources) > 1 or in_memory:
+            raise click.UsageError(_("--api merges one --source at a time and cannot be combined with --chain or --in-memory."))
+        if not os.environ.get("GITHUB_TOKEN"):
+            raise click.UsageError(_("--api needs a GitHub token in GITHUB_TOKEN."))
+    config = {
+        "dry_run": dry_run,
+        "no_confirm": params["no_confirm"],
+        "confirm_all": params["confirm_all"],
+        "clone_strategy": params["clone_strategy"],
+        "shared_objects": params["shared_objects"],
+        "workspace": params["workspace"],
+        "in_memory": in_memory,
+        "api": api,
+        "chain": branches,
+        "sources": sources if len(sources) > 1 else [],
+        "sort": params["sort"],
+        "profile": params["profile"],
+        "trace": params["trace"],
+        "lock_timeout": params["lock_timeout"],
+        "cache_budget": params["cache_budget"],
+        "maintenance_budget": 0 if dry_run else params["maintenance_budget"],
+        "share_connections": not params["no_connection_sharing"],
+        "rerere": not params["no_rerere"],
+    }
+    if len(urls) > 1 and not (branches or (sources and target)):
+        raise click.UsageError(_("--source and --target, or --chain, are required when merging several repositories."))
+    return urls, target, source_branch, config
+
+def merge(repo_path: Path, repo_url: str, target_branch: str | None, source_branch: str | None, config: dict) -> str:
+    """Merge a source branch into a target branch. Returns a MergeOutcome."""
+    git = Git(
+        dry_run=config["dry_run"],
+        no_confirm=config["no_confirm"],
+        confirm_all=config["confirm_all"],
+        clone_strategy=config.get("clone_strategy", "full"),
+        profiler=Profiler(),
+        cwd=repo_path,
+    )
+    if config.get("api"):
+        outcome, target_branch, source_branch = merge_via_api(git, repo_url, target_branch, source_branch, config)
+        if outcome != MergeOutcome.CONFLICT:
+            print_run_summary(git, config)
+            return outcome
+        console.print(f"⚡[yellow]{_('The merge conflicts on GitHub; merging locally to resolve it.')}[/yellow]")
+    with ExitStack() as stack:
+        # A dry run opens no connections
+        if config.get("share_connections", True) and not config["dry_run"]:
+            git.connection_sharing = stack.enter_context(connections.ConnectionSharing(repo_url, repo_path))
+            git.config_args = git.connection_sharing.config_args
+        return merge_locally(git, repo_path, repo_url, target_branch, source_branch, config)
 
-def merge(repo_path: Path, repo_url: str, target_branch: str | None, source_branch: str | None, config: dict) -> None:
-    """Merge a source branch into a target branch."""
-    git = Git(**config)
-    os.chdir(repo_path)
+def merge_locally(  # noqa: PLR0913
+    git: Git, repo_path: Path, repo_url: str, target_branch: str | None, source_branch: str | None, config: dict,
+) -> str:
+    """Merge in the cached clone of the repository, or in a workspace copied from it."""
+    lock = RepositoryLock(
+        repo_path,
+        config.get("lock_timeout"),
+        on_wait=lambda: console.print(f"⚡[yellow]{_('Waiting for another gimer run on this repository...')}[/yellow]"),
+    )
+    if config["dry_run"]:
+        # A dry run changes nothing, so it can run alongside other dry runs
+        with lock.shared():
+            prepare_repository(git, repo_path, repo_url, config)
+            return run_merge(git, target_branch, source_branch, config)
+    with lock.exclusive():
+        prepare_repository(git, repo_path, repo_url, config)
+    # Copying a partial clone into a working copy, and fetching back from
+    # it, stops at the objects left on the remote
+    if config.get("workspace") and git.is_partial_clone():
+        console.print(f"⚡[yellow]{_('Working copies need a full clone; merging in the cached partial clone instead.')}[/yellow]")
+    elif config.get("workspace"):
+        return merge_in_workspace(git, repo_path, repo_url, target_branch, source_branch, config, lock)
+    # Branches are picked alongside other runs; run_merge locks the
+    # repository for the fetch, checkout, merge and push
+    return run_merge(git, target_branch, source_branch, config, lock)
+
+def merge_in_workspace(  # noqa: PLR0913
+    git: Git,
+    repo_path: Path,
+    repo_url: str,
+    target_branch: str | None,
+    source_branch: str | None,
+    config: dict,
+    lock: RepositoryLock,
+) -> str:
+    """Merge in a private working copy of the cache, alongside other jobs on the same repository.
+
+    The cache is only locked while it is copied and updated.
+    """
+    workspace_path = Path(tempfile.mkdtemp(prefix=f"{repo_path.name}-", dir=get_workspaces_path()))
+    try:
+        with lock.shared():
+            git.create_workspace(repo_path, workspace_path, repo_url)
+            copy_branch_index(repo_path, workspace_path)
+        git.cwd = workspace_path
+        if config.get("rerere", True):
+            git.enable_rerere(get_rerere_path())
+        return run_merge(git, target_branch, source_branch, config)
+    finally:
+        git.cwd = repo_path
+        git.queries.close()
+        try:
+            if (workspace_path / ".git").exists():
+                with lock.exclusive():
+                    git.update_cache(repo_path, workspace_path)
+                    copy_branch_index(workspace_path, repo_path)
+        finally:
+            shutil.rmtree(workspace_path, ignore_errors=True)
+
+def prepare_repository(git: Git, repo_path: Path, repo_url: str, config: dict) -> None:
+    """Clone the repository into the cache, or link an existing clone to the shared objects."""
+    reference = get_reference_store_path() if config.get("shared_objects") else None
     if not (repo_path / '.git').exists():
-        git.clone_repository(repo_url)
+        if reference:
+            git.update_reference_store(reference, repo_url, get_repo_namespace(repo_path))
+        git.clone_repository(repo_url, reference=reference)
+    elif reference:
+        git.link_reference_store(reference)
+    git.configure_fast_state()
+    if config.get("rerere", True):
+        git.enable_rerere(get_rerere_path())
+
+def run_merge(
+    git: Git, target_branch: str | None, source_branch: str | None, config: dict, lock: RepositoryLock | None = None,
+) -> str:
+    """Run the merge the options ask for in the repository of `git`.
 
-    if not git.check_working_directory_clean():
-        console.print(f"⚡[yellow]{_('Warning: You have uncommitted changes in the repository.')}[/yellow]")
-        if not Confirm.ask(f"⚡{_('Do you want to continue? It will clean dirty files and reset the repository.')}"):
+    `lock` is taken exclusively for everything that changes the repository,
+    fetches included.
+    """
+    try:
+        if config.get("chain"):
+            with _exclusive(lock):
+                return merge_chain(git, config["chain"], config)
+        if config.get("sources"):
+            # build_merge_request only accepts several sources with --target
+            assert target_branch is not None
+            with _exclusive(lock):
+                return merge_batch(git, target_branch, config["sources"], config)
+        return merge_branches(git, target_branch, source_branch, config, lock)
+    finally:
+        print_run_summary(git, config)
+
+def print_run_summary(git: Git, config: dict) -> None:
+    """Print the round-trips of a run, and its timings when asked for."""
+    console.print(f"⚡{_('Network round-trips: {0}').format(git.network_round_trips)}")
+    sharing = git.connection_sharing
+    if sharing and sharing.handshake_seconds and git.network_commands_run:
+        saved = sharing.saved_seconds(git.network_commands_run)
+        message = _('Connection sharing: {0} git commands used one SSH connection, saving about {1:.1f}s.')
+        console.print(f"⚡{message.format(git.network_commands_run, saved)}")
+    if git.conflicts_auto_resolved:
+        console.print(f"⚡{_('Conflicts resolved automatically: {0}').format(git.conflicts_auto_resolved)}")
+    if config.get("profile"):
+        git.profiler.print_summary(console)
+    if config.get("trace"):
+        git.profiler.write_trace(config["trace"])
+
+def merge_via_api(
+    git: Git, repo_url: str, target_branch: str | None, source_branch: str | None, config: dict,
+) -> tuple[str, str | None, str | None]:
+    """Merge on GitHub without a clone.
+
+    Returns the MergeOutcome and the branches, which are picked from the
+    branch list of the API when not given. A CONFLICT outcome means the
+    merge still has to be done locally.
+    """
+    owner, name = github_api.parse_repository(repo_url)
+    client = github_api.GitHubClient(
+        os.environ["GITHUB_TOKEN"],
+        owner,
+        name,
+        cache=github_api.ETagCache(get_repos_path().parent / "github-api.json"),
+        profiler=git.profiler,
+        on_wait=lambda seconds: console.print(
+            f"⚡[yellow]{_('GitHub API rate limit reached, waiting {0:.0f}s...').format(seconds)}[/yellow]"
+        ),
+    )
+    try:
+        try:
+            if not (source_branch and target_branch):
+                search = BranchSearch(sorted(client.list_branches()))
+                if not source_branch:
+                    with git.profiler.span("select source branch", Phase.PROMPT):
+                        source_branch = select_branch(_("Select source branch to merge from"), search)
+                if not target_branch:
+                    with git.profiler.span("select target branch", Phase.PROMPT):
+                        target_branch = select_branch(_("Select target branch to merge into"), search)
+            question = _('Do you want to git merge {0} ← {1}?').format(target_branch, source_branch)
+            if not (config["no_confirm"] or ask(git, f"⚡{question}", default=True)):
+                return MergeOutcome.CANCELLED, target_branch, source_branch
+            console.print(f"[yellow]≫ POST {client.repo_path}/merges {target_branch} ← {source_branch}[/yellow]")
+            if git.dry_run:
+                return MergeOutcome.MERGED, target_branch, source_branch
+            result, commit = client.merge(target_branch, source_branch, f"Merge branch '{source_branch}' into {target_branch}")
+        finally:
+            git.network_round_trips += client.requests
+    except github_api.GitHubAPIError as e:
+        console.print(f"⚡[red]{_('An error occurred during merge:')}[/red]")
+        console.print(f"⚡{e!s}", markup=False)
+        return MergeOutcome.FAILED, target_branch, source_branch
+    if result == github_api.MergeResult.CONFLICT:
+        return MergeOutcome.CONFLICT, target_branch, source_branch
+    if result == github_api.MergeResult.UP_TO_DATE:
+        console.print(f"⚡[green]{_('{0} already contains {1}.').format(target_branch, source_branch)}[/green]")
+    else:
+        console.print(f"⚡[green]{_('Merge completed successfully!')}[/green] {commit}")
+    return MergeOutcome.MERGED, target_branch, source_branch
+
+def copy_branch_index(from_path: Path, to_path: Path) -> None:
+    """Copy the branch index from one repository to another, unless the other one has a newer index.
+
+    Parallel jobs copy their indexes back into the cache, so the file is
+    replaced in one step and the rest of the gimer state is left alone.
+    """
+    source = BranchIndex.for_repository(from_path).path
+    target = BranchIndex.for_repository(to_path).path
+    try:
+        if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
             return
-        git.clean_working_directory()
+    except FileNotFoundError:
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+    shutil.copyfile(source, tmp_path)
+    tmp_path.replace(target)
+
+def merge_branches(
+    git: Git, target_branch: str | None, source_branch: str | None, config: dict, lock: RepositoryLock | None = None,
+) -> str:
+    """Merge a source branch into a target branch of the current repository.
+
+    Branches are picked alongside other runs; `lock` is taken exclusively
+    for the fetch and from the clean-up of the working tree on.
+    """
+    picked = False
+    if not (source_branch and target_branch):
+        branches = pick_branches(git, target_branch, source_branch, config, lock)
+        if branches is None:
+            return MergeOutcome.FAILED
+        target_branch, source_branch = branches
+        picked = True
+    with _exclusive(lock):
+        if not ensure_clean_working_directory(git):
+            return MergeOutcome.CANCELLED
+        if not picked:
+            git.fetch_branches([source_branch, target_branch])
+        if not (config["no_confirm"] or ask(git, f"⚡{_('Do you want to git merge {0} ← {1}?').format(target_branch, source_branch)}", default=True)):
+            return MergeOutcome.CANCELLED
+        if config.get("in_memory") and merge_in_memory(git, target_branch, source_branch):
+            console.print(f"⚡[green]{_('Merge completed successfully!')}[/green]")
+            return MergeOutcome.MERGED
+        git.checkout_branch(target_branch)
+        git.update_current_branch(target_branch)
+        if source_branch != target_branch:
+            git.update_branch(source_branch)
+        git.ensure_merge_base(target_branch, source_branch)
+        outcome = merge_or_resolve(git, source_branch, config)
+        if outcome != MergeOutcome.MERGED:
+            return outcome
+
+        git.push_branch(target_branch)
+    console.print(f"⚡[green]{_('Merge completed successfully!')}[/green]")
+    return MergeOutcome.MERGED
+
+def pick_branches(
+    git: Git, target_branch: str | None, source_branch: str | None, config: dict, lock: RepositoryLock | None = None,
+) -> tuple[str, str] | None:
+    """Fetch the branch list and let the user pick the missing branches.
 
-    git.fetch()
-    branches = git.get_branches()
+    The saved index is read under the shared `lock` and the fetch runs under
+    the exclusive one; the picker itself works from memory and holds neither.
+
+    Returns the target and source branches, or None when a picked branch
+    was deleted on the remote meanwhile.
+    """
+    with _shared(lock):
+        index = BranchIndex.for_repository(git.queries.path).load()
+    refresh: Future | None = None
+    # The picker owns the terminal while the fetch runs in the background,
+    # so a fetch that has to be confirmed runs before it instead
+    if index.entries and not config["confirm_all"]:
+        # Show the picker from the index of the last run while fetching
+        executor = ThreadPoolExecutor(max_workers=1)
+        # A lock of its own, which waits without printing while the picker owns the terminal
+        fetch_lock = RepositoryLock(lock.repo_path, lock.timeout) if lock else None
+        refresh = executor.submit(refresh_branch_index, git, index, config["dry_run"], True, fetch_lock)
+        executor.shutdown(wait=False)
+    else:
+        refresh_branch_index(git, index, config["dry_run"], lock=lock)
+    search = BranchSearch(index.names(config.get("sort", BranchSort.NAME)))
     if not source_branch:
-        source_branch = inquirer.fuzzy(
-            _("Select source branch to merge from"),
-            choices=branches,
-        ).execute()
+        with git.profiler.span("select source branch", Phase.PROMPT):
+            source_branch = select_branch(_("Select source branch to merge from"), search)
     if not target_branch:
-        target_branch = inquirer.fuzzy(
-            _("Select target branch to merge into"),
-            choices=branches,
-        ).execute()
-    if not (config["no_confirm"] or Confirm.ask(f"⚡{_('Do you want to git merge {0} ← {1}?').format(target_branch, source_branch)}", default=True)):
-        return
-    git.checkout_branch(source_branch)
-    git.pull_branch(source_branch)
+        with git.profiler.span("select target branch", Phase.PROMPT):
+            target_branch = select_branch(_("Select target branch to merge into"), search)
+    if refresh:
+        refresh.result()
+        for branch in (source_branch, target_branch):
+            if branch not in index.entries:
+                console.print(f"⚡[red]{_('Branch {0} no longer exists on the remote.').format(branch)}[/red]")
+                return None
+    return target_branch, source_branch
+
+def _exclusive(lock: RepositoryLock | None) -> AbstractContextManager[None]:
+    return lock.exclusive() if lock else nullcontext()
+
+def _shared(lock: RepositoryLock | None) -> AbstractContextManager[None]:
+    return lock.shared() if lock else nullcontext()
+
+def merge_chain(git: Git, chain: list[str], config: dict) -> str:
+    """Merge each branch of a chain into the next one, then push all of them at once.
+
+    Every merge builds on the local result of the previous one, so the
+    branches are fetched once and nothing is pushed until the whole chain
+    has merged. A conflict that is not resolved stops the chain; running
+    the same chain again resumes from that merge.
+    """
+    if not ensure_clean_working_directory(git):
+        return MergeOutcome.CANCELLED
+    state = ChainState.for_repository(git.queries.path).load()
+    start = state.resume_point(chain)
+    if start:
+        console.print(f"⚡{_('Resuming the chain at {0} ← {1}.').format(chain[start + 1], chain[start])}")
+
+    git.fetch_branches(chain)
+    if not (config["no_confirm"] or ask(git, f"⚡{_('Do you want to git merge {0}?').format(' → '.join(chain))}", default=True)):
+        return MergeOutcome.CANCELLED
+    for i in range(start, len(chain) - 1):
+        source_branch, target_branch = chain[i], chain[i + 1]
+        console.print(f"\n⚡[bold]{target_branch} ← {source_branch}[/bold]")
+        git.checkout_branch(target_branch)
+        git.update_current_branch(target_branch)
+        if i == 0:
+            git.update_branch(source_branch)
+        git.ensure_merge_base(target_branch, source_branch)
+        outcome = merge_or_resolve(git, source_branch, config)
+        if outcome != MergeOutcome.MERGED:
+            if not config["dry_run"]:
+                state.chain, state.completed = chain, i
+                state.save()
+            console.print(f"⚡[yellow]{_('The chain stopped at {0} ← {1}. Run the same --chain again to resume.').format(target_branch, source_branch)}[/yellow]")
+            return outcome
+
+    git.push_branches(chain[1:])
+    state.clear()
+    console.print(f"⚡[green]{_('Merge completed successfully!')}[/green]")
+    return MergeOutcome.MERGED
+
+def merge_batch(git: Git, target_branch: str, source_branches: list[str], config: dict) -> str:
+    """Merge several source branches into a target branch and push it once.
+
+    The sources are first merged together in one octopus merge. When that
+    conflicts, they are merged one at a time and the conflicting ones are
+    skipped, so the clean ones still land in a single push.
+    """
+    if not ensure_clean_working_directory(git):
+        return MergeOutcome.CANCELLED
+    git.fetch_branches([*source_branches, target_branch])
+    if not (config["no_confirm"] or ask(git, f"⚡{_('Do you want to git merge {0} ← {1}?').format(target_branch, ', '.join(source_branches))}", default=True)):
+        return MergeOutcome.CANCELLED
     git.checkout_branch(target_branch)
-    git.pull_branch(target_branch)
+    git.update_current_branch(target_branch)
+    for source_branch in source_branches:
+        if source_branch != target_branch:
+            git.update_branch(source_branch)
+        git.ensure_merge_base(target_branch, source_branch)
+
+    results: dict[str, str] = {}
+    try:
+        git.merge_octopus(source_branches)
+        results = dict.fromkeys(source_branches, MergeOutcome.MERGED)
+    except GitError:
+        if git.is_merge_in_progress():
+            git.abort_merge()
+        console.print(f"⚡[yellow]{_('The branches do not merge together cleanly. Merging them one at a time.')}[/yellow]")
+        results = {source_branch: merge_one(git, source_branch, config) for source_branch in source_branches}
+
+    merged = [b for b, outcome in results.items() if outcome == MergeOutcome.MERGED]
+    if merged:
+        git.push_branch(target_branch)
+    print_batch_report(target_branch, results)
+    if len(merged) == len(results):
+        return MergeOutcome.MERGED
+    if MergeOutcome.CONFLICT in results.values():
+        return MergeOutcome.CONFLICT
+    return MergeOutcome.FAILED
+
+def merge_one(git: Git, source_branch: str, config: dict) -> str:
+    """Merge one source branch of a batch, replaying recorded resolutions, and abort it if it fails."""
+    try:
+        git.merge_branch(source_branch)
+    except GitError:
+        # The error only carries the end of git's output, so conflicts are read from the index
+        outcome = MergeOutcome.CONFLICT if git.get_unmerged_paths() else MergeOutcome.FAILED
+        if outcome == MergeOutcome.CONFLICT and config.get("rerere", True) and apply_recorded_resolutions(git):
+            git.commit_merge(edit=False)
+            return MergeOutcome.MERGED
+        if git.is_merge_in_progress():
+            git.abort_merge()
+        return outcome
+    return MergeOutcome.MERGED
+
+def print_batch_report(target_branch: str, results: dict[str, str]) -> None:
+    from rich.table import Table  # noqa: PLC0415
+
+    styles = {MergeOutcome.MERGED: "green", MergeOutcome.CONFLICT: "yellow", MergeOutcome.FAILED: "red"}
+    table = Table(title=_("Merged into {0}").format(target_branch))
+    table.add_column(_("Source"))
+    table.add_column(_("Outcome"))
+    for branch, outcome in results.items():
+        table.add_row(branch, f"[{styles[outcome]}]{outcome}[/{styles[outcome]}]")
+    console.print(table)
+
+def ensure_clean_working_directory(git: Git) -> bool:
+    """Offer to clean a dirty working directory. Returns False when the user declines."""
+    if git.check_working_directory_clean():
+        return True
+    console.print(f"⚡[yellow]{_('Warning: You have uncommitted changes in the repository.')}[/yellow]")
+    if not ask(git, f"⚡{_('Do you want to continue? It will clean dirty files and reset the repository.')}"):
+        return False
+    git.clean_working_directory()
+    return True
+
+def merge_or_resolve(git: Git, source_branch: str, config: dict) -> str:
+    """Merge a branch into the current one, offering to resolve conflicts."""
     try:
         git.merge_branch(source_branch)
     except Exception as e:
         console.print(f"⚡[red]{_('An error occurred during merge:')}[/red]")
         console.print(f"⚡{e!s}")
-        if "CONFLICT" not in str(e):
-            return
+        # The error only carries the end of git's output, so conflicts are read from the index
+        if not git.get_unmerged_paths():
+            if git.is_merge_in_progress():
+                git.abort_merge()
+            return MergeOutcome.FAILED
         console.print(f"\n⚡[yellow]{_('Merge conflicts detected.')}[/yellow]")
-        if config["no_confirm"] or not Confirm.ask(f"⚡{_('Do you want to resolve conflicts manually?')}", default=True):
+        if config.get("rerere", True) and apply_recorded_resolutions(git):
+            git.commit_merge(edit=False)
+            return MergeOutcome.MERGED
+        if config["no_confirm"] or not ask(git, f"⚡{_('Do you want to resolve conflicts manually?')}", default=True):
             git.abort_merge()
-            return
+            return MergeOutcome.CONFLICT
         git.resolve_conflicts()
         if not git.is_merge_in_progress():
             console.print(f"⚡[yellow]{_('Merge was aborted. Exiting...')}[/yellow]")
-            return
+            return MergeOutcome.CONFLICT
         git.commit_merge()
+    return MergeOutcome.MERGED
 
-    git.push_branch(target_branch)
-    console.print(f"⚡[green]{_('Merge completed successfully!')}[/green]")
+def apply_recorded_resolutions(git: Git) -> bool:
+    """Stage the conflicts git rerere resolved by replaying earlier resolutions.
+
+    Returns:
+        bool: Whether every conflict was resolved, so the merge can be committed
+    """
+    resolved, remaining = git.get_recorded_resolutions()
+    if not resolved:
+        return False
+    git.stage_paths(resolved)
+    git.conflicts_auto_resolved += len(resolved)
+    console.print(f"⚡[green]{_('Resolved {0} conflicts with recorded resolutions:').format(len(resolved))}[/green]")
+    console.print("\n".join(resolved), markup=False, highlight=False)
+    return not remaining
+
+def ask(git: Git, question: str, **kwargs: bool) -> bool:
+    """Ask a yes/no question, recording the wait as prompt time."""
+    with git.profiler.span("confirm", Phase.PROMPT):
+        return bool(Confirm.ask(question, **kwargs))
+
+def select_branch(message: str, search: BranchSearch) -> str:
+    """Let the user pick a branch, using the indexed search for large repositories."""
+    if len(search) <= FUZZY_CHOICES_LIMIT:
+        return cast(str, inquirer.fuzzy(message, choices=search.branches).execute())
+    return cast(str, inquirer.text(
+        message,
+        completer=ThreadedCompleter(BranchCompleter(search)),
+        validate=search.__contains__,
+        invalid_message=_("Select one of the suggested branches"),
+    ).execute())
+
+def refresh_branch_index(
+    git: Git, index: BranchIndex, dry_run: bool, quiet: bool = False, lock: RepositoryLock | None = None,
+) -> None:
+    """Fetch and update the branch index with the moved branches.
+
+    A fetch writes the remote-tracking refs, so it runs under the exclusive `lock`.
+    """
+    with _exclusive(lock):
+        git.fetch(quiet=quiet)
+        index.refresh(git.queries)
+        if not dry_run:
+            index.save()
+
+def merge_in_memory(git: Git, target_branch: str, source_branch: str) -> bool:
+    """Merge the remote branches in the object database and push the result.
+
+    Returns False when the merge has conflicts and needs a working tree.
+    """
+    target_ref = f"origin/{target_branch}"
+    source_ref = f"origin/{source_branch}"
+    git.ensure_merge_base(target_ref, source_ref)
+    up_to_date, fast_forward = git.are_ancestors([(source_ref, target_ref), (target_ref, source_ref)])
+    if up_to_date:
+        console.print(f"⚡[green]{_('Already up to date.')}[/green]")
+        return True
+    if fast_forward:
+        git.push_commit(git.rev_parse(source_ref), target_branch)
+        return True
+    tree, conflicts = git.merge_tree(target_ref, source_ref)
+    if conflicts:
+        console.print(f"⚡[yellow]{_('Merge conflicts detected. Falling back to a checkout merge.')}[/yellow]")
+        return False
+    commit = git.commit_tree(
+        tree,
+        [git.rev_parse(target_ref), git.rev_parse(source_ref)],
+        f"Merge branch '{source_branch}' into {target_branch}",
+    )
+    git.push_commit(commit, target_branch)
+    return True
+
+def maintain_cache(repo_paths: list[Path], budget: int | None, maintenance_budget: float = 0) -> None:
+    """Record the use of the given repositories and evict others beyond the cache budget.
+
+    Repositories due for maintenance are maintained in the background.
+    """
+    for repo_path in repo_paths:
+        cache.record_use(repo_path, measure=budget is not None)
+    if maintenance_budget:
+        maintenance.schedule(repo_paths, maintenance_budget)
+    if budget is None:
+        return
+    for entry in cache.enforce_budget(budget, keep=set(repo_paths)):
+        console.print(f"⚡{_('Evicted {0} ({1}) from the cache.').format(entry.namespace, cache.format_size(entry.size))}")
 
 def cleanup_repository(repo_path: Path) -> None:
     """Remove local repository after completion."""
-    os.chdir("..")  # move to parent directory before removing
     console.print(f"⚡[bold]{_('Removing...')}[/bold] {repo_path}")
-    shutil.rmtree(repo_path)
+    with RepositoryLock(repo_path).exclusive():
+        shutil.rmtree(repo_path)
+
+@main.group("cache", invoke_without_command=True)
+@click.pass_context
+def cache_command(ctx: click.Context) -> None:
+    """Inspect and prune the repository cache."""
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(cache_list)
+
+@cache_command.command("list")
+def cache_list() -> None:
+    """Show the cached repositories, least recently used first."""
+    from rich.table import Table  # noqa: PLC0415
+
+    entries = cache.list_entries()
+    table = Table(title=str(get_repos_path()))
+    table.add_column(_("Repository"))
+    table.add_column(_("Size"), justify="right")
+    table.add_column(_("Last used"))
+    for entry in entries:
+        last_used = datetime.fromtimestamp(entry.last_used).strftime("%Y-%m-%d %H:%M")
+        table.add_row(entry.namespace, cache.format_size(entry.size), last_used)
+    table.add_row(_("total"), cache.format_size(sum(e.size for e in entries)), "", style="bold")
+    console.print(table)
+
+@cache_command.command("prune")
+@click.option('--budget', type=ByteSize(), envvar='GIMER_CACHE_BUDGET', help='Evict least recently used repositories until the cache fits in this size, e.g. 20G')
+@click.option('--older-than', type=click.FloatRange(min=0), help='Evict repositories not used for this many days')
+@click.option('--all', 'prune_all', is_flag=True, help='Evict every repository that is not in use')
+def cache_prune(budget: int | None, older_than: float | None, prune_all: bool) -> None:
+    """Evict cached repositories. Repositories in use by a gimer run are kept."""
+    if budget is None and older_than is None and not prune_all:
+        raise click.UsageError(_("Pass --budget, --older-than or --all."))
+    evicted = cache.enforce_budget(
+        0 if prune_all else budget if budget is not None else sys.maxsize,
+        older_than=None if older_than is None else older_than * 24 * 60 * 60,
+        measure=True,
+    )
+    for entry in evicted:
+        console.print(f"⚡{_('Evicted {0} ({1}) from the cache.').format(entry.namespace, cache.format_size(entry.size))}")
+    console.print(f"⚡{_('Freed {0}.').format(cache.format_size(sum(e.size for e in evicted)))}")
+
+@cache_command.command("maintain")
+@click.argument('repo_paths', nargs=-1, type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option(
+    '--time-budget',
+    type=click.FloatRange(min=0),
+    default=300,
+    show_default=True,
+    help='Seconds to spend on each repository; unfinished tasks continue on the next run',
+)
+@click.option('--dry-run', is_flag=True, help="Show the maintenance commands without running them")
+def cache_maintain(repo_paths: tuple[Path, ...], time_budget: float, dry_run: bool) -> None:
+    """Write commit-graphs and multi-pack-indexes, repack and prefetch cached repositories.
+
+    Without REPO_PATHS every cached repository is maintained.
+    """
+    from rich.table import Table  # noqa: PLC0415
+
+    for repo_path in repo_paths or [entry.path for entry in cache.list_entries(measure=False)]:
+        console.print(f"⚡[bold]{_('Maintaining...')}[/bold] {repo_path}")
+        report = maintenance.maintain_repository(repo_path, time_budget, dry_run)
+        if report is None:
+            console.print(f"⚡[yellow]{_('Skipped: the repository is in use by another gimer run.')}[/yellow]")
+            continue
+        if report.skipped:
+            console.print(f"⚡[yellow]{_('Out of time for: {0}').format(', '.join(report.skipped))}[/yellow]")
+        if report.failed:
+            console.print(f"⚡[red]{_('Failed: {0}').format(', '.join(report.failed))}[/red]")
+        table = Table()
+        table.add_column(_("Command"))
+        table.add_column(_("Before"), justify="right")
+        table.add_column(_("After"), justify="right")
+        for name, before in report.before.items():
+            after = report.after.get(name)
+            table.add_row(f"git {name}", f"{before * 1000:.1f}ms", "" if after is None else f"{after * 1000:.1f}ms")
+        console.print(table)
+
+@cache_command.command("export")
+@click.argument('destination', type=click.Path(path_type=Path))
+@click.argument('repo_paths', nargs=-1, type=click.Path(exists=True, file_okay=False, path_type=Path))
+def cache_export(destination: Path, repo_paths: tuple[Path, ...]) -> None:
+    """Write cached repositories as git bundles to DESTINATION, for `gimer cache seed`.
+
+    DESTINATION is a directory, or an archive when it ends in .tar or .tar.gz.
+    Without REPO_PATHS every cached repository is exported.
+    """
+    paths = list(repo_paths) or [entry.path for entry in cache.list_entries(measure=False)]
+    paths = [path for path in paths if (path / ".git").is_dir()]
+    if not paths:
+        raise click.UsageError(_("There are no cached repositories to export."))
+    try:
+        entries = bundles.export_cache(paths, destination)
+    except GitError as e:
+        raise click.ClickException(str(e)) from e
+    console.print(f"⚡{_('Exported {0} repositories to {1}.').format(len(entries), destination)}", markup=False)
+
+@cache_command.command("seed")
+@click.argument('source', type=click.Path(exists=True, path_type=Path))
+@click.option('--offline', is_flag=True, help='Only import the bundles, without fetching what changed since the export')
+def cache_seed(source: Path, offline: bool) -> None:
+    """Fill the repository cache from an export of `gimer cache export`.
+
+    Each repository is imported from its bundle, then only the changes made
+    since the export are fetched. Repositories already cached are skipped.
+    """
+    styles = {bundles.SeedOutcome.SEEDED: "green", bundles.SeedOutcome.SKIPPED: "yellow", bundles.SeedOutcome.FAILED: "red"}
+    try:
+        with bundles.open_export(source) as (export_path, entries):
+            results = []
+            for entry in entries:
+                console.print(f"⚡[bold]{_('Seeding...')}[/bold] {entry.get('namespace')}")
+                result = bundles.seed_repository(export_path, entry, fetch=not offline)
+                if result.outcome == bundles.SeedOutcome.SEEDED:
+                    cache.record_use(get_repos_path() / result.namespace)
+                style = styles[result.outcome]
+                console.print(f"⚡[{style}]{result.outcome}[/{style}] {result.namespace} ({result.seconds:.1f}s)")
+                if result.error:
+                    console.print(f"⚡{result.error}", markup=False)
+                results.append(result)
+    except bundles.BundleError as e:
+        raise click.ClickException(str(e)) from e
+    seeded = sum(r.outcome == bundles.SeedOutcome.SEEDED for r in results)
+    console.print(f"⚡{_('Seeded {0} of {1} repositories.').format(seeded, len(results))}")
+    if any(r.outcome == bundles.SeedOutcome.FAILED for r in results):
+        sys.exit(1)
+
+socket_option = click.option(
+    '--socket',
+    'socket_path',
+    type=click.Path(dir_okay=False, path_type=Path),
+    envvar='GIMER_SOCKET',
+    help='Unix socket of the daemon  [default: gimer.sock next to the repository cache]',
+)
+
+@main.command("serve")
+@socket_option
+@click.option(
+    '-j',
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help='Merges run at the same time; jobs on one repository always run one after another',
+)
+def serve_command(socket_path: Path | None, jobs: int) -> None:
+    """Run a merge daemon that takes jobs from `gimer submit`.
+
+    Workers stay warm between jobs, so a submitted merge skips the startup of
+    gimer. Jobs run without prompts; conflicts are reported, not resolved.
+    """
+    if os.name != "posix":
+        raise click.UsageError(_("gimer serve needs Unix sockets, which this platform does not have."))
+    socket_path = socket_path or daemon.get_socket_path()
+    ready = _("gimer daemon listening on {0} with {1} workers. Press Ctrl+C to stop.").format(socket_path, jobs)
+    try:
+        daemon.serve(socket_path, jobs, on_ready=lambda: console.print(f"⚡{ready}", markup=False))
+    except daemon.DaemonError as e:
+        raise click.ClickException(str(e)) from e
+
+@main.command(
+    "submit",
+    short_help="Queue merges on a running `gimer serve`.",
+    context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False},
+)
+@socket_option
+@click.option('--no-wait', is_flag=True, help='Return once the daemon has queued the jobs instead of following them')
+@click.argument('merge_args', nargs=-1, type=click.UNPROCESSED)
+def submit_command(socket_path: Path | None, no_wait: bool, merge_args: tuple[str, ...]) -> None:
+    """Queue merges on a running `gimer serve`, e.g. gimer submit REPO_URL --source dev --target main
+
+    Takes the arguments and options of the merge command after the options of
+    submit; run `gimer submit REPO_URL --help` to list them. The output of the
+    merge is streamed back until it finishes.
+    """
+    with merge_command.make_context("gimer submit", list(merge_args)) as ctx:
+        urls, target, source_branch, config = build_merge_request(ctx.params)
+        cleanup = ctx.params["cleanup"]
+        if not (config["chain"] or (ctx.params["source"] and target)):
+            raise click.UsageError(_("Jobs cannot show the branch picker: pass --source and --target, or --chain."), ctx)
+    # Jobs run unattended; one trace file cannot hold several processes
+    config = {**config, "no_confirm": True, "confirm_all": False, "trace": None}
+    specs = [
+        {"repo_url": url, "target_branch": target, "source_branch": source_branch, "config": config, "cleanup": cleanup}
+        for url in urls
+    ]
+    single = len(specs) == 1
+    results = []
+    try:
+        for reply in daemon.request(socket_path or daemon.get_socket_path(), {"type": "submit", "jobs": specs, "wait": not no_wait}):
+            if reply["type"] == "accepted":
+                for job in reply["jobs"]:
+                    console.print(f"⚡{_('Queued job {0}: {1}').format(job['id'], job['repo_url'])}", markup=False)
+            elif reply["type"] == "output" and single:
+                click.echo(reply["text"], nl=False)
+            elif reply["type"] == "done":
+                result = fleet.FleetResult(reply["repo_url"], reply["outcome"], reply["seconds"], Path(reply["log_path"]), reply["error"])
+                style = fleet.OUTCOME_STYLES[result.outcome]
+                console.print(f"⚡[{style}]{result.outcome}[/{style}] {result.repo_url} ({result.seconds:.1f}s)")
+                results.append(result)
+    except daemon.DaemonError as e:
+        raise click.ClickException(str(e)) from e
+    if not single:
+        results.sort(key=lambda r: urls.index(r.repo_url))
+        fleet.print_summary(results)
+    if any(r.outcome in {MergeOutcome.CONFLICT, MergeOutcome.FAILED} for r in results):
+        sys.exit(1)
+
+@main.command("jobs")
+@socket_option
+def jobs_command(socket_path: Path | None) -> None:
+    """Show the queued, running and recently finished jobs of `gimer serve`."""
+    from rich.table import Table  # noqa: PLC0415
+
+    try:
+        replies = list(daemon.request(socket_path or daemon.get_socket_path(), {"type": "status"}))
+    except daemon.DaemonError as e:
+        raise click.ClickException(str(e)) from e
+    table = Table()
+    table.add_column(_("Job"), justify="right")
+    table.add_column(_("Repository"), overflow="fold")
+    table.add_column(_("State"))
+    table.add_column(_("Time"), justify="right")
+    for job in replies[0]["jobs"]:
+        state = job["outcome"] or job["state"]
+        style = fleet.OUTCOME_STYLES.get(state)
+        table.add_row(
+            str(job["id"]),
+            job["repo_url"],
+            f"[{style}]{state}[/{style}]" if style else state,
+            f"{job['seconds']:.1f}s" if job["outcome"] else "",
+        )
+    console.print(table)
+
+@main.group("rerere", invoke_without_command=True)
+@click.pass_context
+def rerere_command(ctx: click.Context) -> None:
+    """Share the conflict resolutions recorded by merges between machines.
+
+    Every cached repository records how its conflicts were resolved in one
+    store, and later merges replay them.
+    """
+    if ctx.invoked_subcommand is None:
+        count = len(rerere.list_resolutions(get_rerere_path()))
+        console.print(f"⚡{_('{0} recorded resolutions in {1}').format(count, get_rerere_path())}", markup=False)
+
+@rerere_command.command("export")
+@click.argument('archive', type=click.Path(dir_okay=False, path_type=Path))
+def rerere_export(archive: Path) -> None:
+    """Write the recorded resolutions to a .tar.gz ARCHIVE."""
+    count = rerere.export_resolutions(get_rerere_path(), archive)
+    console.print(f"⚡{_('Exported {0} resolutions to {1}.').format(count, archive)}", markup=False)
+
+@rerere_command.command("import")
+@click.argument('archive', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def rerere_import(archive: Path) -> None:
+    """Add the resolutions of an ARCHIVE made by `gimer rerere export`. Existing ones are kept."""
+    import tarfile  # noqa: PLC0415
+
+    try:
+        count = rerere.import_resolutions(get_rerere_path(), archive)
+    except tarfile.TarError as e:
+        raise click.ClickException(_("{0} is not a resolution archive: {1}").format(archive, e)) from e
+    console.print(f"⚡{_('Imported {0} new resolutions.').format(count)}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,150 @@
+"""Share one connection to the remote between the git commands of a run."""
+
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+# Masters left behind by a crashed run close after this many idle seconds
+CONTROL_PERSIST = 60
+CONNECT_TIMEOUT = 30
+CREDENTIAL_CACHE_TIMEOUT = 900
+SCP_URL_PATTERN = re.compile(r"^(?P<host>[^/@:]+@[^/:]+|[^/:]+):(?!//)")
+SSH_URL_PATTERN = re.compile(r"^(?:ssh|git\+ssh|ssh\+git)://(?P<host>[^/:]+)(?::(?P<port>\d+))?/")
+
+
+def ssh_destination(repo_url: str) -> tuple[str, str | None] | None:
+    """Return the [user@]host and port of an SSH repository URL, or None for other transports."""
+    match = SSH_URL_PATTERN.match(repo_url)
+    if match:
+        return match["host"], match["port"]
+    match = SCP_URL_PATTERN.match(repo_url)
+    # A Windows path such as C:\\repo is not an SSH URL
+    if match and len(match["host"]) > 1:
+        return match["host"], None
+    return None
+
+
+def _git_config(key: str, cwd: Path | None) -> list[str]:
+    result = subprocess.run(
+        ["git", "config", "--get-all", key], cwd=cwd if cwd and cwd.is_dir() else None,
+        capture_output=True, text=True, check=False,
+    )
+    return result.stdout.splitlines()
+
+
+class ConnectionSharing:
+    """Connections shared by every git command of a run.
+
+    SSH remotes get an OpenSSH ControlMaster: the run authenticates once and
+    later commands open a channel on the same connection. HTTPS remotes
+    without a credential helper get a credential cache, so the user is asked
+    for credentials once. Everything is passed to git as `-c` options and
+    removed when the run ends.
+    """
+
+    def __init__(self, repo_url: str, cwd: Path | None = None) -> None:
+        self.repo_url = repo_url
+        self.cwd = cwd
+        self.control_dir: Path | None = None
+        self.destination = ssh_destination(repo_url)
+        self.ssh_command: list[str] = []
+        self.credential_socket: Path | None = None
+        self.handshake_seconds = 0.0
+        self.config_args: tuple[str, ...] = ()
+
+    @property
+    def control_path(self) -> str:
+        assert self.control_dir is not None
+        return str(self.control_dir / "%C")
+
+    def _ssh_options(self) -> list[str]:
+        return [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self.control_path}",
+            "-o", f"ControlPersist={CONTROL_PERSIST}",
+        ]
+
+    def _ssh_target(self) -> list[str]:
+        assert self.destination is not None
+        host, port = self.destination
+        return ["-p", port, host] if port else [host]
+
+    def _make_control_dir(self) -> Path:
+        # Unix socket paths are limited to about 100 bytes, and the temporary
+        # directory of macOS is long, so the sockets go to /tmp
+        self.control_dir = Path(tempfile.mkdtemp(prefix="gimer-", dir="/tmp" if os.name == "posix" else None))
+        return self.control_dir
+
+    def _start_ssh(self) -> None:
+        # A custom GIT_SSH or GIT_SSH_COMMAND would take precedence over our core.sshCommand
+        if os.name != "posix" or os.environ.get("GIT_SSH") or os.environ.get("GIT_SSH_COMMAND"):
+            return
+        base = _git_config("core.sshCommand", self.cwd)
+        self.ssh_command = shlex.split(base[-1]) if base else ["ssh"]
+        self._make_control_dir()
+        start = time.perf_counter()
+        try:
+            # `exit` on the remote side only makes ssh authenticate and leave the master running;
+            # git hosts refuse shells, so any exit code but ssh's own 255 means it connected
+            result = subprocess.run(
+                [*self.ssh_command, *self._ssh_options(), "-T", *self._ssh_target(), "exit"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=CONNECT_TIMEOUT, check=False,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            self.close()
+            return
+        if result.returncode == 255:  # noqa: PLR2004
+            self.close()
+            return
+        self.handshake_seconds = time.perf_counter() - start
+        command = " ".join(shlex.quote(arg) for arg in [*self.ssh_command, *self._ssh_options()])
+        self.config_args = ("-c", f"core.sshCommand={command}")
+
+    def _start_credential_cache(self) -> None:
+        # git-credential-cache needs Unix sockets; configured helpers are left alone
+        if os.name != "posix" or _git_config("credential.helper", self.cwd):
+            return
+        self.credential_socket = self._make_control_dir() / "credentials"
+        helper = f"cache --timeout={CREDENTIAL_CACHE_TIMEOUT} --socket={shlex.quote(str(self.credential_socket))}"
+        self.config_args = ("-c", f"credential.helper={helper}")
+
+    def __enter__(self) -> "ConnectionSharing":
+        if self.destination:
+            self._start_ssh()
+        elif self.repo_url.startswith(("https://", "http://")):
+            self._start_credential_cache()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def saved_seconds(self, connections: int) -> float:
+        """Estimate the time saved by `connections` git commands that reused the connection.
+
+        Without sharing every one of them makes its own handshake; with it the
+        run makes a single one, up front.
+        """
+        return self.handshake_seconds * max(connections - 1, 0)
+
+    def close(self) -> None:
+        """Stop the shared connection and remove its sockets."""
+        if self.control_dir is None:
+            return
+        if self.config_args and self.destination:
+            subprocess.run(
+                [*self.ssh_command, "-o", f"ControlPath={self.control_path}", "-O", "exit", *self._ssh_target()],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=CONNECT_TIMEOUT, check=False,
+            )
+        if self.credential_socket and self.credential_socket.exists():
+            subprocess.run(
+                ["git", "credential-cache", f"--socket={self.credential_socket}", "exit"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False,
+            )
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+        self.control_dir = None
+        self.config_args = ()
@@ -0,0 +1,335 @@
+"""A long-running merge service that takes jobs from `gimer submit` on a Unix socket.
+
+The daemon keeps a pool of worker processes with gimer and its dependencies
+already imported, so a submitted merge starts with no interpreter startup.
+Jobs on the same repository run one after another in the order they came
+in; jobs on different repositories run in parallel, up to the number of
+workers.
+
+Client and daemon exchange JSON objects, one per line. The client sends one
+request; for a submit the daemon answers with the job ids, then streams the
+output of the jobs and one `done` message per job.
+"""
+
+import asyncio
+import codecs
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from gimer.repositories import get_github_repo_path, get_repos_path
+
+POLL_INTERVAL = 0.1
+# Finished jobs kept for `gimer jobs`
+FINISHED_JOBS_KEPT = 100
+STREAM_LIMIT = 1024 * 1024
+
+
+class DaemonError(Exception):
+    """Exception raised when the daemon cannot be reached or refuses a request."""
+
+
+class JobState:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+
+
+def get_socket_path() -> Path:
+    """Return the socket of the daemon, which GIMER_SOCKET overrides."""
+    if os.environ.get("GIMER_SOCKET"):
+        return Path(os.environ["GIMER_SOCKET"])
+    return get_repos_path().parent / "gimer.sock"
+
+
+def is_running(socket_path: Path) -> bool:
+    """Return whether a daemon accepts connections on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def _warm_up() -> None:
+    """Import the merge pipeline once per worker process, before the first job."""
+    import gimer.fleet  # noqa: F401, PLC0415
+
+
+def _run_job(repo_url: str, target_branch: str | None, source_branch: str | None, config: dict, log_path: Path) -> Any:
+    from gimer.fleet import merge_repository  # noqa: PLC0415
+
+    return merge_repository(repo_url, target_branch, source_branch, config, log_path)
+
+
+def _finish_job(repo_path: Path, cleanup: bool, config: dict) -> None:
+    from gimer.cli import cleanup_repository, maintain_cache  # noqa: PLC0415
+
+    if cleanup:
+        cleanup_repository(repo_path)
+    maintain_cache([repo_path], config.get("cache_budget"), config.get("maintenance_budget", 0))
+
+
+@dataclass
+class Job:
+    id: int
+    repo_url: str
+    target_branch: str | None
+    source_branch: str | None
+    config: dict
+    cleanup: bool
+    log_path: Path
+    state: str = JobState.QUEUED
+    outcome: str | None = None
+    seconds: float = 0.0
+    error: str = ""
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "repo_url": self.repo_url,
+            "state": self.state,
+            "outcome": self.outcome,
+            "seconds": self.seconds,
+            "error": self.error,
+            "log_path": str(self.log_path),
+        }
+
+
+class MergeServer:
+    """Job queue of the daemon: one lock per repository, one slot per worker."""
+
+    def __init__(
+        self,
+        jobs: int,
+        log_dir: Path,
+        executor: Executor | None = None,
+        run_job: Callable[..., Any] = _run_job,
+        finish_job: Callable[[Path, bool, dict], None] = _finish_job,
+    ) -> None:
+        self.log_dir = log_dir
+        self.workers = jobs
+        self.executor = executor or ProcessPoolExecutor(max_workers=jobs, initializer=_warm_up)
+        self.run_job = run_job
+        self.finish_job = finish_job
+        self.slots = asyncio.Semaphore(jobs)
+        # asyncio.Lock wakes its waiters first come, first served
+        self.repo_locks: dict[Path, asyncio.Lock] = {}
+        self.jobs: dict[int, Job] = {}
+        self.tasks: dict[int, asyncio.Task] = {}
+        self.ids = itertools.count(1)
+
+    async def start(self) -> None:
+        """Start the workers. Call before accepting connections: forked workers would inherit them."""
+        await asyncio.get_running_loop().run_in_executor(self.executor, _warm_up)
+
+    def submit(self, spec: dict[str, Any]) -> Job:
+        """Queue a job described by a submit request."""
+        job_id = next(self.ids)
+        job = Job(
+            job_id,
+            spec["repo_url"],
+            spec.get("target_branch"),
+            spec.get("source_branch"),
+            spec["config"],
+            spec.get("cleanup", False),
+            self.log_dir / f"{job_id:05d}.log",
+        )
+        self.jobs[job_id] = job
+        self.tasks[job_id] = asyncio.create_task(self._run(job))
+        self.tasks[job_id].add_done_callback(lambda _task: self.tasks.pop(job_id, None))
+        self._forget_finished()
+        return job
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.state == JobState.DONE]
+        for job_id in finished[:-FINISHED_JOBS_KEPT]:
+            self.jobs.pop(job_id).log_path.unlink(missing_ok=True)
+
+    async def _run(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        repo_path = get_github_repo_path(job.repo_url)
+        lock = self.repo_locks.setdefault(repo_path, asyncio.Lock())
+        try:
+            async with lock, self.slots:
+                job.state = JobState.RUNNING
+                job.log_path.touch()
+                executor = self.executor
+                result = await loop.run_in_executor(
+                    executor, self.run_job,
+                    job.repo_url, job.target_branch, job.source_branch, job.config, job.log_path,
+                )
+                job.outcome, job.seconds, job.error = result.outcome, result.seconds, result.error
+                await loop.run_in_executor(None, self.finish_job, repo_path, job.cleanup, job.config)
+        except asyncio.CancelledError:
+            job.outcome, job.error = "cancelled", "The daemon stopped before the job ran."
+            raise
+        except BrokenProcessPool:
+            job.outcome, job.error = "failed", "A worker process died during the job."
+            self._replace_executor(executor)
+        except Exception as e:
+            job.outcome, job.error = "failed", str(e) or type(e).__name__
+        finally:
+            job.state = JobState.DONE
+            job.finished.set()
+
+    def _replace_executor(self, broken: Executor) -> None:
+        """Start new workers after one died, which leaves the pool unusable.
+
+        The jobs running in the broken pool fail with it, and only the first
+        of them replaces it. The new workers are spawned rather than forked,
+        so they do not inherit the connections the daemon has open.
+        """
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_up, mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one client connection."""
+        try:
+            try:
+                request = json.loads(await reader.readline())
+                kind = request["type"]
+            except (ValueError, KeyError, TypeError):
+                await _send(writer, {"type": "error", "message": "Invalid request."})
+                return
+            if kind == "status":
+                await _send(writer, {"type": "status", "jobs": [job.describe() for job in self.jobs.values()]})
+            elif kind == "submit":
+                specs = request.get("jobs")
+                if not isinstance(specs, list) or not all(_is_job_spec(spec) for spec in specs):
+                    await _send(writer, {"type": "error", "message": "Invalid jobs."})
+                    return
+                jobs = [self.submit(spec) for spec in specs]
+                await _send(writer, {"type": "accepted", "jobs": [job.describe() for job in jobs]})
+                if request.get("wait", True):
+                    await self.stream(jobs, writer)
+            else:
+                await _send(writer, {"type": "error", "message": f"Unknown request: {kind}"})
+        except ConnectionError:
+            # The client went away; its jobs keep running
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, jobs: list[Job], writer: asyncio.StreamWriter) -> None:
+        """Send the output of the jobs as their logs grow, and a `done` message as each one ends."""
+        offsets = dict.fromkeys((job.id for job in jobs), 0)
+        decoders = {job.id: codecs.getincrementaldecoder("utf-8")(errors="replace") for job in jobs}
+        pending = list(jobs)
+        while pending:
+            for job in list(pending):
+                # Read the state first, so output written just before the job ended is not missed
+                finished = job.finished.is_set()
+                data, offsets[job.id] = _read_from(job.log_path, offsets[job.id])
+                text = decoders[job.id].decode(data, final=finished)
+                if text:
+                    await _send(writer, {"type": "output", "job": job.id, "text": text})
+                if finished:
+                    await _send(writer, {"type": "done", **job.describe()})
+                    pending.remove(job)
+            if pending:
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def shutdown(self) -> None:
+        """Drop the queued jobs and wait for the running ones."""
+        tasks = list(self.tasks.items())
+        for job_id, task in tasks:
+            if self.jobs[job_id].state == JobState.QUEUED:
+                task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _is_job_spec(spec: Any) -> bool:
+    return isinstance(spec, dict) and isinstance(spec.get("repo_url"), str) and isinstance(spec.get("config"), dict)
+
+
+def _read_from(path: Path, offset: int) -> tuple[bytes, int]:
+    try:
+        with path.open("rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return b"", offset
+    return data, offset + len(data)
+
+
+async def _send(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def _serve(socket_path: Path, jobs: int, on_ready: Callable[[], None] | None = None) -> None:
+    with tempfile.TemporaryDirectory(prefix="gimer-serve-") as log_dir:
+        server = MergeServer(jobs, Path(log_dir))
+        await server.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        # Only the user may submit jobs, which run with their credentials
+        old_umask = os.umask(0o177)
+        try:
+            unix_server = await asyncio.start_unix_server(server.handle, path=str(socket_path), limit=STREAM_LIMIT)
+        finally:
+            os.umask(old_umask)
+        try:
+            if on_ready:
+                on_ready()
+            await stop.wait()
+        finally:
+            unix_server.close()
+            await server.shutdown()
+            socket_path.unlink(missing_ok=True)
+
+
+def serve(socket_path: Path, jobs: int, on_ready: Callable[[], None] | None = None) -> None:
+    """Run the daemon until SIGINT or SIGTERM.
+
+    Raises:
+        DaemonError: If another daemon already listens on the socket
+    """
+    if is_running(socket_path):
+        raise DaemonError(f"A gimer daemon is already running on {socket_path}")
+    # A daemon that did not exit cleanly leaves its socket behind
+    socket_path.unlink(missing_ok=True)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    asyncio.run(_serve(socket_path, jobs, on_ready))
+
+
+def request(socket_path: Path, message: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Send one request to the daemon and yield its replies as they arrive.
+
+    Raises:
+        DaemonError: If no daemon listens on the socket, or it refuses the request
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError as e:
+        sock.close()
+        raise DaemonError(f"No gimer daemon is running on {socket_path}: {e.strerror}") from e
+    with sock, sock.makefile("rb") as replies:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        for line in replies:
+            reply = json.loads(line)
+            if reply["type"] == "error":
+                raise DaemonError(reply["message"])
+            yield reply
+
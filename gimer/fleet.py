@@ -0,0 +1,169 @@
+"""Merge the same branch pair across many repositories in parallel."""
+
+import os
+import re
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from gimer.cli import (
+    Confirm,
+    MergeOutcome,
+    cleanup_repository,
+    console,
+    maintain_cache,
+    merge,
+)
+from gimer.git import UserAbortedError
+from gimer.i18n import _
+from gimer.repositories import get_github_repo_path
+
+OUTCOME_STYLES = {
+    MergeOutcome.MERGED: "green",
+    MergeOutcome.CONFLICT: "yellow",
+    MergeOutcome.CANCELLED: "yellow",
+    MergeOutcome.FAILED: "red",
+}
+
+
+@dataclass
+class FleetResult:
+    repo_url: str
+    outcome: str
+    seconds: float
+    log_path: Path | None = None
+    error: str = ""
+
+
+def read_manifest(path: Path) -> list[str]:
+    """Return the repository URLs of a manifest: one per line, `#` starts a comment."""
+    urls = []
+    for line in path.read_text().splitlines():
+        url = line.split("#", 1)[0].strip()
+        if url:
+            urls.append(url)
+    return urls
+
+
+@contextmanager
+def _redirected_output(log_path: Path) -> Iterator[None]:
+    """Send the output of this process and its git commands to a log file, with no stdin."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    with log_path.open("w") as log, open(os.devnull) as devnull:
+        saved = [os.dup(fd) for fd in (0, 1, 2)]
+        os.dup2(devnull.fileno(), 0)
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in zip((0, 1, 2), saved, strict=True):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+
+
+def _merge(repo_url: str, target_branch: str | None, source_branch: str | None, config: dict) -> tuple[str, str]:
+    """Run the merge pipeline for one repository. Returns the outcome and an error summary."""
+    try:
+        return merge(get_github_repo_path(repo_url), repo_url, target_branch, source_branch, config), ""
+    except UserAbortedError:
+        return MergeOutcome.CANCELLED, ""
+    except EOFError:
+        return MergeOutcome.FAILED, _("Needs an answer to a prompt; run gimer for this repository alone.")
+    except Exception as e:
+        console.print(f"⚡[red]{_('An error occurred during merge:')}[/red]")
+        console.print(f"⚡{e!s}", markup=False)
+        lines = [line for line in str(e).splitlines() if line.strip()]
+        return MergeOutcome.FAILED, lines[-1] if lines else type(e).__name__
+
+
+def merge_repository(repo_url: str, target_branch: str | None, source_branch: str | None, config: dict, log_path: Path) -> FleetResult:
+    """Merge one repository without prompts, logging to a file. Runs in a worker process."""
+    start = time.perf_counter()
+    with _redirected_output(log_path):
+        outcome, error = _merge(repo_url, target_branch, source_branch, config)
+    return FleetResult(repo_url, outcome, time.perf_counter() - start, log_path, error)
+
+
+def _log_name(index: int, repo_url: str) -> str:
+    name = "-".join(repo_url.rstrip("/").removesuffix(".git").split("/")[-2:])
+    return f"{index:03d}-{re.sub(r'[^A-Za-z0-9._-]', '_', name)}.log"
+
+
+def run_fleet(  # noqa: PLR0913
+    repo_urls: list[str],
+    target_branch: str | None,
+    source_branch: str | None,
+    config: dict,
+    jobs: int,
+    cleanup: bool = False,
+) -> list[FleetResult]:
+    """Merge a branch pair in every repository, then resolve the conflicted ones interactively.
+
+    Clean merges run unattended in a pool of worker processes, each logging
+    the output of its git commands to a file, so the only prompts are the
+    confirmation up front and the conflict resolution at the end.
+    """
+    if config.get("chain"):
+        merges = " → ".join(config["chain"])
+    else:
+        merges = f"{target_branch} ← {', '.join(config.get('sources') or [source_branch])}"
+    question = _("Do you want to git merge {0} in {1} repositories?").format(merges, len(repo_urls))
+    if not (config["no_confirm"] or Confirm.ask(f"⚡{question}", default=True)):
+        return []
+
+    log_dir = Path(tempfile.mkdtemp(prefix="gimer-fleet-"))
+    # One trace file cannot hold several processes; --profile summaries go to the logs
+    worker_config = {**config, "no_confirm": True, "confirm_all": False, "trace": None}
+    results: list[FleetResult] = []
+    with ProcessPoolExecutor(max_workers=min(jobs, len(repo_urls))) as executor:
+        futures = [
+            executor.submit(merge_repository, url, target_branch, source_branch, worker_config, log_dir / _log_name(i, url))
+            for i, url in enumerate(repo_urls)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            style = OUTCOME_STYLES[result.outcome]
+            console.print(f"⚡[{style}]{result.outcome}[/{style}] {result.repo_url} ({result.seconds:.1f}s)")
+            results.append(result)
+    results.sort(key=lambda r: repo_urls.index(r.repo_url))
+
+    conflicted = [r for r in results if r.outcome == MergeOutcome.CONFLICT]
+    if conflicted and not (config["no_confirm"] or config["dry_run"]):
+        console.print(f"\n⚡[yellow]{_('Merge conflicts detected in {0} repositories.').format(len(conflicted))}[/yellow]")
+        for result in conflicted:
+            console.print(f"\n⚡[bold]{result.repo_url}[/bold]")
+            result.outcome, result.error = _merge(result.repo_url, target_branch, source_branch, {**config, "trace": None})
+
+    if cleanup:
+        for url in repo_urls:
+            cleanup_repository(get_github_repo_path(url))
+    maintain_cache([get_github_repo_path(url) for url in repo_urls], config.get("cache_budget"), config.get("maintenance_budget", 0))
+    print_summary(results)
+    return results
+
+
+def print_summary(results: list[FleetResult]) -> None:
+    from rich.markup import escape  # noqa: PLC0415
+    from rich.table import Table  # noqa: PLC0415
+
+    table = Table(title=_("Fleet merge"))
+    table.add_column(_("Repository"), overflow="fold")
+    table.add_column(_("Outcome"))
+    table.add_column(_("Time"), justify="right")
+    table.add_column(_("Details"), overflow="fold")
+    for result in results:
+        style = OUTCOME_STYLES[result.outcome]
+        details = result.error
+        if result.outcome != MergeOutcome.MERGED and result.log_path:
+            details = f"{details}\n{result.log_path}".strip()
+        table.add_row(result.repo_url, f"[{style}]{result.outcome}[/{style}]", f"{result.seconds:.1f}s", escape(details))
+    console.print(table)
@@ -1,27 +1,145 @@
 import os
+import platform
+import re
+import shutil
+import signal
 import subprocess
-
-from InquirerPy import inquirer
-from rich.console import Console
+import tempfile
+from collections import deque
+from collections.abc import Generator
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 from gimer.i18n import _
+from gimer.lazy import LazyObject, lazy_import
+from gimer.profiling import Phase, Profiler, command_phase
+from gimer.queries import RepositoryQueries
+from gimer.system import System
+
+if TYPE_CHECKING:
+    from gimer.connections import ConnectionSharing
+
+console = LazyObject(lazy_import("rich.console", "Console"))
+inquirer = lazy_import("InquirerPy.inquirer")
+Progress = lazy_import("rich.progress", "Progress")
+
+CLONE_STRATEGIES: dict[str, tuple[str, ...]] = {
+    "full": (),
+    "blobless": ("--filter=blob:none",),
+    "treeless": ("--filter=tree:0",),
+    "shallow": ("--depth=1", "--no-single-branch"),
+}
+NETWORK_COMMANDS = {"clone", "fetch", "pull", "push", "ls-remote"}
+# Options of those commands whose value is the next argument
+OPTIONS_WITH_VALUE = {"--reference", "--reference-if-able", "-o", "--origin", "-b", "--branch", "-u", "--upload-pack"}
+SHALLOW_FETCH_ARGS = ("--depth=1",)
+PROGRESS_COMMANDS = {"clone", "fetch", "pull", "push"}
+PROGRESS_PATTERN = re.compile(r"^(?:remote: )?(?P<title>[A-Z][\w ]*):\s+\d+% \((?P<done>\d+)/(?P<total>\d+)\)")
+OUTPUT_TAIL_LINES = 20
+# Time a stopped command gets to clean up before it is killed
+STOP_GRACE_PERIOD = 5
+DEEPEN_START = 64
+DEEPEN_MAX = 4096
+# Above this many changed paths a full reset is as fast and keeps the command line short
+RESET_PATHS_LIMIT = 1000
+# gimer stages the resolved paths itself, so it can tell them from the ones left conflicted
+RERERE_CONFIG = {"rerere.enabled": "true", "rerere.autoUpdate": "false"}
+
+
+def fast_state_config() -> dict[str, str]:
+    """Config that keeps `git status` fast on large working copies.
 
-console = Console()
+    The untracked cache remembers which directories did not change, and
+    manyFiles selects a smaller index format. The built-in file system
+    monitor only exists on macOS and Windows.
+    """
+    config = {"core.untrackedCache": "true", "feature.manyFiles": "true"}
+    if platform.system().lower() in {System.MACOS, System.WINDOWS}:
+        config["core.fsmonitor"] = "true"
+    return config
+
+
+def _literal_pathspecs(paths: list[str]) -> list[str]:
+    return [f":(literal){path}" for path in paths]
 
 
 class GitError(Exception):
     pass
 
 
+class GitTimeoutError(GitError):
+    """Exception raised when a git command does not finish in time."""
+
+
 class UserAbortedError(Exception):
     """Exception raised when the user aborts the operation."""
 
 
+def _stop(process: "subprocess.Popen[str]") -> None:
+    """Stop a command started in a process group of its own.
+
+    git removes its lock files when it gets SIGTERM, so the group gets that
+    first and is only killed if it outlives the grace period.
+    """
+    if os.name != "posix":
+        process.kill()
+        process.communicate()
+        return
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            pass
+        try:
+            process.communicate(timeout=STOP_GRACE_PERIOD)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
 class Git:
-    def __init__(self, dry_run: bool = False, no_confirm: bool = False, confirm_all: bool = False) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        dry_run: bool = False,
+        no_confirm: bool = False,
+        confirm_all: bool = False,
+        clone_strategy: str = "full",
+        profiler: Profiler | None = None,
+        cwd: Path | None = None,
+    ) -> None:
         self.dry_run = dry_run
         self.no_confirm = no_confirm
         self.confirm_all = confirm_all
+        self.clone_strategy = clone_strategy
+        self.network_round_trips = 0
+        # Network commands that actually ran, as opposed to dry-run ones
+        self.network_commands_run = 0
+        # Conflicted paths resolved by replaying a recorded resolution
+        self.conflicts_auto_resolved = 0
+        self.profiler = profiler or Profiler()
+        # Commands run in `cwd`, so several instances can work on different
+        # repositories in one process; without it they follow the current directory
+        self.cwd = cwd
+        self._queries: RepositoryQueries | None = None
+        # `-c` options given to every command, e.g. by ConnectionSharing
+        self.config_args: tuple[str, ...] = ()
+        self.connection_sharing: ConnectionSharing | None = None
+
+    @property
+    def path(self) -> Path:
+        """The repository commands run in."""
+        return self.cwd or Path(os.getcwd())
+
+    @property
+    def queries(self) -> RepositoryQueries:
+        """In-process queries for the repository commands run in."""
+        path = self.path
+        if self._queries is None or self._queries.path != path:
+            if self._queries:
+                self._queries.close()
+            self._queries = RepositoryQueries(path)
+        return self._queries
 
     def _should_confirm(self, command: str) -> bool:
         if self.no_confirm:
@@ -31,71 +149,507 @@ class Git:
         # Check if command affects origin
         return command in {"push"}
 
-    def _run_git_command(self, *args: str, capture_output: bool = False) -> str | None:
-        console.print(f"[yellow]≫ git {' '.join(args)}[/yellow]")
+    @staticmethod
+    def _is_network_command(args: tuple[str, ...]) -> bool:
+        if args[0] == "-C":
+            args = args[2:]
+        if args[0] not in NETWORK_COMMANDS:
+            return False
+        remote = ""
+        remaining = iter(args[1:])
+        for arg in remaining:
+            if arg in OPTIONS_WITH_VALUE:
+                next(remaining, None)
+            elif not arg.startswith("-"):
+                remote = arg
+                break
+        # Fetching from `.` or from a repository on disk, and local clones, stay off the network
+        return not (remote == "." or Path(remote).is_absolute())
+
+    def _prepare_git_command(self, args: tuple[str, ...], echo: bool = True) -> bool:
+        """Print and confirm a command. Returns False when it must not be executed."""
+        if echo:
+            console.print(f"[yellow]≫ git {' '.join(args)}[/yellow]")
+        if self._is_network_command(args):
+            self.network_round_trips += 1
         if self.dry_run:
-            return None
+            return False
+        if self._is_network_command(args):
+            self.network_commands_run += 1
 
-        if self._should_confirm(args[0]) and not inquirer.confirm(_("Execute this command?"), default=True).execute():
-            raise UserAbortedError("Command execution cancelled by user")
+        if self._should_confirm(args[0]):
+            with self.profiler.span("confirm", Phase.PROMPT):
+                confirmed = inquirer.confirm(_("Execute this command?"), default=True).execute()
+            if not confirmed:
+                raise UserAbortedError("Command execution cancelled by user")
+        return True
+
+    def _run_git_command(
+        self, *args: str, capture_output: bool = False, check: bool = True, echo: bool = True,
+    ) -> str | None:
+        if not self._prepare_git_command(args, echo):
+            return None
 
         if capture_output:
             stderr = None
         else:
             stderr = subprocess.STDOUT
 
+        with self.profiler.span(f"git {' '.join(args)}", command_phase(args)) as event:
+            try:
+                result = subprocess.run(
+                    ["git", *self.config_args, *args],
+                    cwd=self.cwd,
+                    check=check,
+                    capture_output=capture_output,
+                    stderr=stderr,
+                    text=True
+                )
+            except subprocess.CalledProcessError as e:
+                event.exit_code = e.returncode
+                raise GitError(f"git {' '.join(args)} failed: {e.stderr}") from e
+            event.exit_code = result.returncode
+            if capture_output:
+                event.output_bytes = len(result.stdout.encode())
+                return result.stdout
+            return None
+
+    def _run_streamed_git_command(self, *args: str) -> None:
+        """Run a command with its output piped through gimer.
+
+        Progress lines are rendered as live progress bars, other lines are
+        printed as they arrive, and only the last lines are kept for the error
+        message, so memory stays bounded however much git prints.
+        """
+        if not self._prepare_git_command(args):
+            return
+
+        command = list(args)
+        subcommand = 2 if args[0] == "-C" else 0
+        if args[subcommand] in PROGRESS_COMMANDS and console.is_terminal:
+            command.insert(subcommand + 1, "--progress")
+
+        tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+        tasks: dict[str, int] = {}
+        with (
+            self.profiler.span(f"git {' '.join(args)}", command_phase(args)) as event,
+            Progress(console=console, transient=True) as progress,
+            subprocess.Popen(
+                ["git", *self.config_args, *command],
+                cwd=self.cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+            ) as process,
+        ):
+            assert process.stdout is not None
+            # Text mode turns the carriage returns of progress updates into line breaks
+            for raw_line in process.stdout:
+                event.output_bytes += len(raw_line.encode())
+                line = raw_line.rstrip("\n")
+                match = PROGRESS_PATTERN.match(line)
+                if match and not line.endswith("done."):
+                    title = match["title"]
+                    if title not in tasks:
+                        tasks[title] = progress.add_task(title, total=int(match["total"]))
+                    progress.update(tasks[title], completed=int(match["done"]))
+                elif line:
+                    tail.append(line)
+                    console.print(line, markup=False, highlight=False)
+            returncode = event.exit_code = process.wait()
+        if returncode != 0:
+            output = "\n".join(tail)
+            raise GitError(f"git {' '.join(args)} failed: {output}")
+
+    def _stream_git_command(self, *args: str) -> Generator[str, None, None]:
+        """Yield the output lines of a read-only command as they are produced.
+
+        Closing the iterator early stops the command.
+        """
+        if not self._prepare_git_command(args):
+            return
+
+        with (
+            self.profiler.span(f"git {' '.join(args)}", command_phase(args)) as event,
+            tempfile.TemporaryFile("w+") as stderr,
+            subprocess.Popen(
+                ["git", *self.config_args, *args], cwd=self.cwd, stdout=subprocess.PIPE, stderr=stderr, text=True,
+            ) as process,
+        ):
+            assert process.stdout is not None
+            try:
+                for line in process.stdout:
+                    event.output_bytes += len(line.encode())
+                    yield line.rstrip("\n")
+            except GeneratorExit:
+                process.kill()
+                raise
+            event.exit_code = process.wait()
+            if event.exit_code != 0:
+                stderr.seek(0)
+                raise GitError(f"git {' '.join(args)} failed: {stderr.read()}")
+
+    def _fetch_args(self) -> tuple[str, ...]:
+        # Partial clones keep their filter in the remote config, but a shallow
+        # clone has to be asked to stay shallow on every fetch, whatever
+        # --clone-strategy the current run was given.
+        return SHALLOW_FETCH_ARGS if self.is_shallow_repository() else ()
+
+    def clone_repository(self, repo_url: str, reference: Path | None = None) -> None:
+        args = CLONE_STRATEGIES[self.clone_strategy]
+        if reference:
+            args = (*args, "--reference-if-able", str(reference))
+        self._run_streamed_git_command("clone", *args, repo_url, str(self.path))
+
+    def create_bundle(self, bundle_path: Path) -> None:
+        """Write the remote-tracking branches and tags of the repository to a bundle file."""
+        self._run_git_command("bundle", "create", "--quiet", str(bundle_path), "--exclude=origin/HEAD", "--remotes=origin", "--tags")
+
+    def remote_url(self) -> str | None:
+        output = self._run_git_command("config", "--get", "remote.origin.url", capture_output=True, check=False)
+        return (output or "").strip() or None
+
+    def default_branch(self) -> str | None:
+        """Return the branch origin/HEAD points to, as recorded by the clone."""
         try:
-            result = subprocess.run(
-                ["git", *args],
-                check=True,
-                capture_output=capture_output,
-                stderr=stderr,
-                text=True
-            )
-            return result.stdout if capture_output else None
-        except subprocess.CalledProcessError as e:
-            raise GitError(f"git {' '.join(args)} failed: {e.stderr}") from e
-
-    def clone_repository(self, repo_url: str) -> None:
-        self._run_git_command("clone", repo_url, os.getcwd())
+            output = self._run_git_command("symbolic-ref", "--short", "refs/remotes/origin/HEAD", capture_output=True)
+        except GitError:
+            return None
+        return output.strip().removeprefix("origin/") if output else None
+
+    def import_bundle(self, bundle_path: Path, repo_url: str, head: str | None) -> None:
+        """Create the repository from a bundle made by create_bundle, as if it were cloned from `repo_url`.
+
+        Nothing is fetched from the remote; call fetch to catch up.
+        """
+        self._run_git_command("init", "--quiet", str(self.path))
+        self._run_git_command("remote", "add", "origin", repo_url)
+        self._run_git_command(
+            "fetch", "--quiet", str(bundle_path),
+            "+refs/remotes/origin/*:refs/remotes/origin/*", "+refs/tags/*:refs/tags/*",
+        )
+        if head:
+            self._run_git_command("remote", "set-head", "origin", head)
+            self._run_git_command("checkout", "--quiet", head)
+
+    def update_reference_store(self, store_path: Path, repo_url: str, namespace: str) -> None:
+        """Fetch a repository into the shared object store under its own namespace."""
+        if not (store_path / "HEAD").exists():
+            self._run_git_command("init", "--bare", str(store_path))
+        # Clones borrow objects the store's own refs may no longer reach after a
+        # forced update, so gc must never prune them; set on every update so
+        # stores created before this setting get it too
+        self._run_git_command("-C", str(store_path), "config", "gc.pruneExpire", "never")
+        self._run_streamed_git_command(
+            "-C", str(store_path), "fetch", "--no-tags", repo_url,
+            f"+refs/heads/*:refs/remotes/{namespace}/*",
+        )
+
+    def link_reference_store(self, store_path: Path) -> None:
+        """Let an existing clone borrow objects from the shared object store."""
+        alternates = self.path / ".git" / "objects" / "info" / "alternates"
+        objects_dir = str(store_path / "objects")
+        if alternates.exists() and objects_dir in alternates.read_text().splitlines():
+            return
+        console.print(f"[yellow]≫ echo {objects_dir} >> {alternates}[/yellow]")
+        if self.dry_run or not (store_path / "objects").exists():
+            return
+        alternates.parent.mkdir(parents=True, exist_ok=True)
+        with alternates.open("a") as f:
+            f.write(f"{objects_dir}\n")
+
+    def create_workspace(self, cache_path: Path, workspace_path: Path, repo_url: str) -> None:
+        """Make a working copy of a cached repository, hardlinking its objects instead of copying them.
+
+        The working copy pushes to the real remote, its remote-tracking
+        branches are those of the cache, and it has no local branches, so
+        leftovers in the cache cannot leak into a job.
+        """
+        workspace = ("-C", str(workspace_path))
+        self._run_git_command("clone", "--quiet", "--local", str(cache_path), str(workspace_path))
+        self._run_git_command(*workspace, "remote", "set-url", "origin", repo_url)
+        # The clone maps the local branches of the cache to origin/*; pruning
+        # drops those that are not remote branches of the cache
+        self._run_git_command(
+            *workspace, "fetch", "--quiet", "--no-tags", "--prune", str(cache_path),
+            "+refs/remotes/origin/*:refs/remotes/origin/*",
+        )
+        branch = self._run_git_command(*workspace, "symbolic-ref", "--short", "HEAD", capture_output=True)
+        self._run_git_command(*workspace, "checkout", "--quiet", "--detach")
+        if branch:
+            self._run_git_command(*workspace, "branch", "--quiet", "-D", branch.strip())
+
+    def update_cache(self, cache_path: Path, workspace_path: Path) -> None:
+        """Bring the remote-tracking branches fetched in a working copy back into the cache."""
+        self._run_git_command(
+            "-C", str(cache_path), "fetch", "--quiet", "--no-tags", str(workspace_path),
+            "+refs/remotes/origin/*:refs/remotes/origin/*",
+        )
+
+    def is_partial_clone(self) -> bool:
+        """Check if the repository leaves objects on the remote, as blobless and treeless clones do."""
+        if not self.queries.is_repository():
+            return False
+        output = self._run_git_command("config", "--bool", "--get", "remote.origin.promisor", capture_output=True, check=False)
+        return (output or "").strip() == "true"
 
     def get_branches(self) -> list[str]:
-        branches = self._run_git_command("branch", "--format=%(refname:short)", "--remotes", capture_output=True)
-        if not branches:
-            return []
-        return [b.replace("origin/", "") for b in branches.splitlines() if b and b != "origin/HEAD"]
+        return self.queries.remote_branches()
+
+    def configure_fast_state(self) -> None:
+        """Turn on the config that keeps status checks fast, once per repository."""
+        if not self.queries.is_repository():
+            return
+        current = self.queries.config_values(list(fast_state_config()))
+        for key, value in fast_state_config().items():
+            if current[key] != value:
+                self._run_git_command("config", key, value)
+
+    def enable_rerere(self, store_path: Path) -> None:
+        """Record conflict resolutions and replay them, keeping them in a store shared by all clones.
+
+        The rr-cache of the clone becomes a link to the store, so resolutions
+        outlive --cleanup and serve forks too. Where links cannot be made,
+        e.g. on Windows without developer mode, they stay in the clone.
+        """
+        if not self.queries.is_repository():
+            return
+        current = self.queries.config_values(list(RERERE_CONFIG))
+        for key, value in RERERE_CONFIG.items():
+            if current[key] != value:
+                self._run_git_command("config", key, value)
+        rr_cache = self.path / ".git" / "rr-cache"
+        if rr_cache.is_symlink() and rr_cache.resolve() == store_path.resolve():
+            return
+        console.print(f"[yellow]≫ ln -s {store_path} {rr_cache}[/yellow]")
+        if self.dry_run:
+            return
+        store_path.mkdir(parents=True, exist_ok=True)
+        # Make the link first, so the clone keeps its rr-cache where links cannot be made
+        link = rr_cache.with_name("rr-cache.link")
+        link.unlink(missing_ok=True)
+        try:
+            link.symlink_to(store_path, target_is_directory=True)
+        except OSError:
+            return
+        if rr_cache.is_dir() and not rr_cache.is_symlink():
+            # Keep the resolutions recorded before the store was shared
+            shutil.copytree(rr_cache, store_path, dirs_exist_ok=True)
+            shutil.rmtree(rr_cache)
+        link.replace(rr_cache)
+
+    def get_unmerged_paths(self) -> list[str]:
+        """List the paths a failed merge left conflicted."""
+        unmerged = self._run_git_command("diff", "--name-only", "-z", "--diff-filter=U", capture_output=True) or ""
+        return [path for path in unmerged.split("\0") if path]
+
+    def get_recorded_resolutions(self) -> tuple[list[str], list[str]]:
+        """Split the conflicted paths of a merge into those git rerere resolved and those left.
+
+        With rerere.autoUpdate off, resolved paths stay unmerged in the index
+        but `git rerere remaining` no longer lists them.
+        """
+        paths = self.get_unmerged_paths()
+        remaining = self._run_git_command("rerere", "remaining", capture_output=True) or ""
+        left = set(remaining.splitlines())
+        return [path for path in paths if path not in left], [path for path in paths if path in left]
+
+    def stage_paths(self, paths: list[str]) -> None:
+        self._run_git_command("add", "--", *_literal_pathspecs(paths))
 
     def check_working_directory_clean(self) -> bool:
-        status = self._run_git_command("status", "--porcelain", capture_output=True)
-        return not status
+        # The first line of output is enough to know the tree is dirty
+        with closing(self._stream_git_command("status", "--porcelain", "--no-renames")) as status:
+            return next(status, None) is None
+
+    def get_changed_paths(self) -> tuple[list[str], list[str]] | None:
+        """List the tracked paths with local changes and the untracked paths.
+
+        Returns None in a dry run.
+        """
+        output = self._run_git_command("status", "--porcelain", "-z", "--no-renames", capture_output=True)
+        if output is None:
+            return None
+        tracked: list[str] = []
+        untracked: list[str] = []
+        for entry in output.split("\0"):
+            if entry:
+                (untracked if entry.startswith("??") else tracked).append(entry[3:])
+        return tracked, untracked
 
     def clean_working_directory(self) -> None:
+        """Discard local changes, touching only the paths that changed.
+
+        A merge in progress, or too many changes, take a full reset.
+        """
+        changed = None if self.is_merge_in_progress() else self.get_changed_paths()
+        if changed is not None and sum(map(len, changed)) <= RESET_PATHS_LIMIT:
+            tracked, untracked = changed
+            try:
+                if tracked:
+                    self._run_git_command(
+                        "restore", "--source=HEAD", "--staged", "--worktree", "--", *_literal_pathspecs(tracked),
+                    )
+                if untracked:
+                    self._run_git_command("clean", "-fdx", "--", *_literal_pathspecs(untracked))
+                return
+            except GitError:
+                pass
         self._run_git_command("clean", "-fdx")
         self._run_git_command("reset", "--hard")
 
     def checkout_branch(self, branch: str) -> None:
         self._run_git_command("checkout", branch)
 
-    def fetch(self) -> None:
-        self._run_git_command("fetch", "origin")
+    def fetch(self, quiet: bool = False) -> None:
+        """Fetch all branches. A quiet fetch prints nothing, e.g. while a prompt owns the terminal."""
+        if quiet:
+            self._run_git_command("fetch", *self._fetch_args(), "origin", capture_output=True, echo=False)
+        else:
+            self._run_streamed_git_command("fetch", *self._fetch_args(), "origin")
+
+    def fetch_branches(self, branches: list[str]) -> None:
+        """Update the remote-tracking refs of the given branches in one fetch."""
+        refspecs = [f"+refs/heads/{b}:refs/remotes/origin/{b}" for b in dict.fromkeys(branches)]
+        self._run_streamed_git_command("fetch", *self._fetch_args(), "origin", *refspecs)
+
+    def update_branch(self, branch: str) -> None:
+        """Move a branch that is not checked out to its fetched remote-tracking ref.
 
-    def pull_branch(self, branch: str) -> None:
-        self._run_git_command("pull", "origin", branch)
+        The cached branch mirrors the remote, so it follows force-pushes and
+        drops commits left behind by an aborted run.
+        """
+        self._run_git_command("fetch", ".", f"+refs/remotes/origin/{branch}:refs/heads/{branch}")
+
+    def update_current_branch(self, branch: str) -> None:
+        """Bring the checked out branch up to date with its fetched remote-tracking ref."""
+        # A shallow fetch cuts the remote-tracking ref off from the history of
+        # the local branch whenever the remote moved by more than one commit
+        self.ensure_merge_base(branch, f"origin/{branch}")
+        self._run_streamed_git_command("merge", "--no-edit", f"origin/{branch}")
 
     def push_branch(self, branch: str) -> None:
-        self._run_git_command("push", "origin", branch)
+        self._run_streamed_git_command("push", "origin", branch)
+
+    def push_branches(self, branches: list[str]) -> None:
+        """Push several branches in one atomic push: all of them are updated or none."""
+        self._run_streamed_git_command("push", "--atomic", "origin", *dict.fromkeys(branches))
 
     def merge_branch(self, target_branch: str) -> None:
-        self._run_git_command("merge", "--no-edit", target_branch)
+        self._run_streamed_git_command("merge", "--no-edit", target_branch)
+
+    def merge_octopus(self, branches: list[str]) -> None:
+        """Merge several branches into the current one with a single octopus merge commit."""
+        self._run_streamed_git_command("merge", "--no-edit", *branches)
+
+    def rev_parse(self, ref: str) -> str:
+        """Resolve a ref to a commit hash."""
+        if self.dry_run:
+            return ref
+        commit = self.queries.resolve(ref)
+        if commit is None:
+            raise GitError(f"Unknown revision: {ref}")
+        return commit
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Check if a commit is reachable from another commit."""
+        try:
+            self._run_git_command("merge-base", "--is-ancestor", ancestor, descendant, capture_output=True)
+            return True
+        except GitError:
+            return False
+
+    def are_ancestors(self, pairs: list[tuple[str, str]]) -> list[bool]:
+        """Check several (ancestor, descendant) pairs."""
+        return [self.is_ancestor(ancestor, descendant) for ancestor, descendant in pairs]
+
+    def run_with_timeout(self, *args: str, timeout: float) -> None:
+        """Run a command, and stop it together with the processes it started once `timeout` seconds pass.
+
+        Raises:
+            GitTimeoutError: If the command was stopped
+            GitError: If the command failed
+        """
+        if not self._prepare_git_command(args):
+            return
+        with (
+            self.profiler.span(f"git {' '.join(args)}", command_phase(args)) as event,
+            subprocess.Popen(
+                ["git", *self.config_args, *args],
+                cwd=self.cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                # A process group of its own lets _stop reach the children that hold the pipes
+                start_new_session=os.name == "posix",
+            ) as process,
+        ):
+            try:
+                _stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                _stop(process)
+                raise GitTimeoutError(f"git {' '.join(args)} timed out after {timeout:.1f}s") from None
+            event.exit_code = process.returncode
+        if process.returncode != 0:
+            raise GitError(f"git {' '.join(args)} failed: {stderr}")
+
+    def merge_tree(self, target: str, source: str) -> tuple[str, list[str]]:
+        """Merge two commits in the object database without touching the working tree.
+
+        Returns the hash of the merged tree and the list of conflicted files.
+        """
+        output = self._run_git_command(
+            "merge-tree", "--write-tree", "--name-only", "--no-messages", target, source,
+            capture_output=True,
+            check=False,
+        )
+        if self.dry_run:
+            return "", []
+        lines = (output or "").splitlines()
+        if not lines:
+            raise GitError(f"git merge-tree {target} {source} failed")
+        return lines[0], lines[1:]
+
+    def commit_tree(self, tree: str, parents: list[str], message: str) -> str:
+        """Create a commit object for a tree without touching any branch."""
+        parent_args = [arg for parent in parents for arg in ("-p", parent)]
+        output = self._run_git_command("commit-tree", tree, *parent_args, "-m", message, capture_output=True)
+        return output.strip() if output else "<merge-commit>"
+
+    def push_commit(self, commit: str, branch: str) -> None:
+        self._run_streamed_git_command("push", "origin", f"{commit}:refs/heads/{branch}")
 
     def is_merge_in_progress(self) -> bool:
         """Check if a merge is in progress."""
+        return self.queries.is_merge_in_progress()
+
+    def has_merge_base(self, branch: str, other: str) -> bool:
+        """Check if the history of both branches is deep enough to find a merge base."""
         try:
-            self._run_git_command("rev-parse", "--verify", "MERGE_HEAD", capture_output=True)
+            self._run_git_command("merge-base", branch, other, capture_output=True)
             return True
         except GitError:
             return False
 
+    def is_shallow_repository(self) -> bool:
+        # git lists the cut-off commits of a shallow repository in .git/shallow
+        return (self.path / ".git" / "shallow").is_file()
+
+    def ensure_merge_base(self, branch: str, other: str) -> None:
+        """Deepen a shallow clone until the merge base of both branches is reachable."""
+        if self.dry_run or not self.is_shallow_repository():
+            return
+        depth = DEEPEN_START
+        while not self.has_merge_base(branch, other):
+            if not self.is_shallow_repository():
+                return
+            if depth > DEEPEN_MAX:
+                self._run_streamed_git_command("fetch", "--unshallow", "origin")
+                return
+            self._run_streamed_git_command("fetch", f"--deepen={depth}", "origin")
+            depth *= 2
+
     def resolve_conflicts(self) -> None:
         """Open editor to resolve merge conflicts."""
         self._run_git_command("mergetool")
@@ -104,6 +658,6 @@ class Git:
         """Abort the current merge operation."""
         self._run_git_command("merge", "--abort")
 
-    def commit_merge(self) -> None:
+    def commit_merge(self, edit: bool = True) -> None:
         """Commit the merge after conflict resolution."""
-        self._run_git_command("commit")
+        self._run_git_command("commit", *(() if edit else ("--no-edit",)))
@@ -0,0 +1,230 @@
+"""Minimal GitHub REST client for merges that need no clone.
+
+Only the standard library is used, so the client loads fast and works in
+fleet workers. GET responses are cached with their ETag and revalidated with
+conditional requests, which GitHub does not count against the rate limit.
+"""
+
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from gimer.profiling import Phase, Profiler
+
+API_URL = "https://api.github.com"
+API_VERSION = "2022-11-28"
+REQUEST_TIMEOUT = 30
+# Longer waits for the rate limit fail instead, so a run never hangs for an hour
+MAX_RATE_LIMIT_WAIT = 60
+MAX_RETRIES = 3
+ETAG_CACHE_ENTRIES = 500
+NEXT_LINK_PATTERN = re.compile(r'<(?P<url>[^>]+)>;\s*rel="next"')
+
+
+class GitHubAPIError(Exception):
+    """Exception raised when the GitHub API rejects a request."""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RateLimitError(GitHubAPIError):
+    """Exception raised when the rate limit resets later than gimer is willing to wait."""
+
+
+class MergeResult:
+    MERGED = "merged"
+    UP_TO_DATE = "up to date"
+    CONFLICT = "conflict"
+
+
+def get_api_url() -> str:
+    """Return the API root, which GIMER_GITHUB_API_URL overrides for GitHub Enterprise or tests."""
+    return os.environ.get("GIMER_GITHUB_API_URL", API_URL).rstrip("/")
+
+
+def parse_repository(repo_url: str) -> tuple[str, str]:
+    """Return the owner and name of a repository URL, e.g. https://github.com/user/repo.git
+
+    SSH URLs such as git@github.com:user/repo.git are accepted too.
+    """
+    parts = repo_url.rstrip("/").split("/")
+    assert len(parts) >= 2, f"Invalid GitHub URL: {repo_url}"  # noqa: PLR2004
+    return parts[-2].rsplit(":", 1)[-1], parts[-1].removesuffix(".git")
+
+
+class ETagCache:
+    """Bodies of GET responses by URL, with the ETag to revalidate them."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: dict[str, dict[str, Any]] | None = None
+
+    @property
+    def entries(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        return self.entries.get(url)
+
+    def put(self, url: str, etag: str, body: Any, next_url: str | None) -> None:
+        self.entries.pop(url, None)
+        self.entries[url] = {"etag": etag, "body": body, "next": next_url}
+        # Entries are kept in the order they were stored, oldest first
+        for stale in list(self.entries)[:-ETAG_CACHE_ENTRIES]:
+            del self.entries[stale]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.entries))
+        tmp_path.replace(self.path)
+
+
+class GitHubClient:
+    """The few endpoints of one repository that a server-side merge needs."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        token: str,
+        owner: str,
+        repo: str,
+        base_url: str | None = None,
+        cache: ETagCache | None = None,
+        profiler: Profiler | None = None,
+        on_wait: Callable[[float], None] | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.token = token
+        self.owner = owner
+        self.repo = repo
+        self.base_url = base_url or get_api_url()
+        self.cache = cache
+        self.profiler = profiler or Profiler()
+        self.on_wait = on_wait
+        self.sleep = sleep
+        self.requests = 0
+
+    @property
+    def repo_path(self) -> str:
+        return f"/repos/{self.owner}/{self.repo}"
+
+    def _rate_limit_wait(self, status: int, headers: Any) -> float | None:
+        """Return how long to wait before retrying a rate-limited request, or None if it was not."""
+        if status not in {403, 429}:
+            return None
+        if headers.get("Retry-After"):
+            # Secondary rate limits say how long to back off
+            return float(headers["Retry-After"])
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+        return None
+
+    def _request(self, method: str, url: str, body: dict | None = None) -> tuple[int, Any, Any]:
+        """Send a request, waiting out short rate limits. Returns the status, headers and JSON body."""
+        if url.startswith("/"):
+            url = f"{self.base_url}{url}"
+        cached = self.cache.get(url) if self.cache and method == "GET" else None
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.token}",
+            "User-Agent": "gimer",
+            "X-GitHub-Api-Version": API_VERSION,
+        }
+        if cached:
+            headers["If-None-Match"] = cached["etag"]
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(MAX_RETRIES + 1):
+            request = urllib.request.Request(url, data=data, headers=headers, method=method)
+            phase = Phase.FETCH if method == "GET" else Phase.MERGE
+            with self.profiler.span(f"{method} {url.removeprefix(self.base_url)}", phase) as event:
+                self.requests += 1
+                try:
+                    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                        status, response_headers, raw = response.status, response.headers, response.read()
+                except urllib.error.HTTPError as e:
+                    status, response_headers, raw = e.code, e.headers, e.read()
+                except urllib.error.URLError as e:
+                    raise GitHubAPIError(f"{method} {url} failed: {e.reason}") from e
+                event.exit_code = status
+                event.output_bytes = len(raw)
+
+            wait = self._rate_limit_wait(status, response_headers)
+            if wait is None:
+                break
+            if wait > MAX_RATE_LIMIT_WAIT or attempt == MAX_RETRIES:
+                reset = time.strftime("%H:%M:%S", time.localtime(time.time() + wait))
+                raise RateLimitError(f"GitHub API rate limit exceeded until {reset}", status)
+            if self.on_wait:
+                self.on_wait(wait)
+            self.sleep(wait)
+
+        if status == 304 and cached:  # noqa: PLR2004
+            return 200, {"Link": cached["next"] and f'<{cached["next"]}>; rel="next"'}, cached["body"]
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError as e:
+            # Proxies and outages answer with HTML
+            raise self._error(status, None) from e
+        if method == "GET" and self.cache is not None and status == 200 and response_headers.get("ETag"):  # noqa: PLR2004
+            self.cache.put(url, response_headers["ETag"], payload, self._next_url(response_headers))
+        return status, response_headers, payload
+
+    @staticmethod
+    def _next_url(headers: Any) -> str | None:
+        match = NEXT_LINK_PATTERN.search(headers.get("Link") or "")
+        return match["url"] if match else None
+
+    @staticmethod
+    def _error(status: int, payload: Any) -> GitHubAPIError:
+        message = payload.get("message") if isinstance(payload, dict) else None
+        return GitHubAPIError(f"GitHub API error {status}: {message or 'no details'}", status)
+
+    def list_branches(self) -> list[str]:
+        """List the branch names, following pagination."""
+        branches: list[str] = []
+        url: str | None = f"{self.repo_path}/branches?per_page=100"
+        try:
+            while url:
+                status, headers, payload = self._request("GET", url)
+                if status != 200:  # noqa: PLR2004
+                    raise self._error(status, payload)
+                branches.extend(branch["name"] for branch in payload)
+                url = self._next_url(headers)
+        finally:
+            if self.cache:
+                self.cache.save()
+        return branches
+
+    def merge(self, base: str, head: str, message: str) -> tuple[str, str | None]:
+        """Merge `head` into `base` on the server.
+
+        Returns:
+            tuple[str, str | None]: A MergeResult and the hash of the merge commit
+        """
+        status, _headers, payload = self._request(
+            "POST", f"{self.repo_path}/merges", {"base": base, "head": head, "commit_message": message},
+        )
+        if status == 201:  # noqa: PLR2004
+            return MergeResult.MERGED, payload["sha"]
+        if status == 204:  # noqa: PLR2004
+            return MergeResult.UP_TO_DATE, None
+        if status == 409:  # noqa: PLR2004
+            return MergeResult.CONFLICT, None
+        raise self._error(status, payload)
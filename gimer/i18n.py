@@ -1,12 +1,18 @@
 """Internationalization utilities for gimer."""
 
 import gettext
+from functools import cache
 from pathlib import Path
 
-# Initialize gettext
 LOCALE_DIR = Path(__file__).parent / "locale"
-gettext.bindtextdomain("gimer", str(LOCALE_DIR))
-gettext.textdomain("gimer")
 
-# Create translation function
-_ = gettext.gettext
+
+@cache
+def _translation() -> gettext.NullTranslations:
+    # Loaded on the first translated message instead of at import time
+    return gettext.translation("gimer", str(LOCALE_DIR), fallback=True)
+
+
+def _(message: str) -> str:
+    """Translate a message."""
+    return _translation().gettext(message)
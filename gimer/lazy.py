@@ -0,0 +1,56 @@
+"""Deferred imports to keep the CLI startup fast."""
+
+import importlib
+from collections.abc import Callable
+from typing import Any
+
+
+class LazyObject:
+    """Proxy that creates the wrapped object on first use."""
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_target", None)
+
+    def _resolve(self) -> Any:
+        target = object.__getattribute__(self, "_target")
+        if target is None:
+            target = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_target", target)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __enter__(self) -> Any:
+        return self._resolve().__enter__()
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._resolve().__exit__(*exc_info)
+
+
+def lazy_import(module: str, attribute: str | None = None) -> Any:
+    """Import a module, or an attribute of it, when it is first used.
+
+    Args:
+        module (str): Module name
+            Example: rich.prompt
+        attribute (str | None): Attribute of the module
+            Example: Confirm
+
+    Returns:
+        Any: Proxy for the module or attribute
+    """
+    def load() -> Any:
+        imported = importlib.import_module(module)
+        return getattr(imported, attribute) if attribute else imported
+    return LazyObject(load)
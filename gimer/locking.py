@@ -0,0 +1,119 @@
+"""Advisory locks that keep concurrent gimer runs out of each other's repositories."""
+
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from pathlib import Path
+from typing import IO
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+
+class LockTimeoutError(Exception):
+    """Exception raised when a repository stays locked for longer than the timeout."""
+
+
+def _try_lock(f: IO[str], exclusive: bool) -> bool:
+    try:
+        if sys.platform == "win32":
+            # Windows has no shared file locks, so readers are serialized too
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f: IO[str]) -> None:
+    if sys.platform == "win32":
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RepositoryLock:
+    """A read/write lock on a cached repository, shared by all gimer processes.
+
+    Runs that change the working copy hold it exclusively, read-only runs
+    share it. The lock file sits next to the repository directory, so it can
+    be taken before the clone and is never deleted while others may wait on it.
+    Taking it exclusively while it is held shared upgrades it for the duration
+    of the inner block.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        timeout: float | None = None,
+        on_wait: Callable[[], None] | None = None,
+    ) -> None:
+        self.repo_path = repo_path
+        self.path = repo_path.with_name(f"{repo_path.name}.lock")
+        self.timeout = timeout
+        self.on_wait = on_wait
+        self._file: IO[str] | None = None
+        self._exclusive = False
+
+    def shared(self) -> AbstractContextManager[None]:
+        return self._acquire(exclusive=False)
+
+    def exclusive(self) -> AbstractContextManager[None]:
+        return self._acquire(exclusive=True)
+
+    def _wait(self, f: IO[str], exclusive: bool) -> None:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        delay = POLL_INTERVAL
+        waiting = False
+        while not _try_lock(f, exclusive):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockTimeoutError(f"{self.repo_path} is locked by another gimer run")
+            if not waiting and self.on_wait:
+                self.on_wait()
+            waiting = True
+            remaining = MAX_POLL_INTERVAL if deadline is None else max(deadline - time.monotonic(), 0)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+
+    @contextmanager
+    def _acquire(self, exclusive: bool) -> Iterator[None]:
+        if self._file is not None:
+            with self._convert(self._file, exclusive):
+                yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            self._wait(f, exclusive)
+            self._file, self._exclusive = f, exclusive
+            try:
+                yield
+            finally:
+                self._file, self._exclusive = None, False
+                _unlock(f)
+
+    @contextmanager
+    def _convert(self, f: IO[str], exclusive: bool) -> Iterator[None]:
+        """Upgrade a shared lock held on `f` for the inner block, then share it again.
+
+        Neither conversion is atomic, so another run may take the lock while
+        it changes hands. Windows locks are always exclusive already.
+        """
+        if not exclusive or self._exclusive or sys.platform == "win32":
+            yield
+            return
+        self._wait(f, exclusive=True)
+        self._exclusive = True
+        try:
+            yield
+        finally:
+            self._exclusive = False
+            self._wait(f, exclusive=False)
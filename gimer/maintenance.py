@@ -0,0 +1,149 @@
+"""Incremental maintenance of cached repositories, run within a time budget."""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from gimer.git import Git, GitError, GitTimeoutError
+from gimer.locking import LockTimeoutError, RepositoryLock
+from gimer.repositories import get_repos_path
+
+# Cheapest and most useful first, so a short budget still writes the commit-graph.
+# incremental-repack also writes the multi-pack-index. prefetch needs the network.
+MAINTENANCE_TASKS = ("commit-graph", "loose-objects", "incremental-repack", "prefetch")
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+TIMING_RUNS = 3
+
+
+@dataclass
+class MaintenanceReport:
+    repo_path: Path
+    completed: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    before: dict[str, float] = field(default_factory=dict)
+    after: dict[str, float] = field(default_factory=dict)
+
+
+def _state_path(repo_path: Path) -> Path:
+    return repo_path / ".git" / "gimer" / "maintenance.json"
+
+
+def last_run(repo_path: Path) -> float | None:
+    try:
+        return float(json.loads(_state_path(repo_path).read_text())["last_run"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def is_due(repo_path: Path, interval: float = MAINTENANCE_INTERVAL) -> bool:
+    """Return whether a cached repository has not been maintained for `interval` seconds."""
+    if not (repo_path / ".git").is_dir():
+        return False
+    previous = last_run(repo_path)
+    return previous is None or time.time() - previous >= interval
+
+
+def _record_run(repo_path: Path) -> None:
+    path = _state_path(repo_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"last_run": time.time()}))
+    tmp_path.replace(path)
+
+
+def measure(git: Git) -> dict[str, float]:
+    """Time the read-only commands gimer depends on, best of a few runs."""
+    commands = {"merge-base": ("merge-base", "HEAD", "origin/HEAD"), "status": ("status", "--porcelain")}
+    timings = {}
+    for name, args in commands.items():
+        best = None
+        for _run in range(TIMING_RUNS):
+            start = time.perf_counter()
+            result = subprocess.run(["git", *args], cwd=git.path, capture_output=True, check=False)
+            elapsed = time.perf_counter() - start
+            if result.returncode != 0:
+                break
+            best = elapsed if best is None else min(best, elapsed)
+        if best is not None:
+            timings[name] = best
+    return timings
+
+
+def run_maintenance(
+    git: Git,
+    time_budget: float,
+    tasks: tuple[str, ...] = MAINTENANCE_TASKS,
+) -> MaintenanceReport:
+    """Run maintenance tasks one at a time until the time budget is spent.
+
+    A task still running when the budget runs out is stopped; git keeps the
+    objects it already wrote consistent, and the next run continues from there.
+    """
+    report = MaintenanceReport(git.path)
+    report.before = measure(git)
+    deadline = time.monotonic() + time_budget
+    for task in tasks:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            report.skipped.append(task)
+            continue
+        try:
+            git.run_with_timeout("maintenance", "run", "--quiet", f"--task={task}", timeout=remaining)
+        except GitTimeoutError:
+            # The stopped command removed its lock files on SIGTERM
+            report.skipped.append(task)
+        except GitError:
+            report.failed.append(task)
+        else:
+            report.completed.append(task)
+    if not git.dry_run:
+        _record_run(git.path)
+    report.after = measure(git)
+    return report
+
+
+def maintain_repository(repo_path: Path, time_budget: float, dry_run: bool = False) -> MaintenanceReport | None:
+    """Maintain one cached repository, unless a gimer run is using it right now.
+
+    The repository lock is only checked, not held, so a merge started during
+    maintenance is not kept waiting; git's own locks keep the two apart.
+    """
+    try:
+        with RepositoryLock(repo_path, timeout=0).shared():
+            pass
+    except LockTimeoutError:
+        return None
+    return run_maintenance(Git(dry_run=dry_run, no_confirm=True, cwd=repo_path), time_budget)
+
+
+def _gimer_command() -> list[str]:
+    if getattr(sys, "frozen", False):
+        return [sys.executable]
+    return [sys.executable, "-m", "gimer.cli"]
+
+
+def schedule(repo_paths: list[Path], time_budget: float) -> bool:
+    """Maintain the repositories that are due in a detached background process.
+
+    Returns:
+        bool: Whether a background process was started
+    """
+    due = [path for path in repo_paths if is_due(path)]
+    if not due or time_budget <= 0:
+        return False
+    log_path = get_repos_path().parent / "maintenance.log"
+    command = [*_gimer_command(), "cache", "maintain", "--time-budget", str(time_budget), *map(str, due)]
+    with open(os.devnull) as devnull, log_path.open("a") as log:
+        if sys.platform == "win32":
+            subprocess.Popen(
+                command, stdin=devnull, stdout=log, stderr=log,
+                creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
+            )
+        else:
+            subprocess.Popen(command, stdin=devnull, stdout=log, stderr=log, start_new_session=True)
+    return True
@@ -0,0 +1,137 @@
+"""Timing of git commands and prompts."""
+
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+class Phase:
+    CLONE = "clone"
+    FETCH = "fetch"
+    CHECKOUT = "checkout"
+    MERGE = "merge"
+    PUSH = "push"
+    PROMPT = "prompt"
+    OTHER = "other"
+
+
+COMMAND_PHASES = {
+    "clone": Phase.CLONE,
+    "init": Phase.CLONE,
+    "fetch": Phase.FETCH,
+    "pull": Phase.FETCH,
+    "ls-remote": Phase.FETCH,
+    "checkout": Phase.CHECKOUT,
+    "status": Phase.CHECKOUT,
+    "clean": Phase.CHECKOUT,
+    "reset": Phase.CHECKOUT,
+    "merge": Phase.MERGE,
+    "merge-base": Phase.MERGE,
+    "merge-tree": Phase.MERGE,
+    "commit-tree": Phase.MERGE,
+    "mergetool": Phase.MERGE,
+    "commit": Phase.MERGE,
+    "rev-parse": Phase.MERGE,
+    "push": Phase.PUSH,
+}
+SLOWEST_COMMANDS = 10
+
+
+def command_phase(args: tuple[str, ...]) -> str:
+    """Return the phase a git command belongs to."""
+    if args[0] == "-C":
+        args = args[2:]
+    # `git fetch . <refspec>` fast-forwards a local branch
+    if args[0] == "fetch" and "." in args:
+        return Phase.CHECKOUT
+    return COMMAND_PHASES.get(args[0], Phase.OTHER)
+
+
+@dataclass
+class TraceEvent:
+    name: str
+    phase: str
+    start: float
+    duration: float = 0.0
+    exit_code: int | None = None
+    output_bytes: int = 0
+    thread: int = field(default_factory=threading.get_ident)
+
+
+class Profiler:
+    """Record the wall time of every git command and prompt in a run."""
+
+    def __init__(self) -> None:
+        self.events: list[TraceEvent] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, phase: str) -> Iterator[TraceEvent]:
+        event = TraceEvent(name, phase, time.perf_counter() - self._origin)
+        try:
+            yield event
+        finally:
+            event.duration = time.perf_counter() - self._origin - event.start
+            self.events.append(event)
+
+    def phase_totals(self) -> dict[str, float]:
+        totals: dict[str, float] = {}
+        for event in self.events:
+            totals[event.phase] = totals.get(event.phase, 0.0) + event.duration
+        return totals
+
+    def print_summary(self, console: Any) -> None:
+        from rich.table import Table  # noqa: PLC0415
+
+        elapsed = time.perf_counter() - self._origin
+        phases = Table(title="Time by phase")
+        phases.add_column("Phase")
+        phases.add_column("Commands", justify="right")
+        phases.add_column("Time", justify="right")
+        phases.add_column("Share", justify="right")
+        totals = self.phase_totals()
+        for phase, total in sorted(totals.items(), key=lambda item: -item[1]):
+            count = sum(1 for e in self.events if e.phase == phase)
+            phases.add_row(phase, str(count), f"{total:.3f}s", f"{total / elapsed:.0%}" if elapsed else "-")
+        phases.add_row("total", str(len(self.events)), f"{elapsed:.3f}s", "100%", style="bold")
+        console.print(phases)
+
+        commands = Table(title="Slowest commands")
+        commands.add_column("Command", overflow="fold")
+        commands.add_column("Phase")
+        commands.add_column("Time", justify="right")
+        commands.add_column("Exit", justify="right")
+        commands.add_column("Output", justify="right")
+        for event in sorted(self.events, key=lambda e: -e.duration)[:SLOWEST_COMMANDS]:
+            exit_code = "-" if event.exit_code is None else str(event.exit_code)
+            commands.add_row(event.name, event.phase, f"{event.duration:.3f}s", exit_code, f"{event.output_bytes}B")
+        console.print(commands)
+
+    def write_trace(self, path: Path) -> None:
+        """Write the events as a Chrome trace (.json) or as JSON lines (any other suffix)."""
+        if path.suffix == ".json":
+            trace = {
+                "traceEvents": [
+                    {
+                        "name": e.name,
+                        "cat": e.phase,
+                        "ph": "X",
+                        "ts": round(e.start * 1_000_000),
+                        "dur": round(e.duration * 1_000_000),
+                        "pid": 1,
+                        "tid": e.thread,
+                        "args": {"exit_code": e.exit_code, "output_bytes": e.output_bytes},
+                    }
+                    for e in self.events
+                ],
+            }
+            path.write_text(json.dumps(trace))
+            return
+        with path.open("w") as f:
+            for event in self.events:
+                f.write(json.dumps(asdict(event)) + "\n")
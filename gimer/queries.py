@@ -0,0 +1,89 @@
+"""Read-only repository queries answered in-process."""
+
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from git import Repo
+
+
+class RepositoryQueries:
+    """Answer ref and merge-state questions without spawning git for each one.
+
+    Refs are read straight from the repository files by GitPython. Object
+    lookups go through one persistent `git cat-file --batch-check` process
+    that GitPython keeps open for the lifetime of the repository object.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @cached_property
+    def repo(self) -> "Repo":
+        # GitPython is imported here to keep it out of the CLI startup path
+        from git import Repo  # noqa: PLC0415
+
+        return Repo(self.path)
+
+    def is_repository(self) -> bool:
+        return (self.path / ".git").exists()
+
+    def remote_branches(self, remote: str = "origin") -> list[str]:
+        """List the remote-tracking branches of a remote, without the remote prefix."""
+        if not self.is_repository():
+            return []
+        refs = self.repo.remote(remote).refs if remote in self.repo.remotes else []
+        return [ref.remote_head for ref in refs if ref.remote_head != "HEAD"]
+
+    def remote_branch_tips(self, remote: str = "origin") -> dict[str, str]:
+        """Map remote-tracking branches to their tip commits, reading only ref files."""
+        if not self.is_repository() or remote not in self.repo.remotes:
+            return {}
+        return {
+            ref.remote_head: type(ref).dereference_recursive(self.repo, ref.path)
+            for ref in self.repo.remote(remote).refs
+            if ref.remote_head != "HEAD"
+        }
+
+    def commit_dates(self, commits: list[str]) -> dict[str, int]:
+        """Look up the committer timestamps of commits."""
+        return {sha: self.repo.commit(sha).committed_date for sha in commits}
+
+    def current_branch(self) -> str | None:
+        """Return the checked out branch, or None for a detached HEAD."""
+        if not self.is_repository() or self.repo.head.is_detached:
+            return None
+        return self.repo.head.ref.name
+
+    def resolve(self, ref: str) -> str | None:
+        """Resolve a ref to a commit hash, or None if it does not exist."""
+        from git.exc import BadName  # noqa: PLC0415
+
+        if not self.is_repository():
+            return None
+        try:
+            return self.repo.rev_parse(f"{ref}^{{commit}}").hexsha
+        except (BadName, ValueError):
+            return None
+
+    def config_values(self, keys: list[str]) -> dict[str, str | None]:
+        """Read repository config values such as `core.untrackedCache`, lowercased."""
+        reader = self.repo.config_reader("repository")
+        values: dict[str, str | None] = {}
+        for key in keys:
+            section, option = key.rsplit(".", 1)
+            value = reader.get_value(section, option, "")
+            values[key] = str(value).lower() if value != "" else None
+        return values
+
+    def is_merge_in_progress(self) -> bool:
+        if not self.is_repository():
+            return False
+        return (Path(self.repo.git_dir) / "MERGE_HEAD").exists()
+
+    def close(self) -> None:
+        """Stop the helper processes GitPython started for this repository."""
+        if "repo" in self.__dict__:
+            self.repo.close()
+            del self.__dict__["repo"]
@@ -18,6 +18,24 @@ def get_repos_path() -> Path:
     repos_path.mkdir(parents=True, exist_ok=True)
     return repos_path
 
+def get_reference_store_path() -> Path:
+    """Return the bare repository whose objects are shared by all cached clones"""
+    return get_repos_path().parent / "objects.git"
+
+def get_rerere_path() -> Path:
+    """Return the git rerere resolution database shared by all cached clones"""
+    return get_repos_path().parent / "rr-cache"
+
+def get_workspaces_path() -> Path:
+    """Return the directory for per-job working copies, on the same file system as the cache"""
+    workspaces_path = get_repos_path().parent / "workspaces"
+    workspaces_path.mkdir(parents=True, exist_ok=True)
+    return workspaces_path
+
+def get_repo_namespace(repo_path: Path) -> str:
+    """Return the cache-relative name of a repository, e.g. github.com/user/repo"""
+    return repo_path.relative_to(get_repos_path()).as_posix()
+
 def get_github_repo_path(repo_url: str) -> Path:
     """Generate repository path from GitHub repository URL
 
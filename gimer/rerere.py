@@ -0,0 +1,66 @@
+"""Conflict resolutions recorded by git rerere, shared by every cached repository.
+
+git rerere keeps one directory per conflict, named after a hash of the
+conflicting hunks, holding the conflict (preimage) and its resolution
+(postimage). The hash does not depend on the repository, so one store serves
+every clone and fork, and resolutions can be copied between machines.
+"""
+
+import re
+import tarfile
+from pathlib import Path
+
+# Files of a conflict directory; anything else in an archive is skipped
+RESOLUTION_FILE_PATTERN = re.compile(r"^(?P<conflict>[0-9a-f]{40}|[0-9a-f]{64})/(?P<name>(?:pre|post)image(?:\.\d+)?)$")
+
+
+def _is_resolution_file(conflict: str, name: str) -> bool:
+    return RESOLUTION_FILE_PATTERN.match(f"{conflict}/{name}") is not None
+
+
+def list_resolutions(store_path: Path) -> list[Path]:
+    """Return the conflict directories of the store that hold a resolution."""
+    if not store_path.is_dir():
+        return []
+    return sorted(
+        path for path in store_path.iterdir()
+        if _is_resolution_file(path.name, "preimage") and any(path.glob("postimage*"))
+    )
+
+
+def export_resolutions(store_path: Path, archive_path: Path) -> int:
+    """Write the resolved conflicts of the store to a .tar.gz archive. Returns how many were written."""
+    resolutions = list_resolutions(store_path)
+    with tarfile.open(archive_path, "w:gz") as archive:
+        for conflict in resolutions:
+            for path in sorted(conflict.iterdir()):
+                if path.is_file() and _is_resolution_file(conflict.name, path.name):
+                    archive.add(path, arcname=f"{conflict.name}/{path.name}", recursive=False)
+    return len(resolutions)
+
+
+def import_resolutions(store_path: Path, archive_path: Path) -> int:
+    """Add the resolutions of an archive to the store, keeping the ones already there.
+
+    Returns:
+        int: The number of conflicts that gained a resolution
+
+    Raises:
+        tarfile.TarError: If the file is not an archive
+    """
+    imported = set()
+    with tarfile.open(archive_path, "r:*") as archive:
+        for member in archive:
+            match = RESOLUTION_FILE_PATTERN.match(member.name)
+            if not (match and member.isfile()):
+                continue
+            target = store_path / match["conflict"] / match["name"]
+            if target.exists():
+                continue
+            source = archive.extractfile(member)
+            assert source is not None
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(source.read())
+            if match["name"].startswith("postimage"):
+                imported.add(match["conflict"])
+    return len(imported)
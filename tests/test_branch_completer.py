@@ -0,0 +1,13 @@
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from gimer.branch_completer import BranchCompleter
+from gimer.branch_search import BranchSearch
+
+
+class TestBranchCompleter:
+    def test_get_completions(self):
+        completer = BranchCompleter(BranchSearch(["main", "feature/main-menu", "develop"]))
+        completions = list(completer.get_completions(Document("mai"), CompleteEvent()))
+        assert [c.text for c in completions] == ["main", "feature/main-menu"]
+        assert all(c.start_position == -3 for c in completions)
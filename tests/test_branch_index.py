@@ -0,0 +1,52 @@
+from unittest.mock import Mock
+
+import pytest
+
+from gimer.branch_index import BranchEntry, BranchIndex, BranchSort
+
+
+class TestBranchIndex:
+    @pytest.fixture
+    def queries(self):
+        queries = Mock()
+        queries.remote_branch_tips.return_value = {"main": "a1", "develop": "b1", "feature": "c1"}
+        queries.commit_dates.side_effect = lambda commits: {c: {"a1": 300, "b1": 100, "c1": 200, "b2": 400}[c] for c in commits}
+        return queries
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        return BranchIndex.for_repository(tmp_path)
+
+    def test_for_repository(self, tmp_path):
+        assert BranchIndex.for_repository(tmp_path).path == tmp_path / ".git" / "gimer" / "branches.json"
+
+    def test_refresh_from_empty(self, index, queries):
+        changed = index.refresh(queries)
+        assert sorted(changed) == ["develop", "feature", "main"]
+        assert index.entries["develop"] == BranchEntry("develop", "b1", 100)
+
+    def test_refresh_only_looks_up_moved_branches(self, index, queries):
+        index.refresh(queries)
+        queries.remote_branch_tips.return_value = {"main": "a1", "develop": "b2"}
+        changed = index.refresh(queries)
+        assert changed == ["develop"]
+        queries.commit_dates.assert_called_with(["b2"])
+        assert set(index.entries) == {"main", "develop"}
+        assert index.entries["develop"].committed_at == 400
+
+    def test_names(self, index, queries):
+        index.refresh(queries)
+        assert index.names() == ["develop", "feature", "main"]
+        assert index.names(BranchSort.RECENT) == ["main", "feature", "develop"]
+
+    def test_save_and_load(self, index, queries, tmp_path):
+        index.refresh(queries)
+        index.save()
+        loaded = BranchIndex.for_repository(tmp_path).load()
+        assert loaded.entries == index.entries
+
+    def test_load_missing_or_corrupt(self, index):
+        assert index.load().entries == {}
+        index.path.parent.mkdir(parents=True)
+        index.path.write_text("not json")
+        assert index.load().entries == {}
@@ -0,0 +1,57 @@
+import pytest
+
+from gimer.branch_search import BranchSearch
+
+
+class TestBranchSearch:
+    @pytest.fixture
+    def search(self):
+        return BranchSearch([
+            "release/2.0",
+            "feature/login",
+            "main",
+            "fix/main-crash",
+            "feature/main-menu",
+            "mainline",
+            "Feature/Upper",
+        ], limit=3)
+
+    def test_empty_query_returns_first_branches(self, search):
+        assert search.search("") == ["release/2.0", "feature/login", "main"]
+
+    def test_ranking(self, search):
+        assert search.search("main", limit=10) == [
+            "main",
+            "mainline",
+            "fix/main-crash",
+            "feature/main-menu",
+        ]
+
+    def test_segment_prefix_ranks_above_substring(self):
+        search = BranchSearch(["feature/xlogin", "feature/login"])
+        assert search.search("login") == ["feature/login", "feature/xlogin"]
+
+    def test_limit(self, search):
+        assert len(search.search("a")) == 3
+
+    def test_case_insensitive(self, search):
+        assert search.search("UPPER") == ["Feature/Upper"]
+
+    def test_multiple_terms(self, search):
+        assert search.search("feat menu") == ["feature/main-menu"]
+
+    def test_no_match(self, search):
+        assert search.search("nothing") == []
+
+    def test_incremental_query(self, search):
+        assert search.search("fea", limit=10) == ["feature/login", "feature/main-menu", "Feature/Upper"]
+        assert search.search("feature/m") == ["feature/main-menu"]
+        assert search.search("rel") == ["release/2.0"]
+
+    def test_short_query_without_trigrams(self, search):
+        assert search.search("2.", limit=10) == ["release/2.0"]
+
+    def test_contains_and_len(self, search):
+        assert "main" in search
+        assert "missing" not in search
+        assert len(search) == 7
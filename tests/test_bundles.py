@@ -0,0 +1,150 @@
+import io
+import json
+import shutil
+import subprocess
+import tarfile
+
+import pytest
+from click.testing import CliRunner
+
+from gimer.bundles import (
+    BundleError,
+    SeedOutcome,
+    export_cache,
+    open_export,
+    seed_repository,
+)
+from gimer.cli import main
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    for key in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{key}_NAME", "t")
+        monkeypatch.setenv(f"GIT_{key}_EMAIL", "t@t")
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git(origin, "init", "-q", "-b", "main")
+    (origin / "file").write_text("0")
+    _git(origin, "add", "file")
+    _git(origin, "commit", "-q", "-m", "0")
+    _git(origin, "branch", "feature")
+    _git(origin, "tag", "v1")
+    return origin
+
+
+@pytest.fixture
+def repos_path(tmp_path, mocker):
+    repos_path = tmp_path / "repos"
+    repos_path.mkdir()
+    mocker.patch('gimer.bundles.get_repos_path', return_value=repos_path)
+    mocker.patch('gimer.repositories.get_repos_path', return_value=repos_path)
+    return repos_path
+
+
+@pytest.fixture
+def cached_repo(origin, repos_path):
+    path = repos_path / "github.com" / "user" / "repo"
+    path.parent.mkdir(parents=True)
+    _git(repos_path, "clone", "-q", origin.as_uri(), str(path))
+    return path
+
+
+class TestBundles:
+    @pytest.mark.parametrize("name", ["export", "export.tar", "export.tar.gz"])
+    def test_export_and_seed(self, tmp_path, origin, repos_path, cached_repo, name):
+        destination = tmp_path / name
+        entries = export_cache([cached_repo], destination)
+        assert entries == [{
+            "namespace": "github.com/user/repo",
+            "url": origin.as_uri(),
+            "head": "main",
+            "bundle": "github.com/user/repo.bundle",
+        }]
+        shutil.rmtree(cached_repo)
+        # The remote moves on after the export
+        (origin / "file").write_text("1")
+        _git(origin, "commit", "-q", "-am", "1")
+
+        with open_export(destination) as (export_path, index):
+            result = seed_repository(export_path, index[0])
+
+        assert (result.outcome, result.error) == (SeedOutcome.SEEDED, "")
+        assert _git(cached_repo, "remote", "get-url", "origin") == origin.as_uri()
+        assert _git(cached_repo, "rev-parse", "origin/main") == _git(origin, "rev-parse", "main")
+        assert _git(cached_repo, "rev-parse", "--abbrev-ref", "HEAD") == "main"
+        assert _git(cached_repo, "symbolic-ref", "refs/remotes/origin/HEAD") == "refs/remotes/origin/main"
+        assert set(_git(cached_repo, "branch", "-r", "--format=%(refname:short)").split()) >= {"origin/main", "origin/feature"}
+        assert _git(cached_repo, "tag") == "v1"
+
+    def test_seed_offline(self, tmp_path, origin, repos_path, cached_repo):
+        export_cache([cached_repo], tmp_path / "export")
+        shutil.rmtree(cached_repo)
+        shutil.rmtree(origin)
+
+        with open_export(tmp_path / "export") as (export_path, index):
+            assert seed_repository(export_path, index[0], fetch=False).outcome == SeedOutcome.SEEDED
+            shutil.rmtree(cached_repo)
+            # Without the remote the seeded repository is kept, only not updated
+            result = seed_repository(export_path, index[0])
+        assert result.outcome == SeedOutcome.SEEDED
+        assert result.error.startswith("Not updated")
+        assert (cached_repo / "file").read_text() == "0"
+
+    def test_seed_skips_cached_repositories(self, tmp_path, cached_repo):
+        export_cache([cached_repo], tmp_path / "export")
+        with open_export(tmp_path / "export") as (export_path, index):
+            assert seed_repository(export_path, index[0]).outcome == SeedOutcome.SKIPPED
+
+    @pytest.mark.parametrize("namespace", ["../../etc", "github.com/user/../repo", "repo"])
+    def test_seed_rejects_unsafe_namespaces(self, tmp_path, repos_path, namespace):
+        (tmp_path / "x.bundle").write_text("")
+        entry = {"namespace": namespace, "url": "https://github.com/user/repo.git", "bundle": "x.bundle"}
+        assert seed_repository(tmp_path, entry).outcome == SeedOutcome.FAILED
+        assert list(repos_path.iterdir()) == []
+
+    def test_archive_extracts_only_bundles(self, tmp_path):
+        archive = tmp_path / "export.tar"
+        with tarfile.open(archive, "w") as tar:
+            for name, data in [
+                ("index.json", json.dumps({"version": 1, "repositories": []}).encode()),
+                ("../escape.bundle", b"x"),
+                ("hooks/post-checkout", b"x"),
+            ]:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+
+        with open_export(archive) as (export_path, index):
+            assert index == []
+            assert [p.name for p in export_path.rglob("*")] == ["index.json"]
+        assert not (tmp_path / "escape.bundle").exists()
+
+    def test_not_an_export(self, tmp_path):
+        with pytest.raises(BundleError), open_export(tmp_path):
+            pass
+
+
+class TestCacheCommands:
+    def test_export_and_seed(self, tmp_path, origin, repos_path, cached_repo, mocker):
+        mocker.patch('gimer.cache.get_repos_path', return_value=repos_path)
+        mocker.patch('gimer.cli.get_repos_path', return_value=repos_path)
+        archive = tmp_path / "cache.tar.gz"
+        result = CliRunner().invoke(main, ['cache', 'export', str(archive)])
+        assert result.exit_code == 0, result.output
+        assert "Exported 1 repositories" in result.output
+
+        shutil.rmtree(cached_repo)
+        result = CliRunner().invoke(main, ['cache', 'seed', '--offline', str(archive)])
+        assert result.exit_code == 0, result.output
+        assert "Seeded 1 of 1 repositories." in result.output
+        assert (cached_repo / ".git" / "gimer" / "usage.json").exists()
+
+    def test_export_empty_cache(self, tmp_path, repos_path, mocker):
+        mocker.patch('gimer.cache.get_repos_path', return_value=repos_path)
+        result = CliRunner().invoke(main, ['cache', 'export', str(tmp_path / "export")])
+        assert result.exit_code == 2
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+
+import pytest
+
+from gimer.cache import (
+    disk_usage,
+    enforce_budget,
+    format_size,
+    list_entries,
+    parse_size,
+    record_use,
+    repository_size,
+)
+from gimer.locking import RepositoryLock
+
+
+class TestSizes:
+    @pytest.mark.parametrize(("text", "size"), [
+        ("512", 512), ("500M", 500 * 1024**2), ("20G", 20 * 1024**3), ("1.5GiB", int(1.5 * 1024**3)), ("2kb", 2048),
+    ])
+    def test_parse_size(self, text, size):
+        assert parse_size(text) == size
+
+    def test_parse_size_invalid(self):
+        with pytest.raises(ValueError):
+            parse_size("lots")
+
+    def test_format_size(self):
+        assert format_size(100) == "100B"
+        assert format_size(3 * 1024**3) == "3.0GiB"
+
+
+class TestCache:
+    @pytest.fixture(autouse=True)
+    def repos_path(self, tmp_path, mocker):
+        repos_path = tmp_path / "repos"
+        repos_path.mkdir()
+        mocker.patch('gimer.cache.get_repos_path', return_value=repos_path)
+        mocker.patch('gimer.repositories.get_repos_path', return_value=repos_path)
+        return repos_path
+
+    def _repo(self, repos_path, name, size, last_used):
+        path = repos_path / "github.com" / "user" / name
+        (path / ".git" / "gimer").mkdir(parents=True)
+        (path / ".git" / "data").write_bytes(b"x" * size)
+        (path / ".git" / "gimer" / "usage.json").write_text(json.dumps({"last_used": last_used, "size": None}))
+        return path
+
+    def test_disk_usage_counts_hardlinks_once(self, tmp_path):
+        (tmp_path / "a").write_bytes(b"x" * 100)
+        os.link(tmp_path / "a", tmp_path / "b")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "c").write_bytes(b"x" * 10)
+        assert disk_usage(tmp_path) == 110
+
+    def test_list_entries_least_recently_used_first(self, repos_path):
+        self._repo(repos_path, "new", 10, 2000)
+        self._repo(repos_path, "old", 20, 1000)
+        entries = list_entries()
+        assert [e.namespace for e in entries] == ["github.com/user/old", "github.com/user/new"]
+        assert entries[0].size >= 20
+
+    def test_repository_size_leaves_out_checked_out_files(self, repos_path):
+        path = self._repo(repos_path, "repo", 10, 1000)
+        (path / "checked-out").write_bytes(b"x" * 1000)
+        assert 10 <= repository_size(path) < 1000
+
+    def test_record_use(self, repos_path):
+        path = self._repo(repos_path, "repo", 10, 1000)
+        record_use(path, measure=True)
+        usage = json.loads((path / ".git" / "gimer" / "usage.json").read_text())
+        assert usage["last_used"] > 1000
+        assert usage["size"] >= 10
+        # Without measuring, the last recorded size is kept
+        record_use(path)
+        assert json.loads((path / ".git" / "gimer" / "usage.json").read_text())["size"] == usage["size"]
+
+    def test_enforce_budget_evicts_least_recently_used(self, repos_path):
+        oldest = self._repo(repos_path, "oldest", 1000, 1000)
+        old = self._repo(repos_path, "old", 1000, 2000)
+        new = self._repo(repos_path, "new", 1000, 3000)
+        evicted = enforce_budget(2500, measure=True)
+        assert [e.path for e in evicted] == [oldest]
+        assert not oldest.exists()
+        assert old.exists()
+        assert new.exists()
+
+    def test_enforce_budget_keeps_repositories_in_use(self, repos_path):
+        in_use = self._repo(repos_path, "in-use", 1000, 1000)
+        kept = self._repo(repos_path, "kept", 1000, 2000)
+        other = self._repo(repos_path, "other", 1000, 3000)
+        with RepositoryLock(in_use).shared():
+            evicted = enforce_budget(0, keep={kept}, measure=True)
+        assert [e.path for e in evicted] == [other]
+        assert in_use.exists()
+        assert kept.exists()
+
+    def test_enforce_budget_older_than(self, repos_path):
+        stale = self._repo(repos_path, "stale", 10, time.time() - 10 * 86400)
+        fresh = self._repo(repos_path, "fresh", 10, time.time())
+        evicted = enforce_budget(10**9, older_than=7 * 86400)
+        assert [e.path for e in evicted] == [stale]
+        assert fresh.exists()
@@ -0,0 +1,29 @@
+from gimer.chain import ChainState
+
+
+class TestChainState:
+    def test_for_repository(self, tmp_path):
+        assert ChainState.for_repository(tmp_path).path == tmp_path / ".git" / "gimer" / "chain.json"
+
+    def test_round_trip(self, tmp_path):
+        state = ChainState.for_repository(tmp_path)
+        state.chain, state.completed = ["r1.0", "r1.1", "main"], 1
+        state.save()
+        loaded = ChainState.for_repository(tmp_path).load()
+        assert loaded.resume_point(["r1.0", "r1.1", "main"]) == 1
+        # A different chain starts from the beginning
+        assert loaded.resume_point(["r1.0", "main"]) == 0
+
+    def test_clear(self, tmp_path):
+        state = ChainState.for_repository(tmp_path)
+        state.save()
+        state.clear()
+        state.clear()
+        assert ChainState.for_repository(tmp_path).load().chain == []
+
+    def test_load_missing_or_corrupt(self, tmp_path):
+        state = ChainState.for_repository(tmp_path)
+        assert state.load().completed == 0
+        state.path.parent.mkdir(parents=True)
+        state.path.write_text("{")
+        assert state.load().completed == 0
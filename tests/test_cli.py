@@ -1,11 +1,29 @@
+import os
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 
 import pytest
 from click.testing import CliRunner
 
-from gimer.cli import cleanup_repository, main, merge
-from gimer.git import UserAbortedError
+from gimer.branch_index import BranchIndex
+from gimer.branch_search import BranchSearch
+from gimer.chain import ChainState
+from gimer.cli import (
+    MergeOutcome,
+    cleanup_repository,
+    copy_branch_index,
+    main,
+    maintain_cache,
+    merge,
+    merge_in_memory,
+    select_branch,
+)
+from gimer.git import GitError, UserAbortedError
+from gimer.github_api import GitHubAPIError
+from gimer.locking import LockTimeoutError
+from gimer.profiling import Phase, Profiler
 
 
 class TestCLI:
@@ -18,6 +36,14 @@ class TestCLI:
         self.mock_confirm_ask = mocker.patch('gimer.cli.Confirm.ask')
         self.mock_shutil_rmtree = mocker.patch('gimer.cli.shutil.rmtree')
         self.mock_console_print = mocker.patch('gimer.cli.console.print')
+        self.mock_branch_index = mocker.patch('gimer.cli.BranchIndex')
+        self.mock_repository_lock = mocker.patch('gimer.cli.RepositoryLock')
+        self.mock_maintain_cache = mocker.patch('gimer.cli.maintain_cache')
+        self.mock_get_rerere_path = mocker.patch('gimer.cli.get_rerere_path')
+        self.mock_connection_sharing = mocker.patch('gimer.connections.ConnectionSharing')
+        sharing = self.mock_connection_sharing.return_value.__enter__.return_value
+        sharing.handshake_seconds = 0.0
+        sharing.config_args = ()
 
         # Set default return values
         mock_path = Mock(spec=Path)
@@ -28,8 +54,18 @@ class TestCLI:
         mock_git_instance = Mock()
         mock_git_instance.check_working_directory_clean.return_value = True
         mock_git_instance.get_branches.return_value = ['main', 'develop']
+        mock_git_instance.profiler = Profiler()
+        mock_git_instance.connection_sharing = None
+        mock_git_instance.conflicts_auto_resolved = 0
+        mock_git_instance.get_recorded_resolutions.return_value = ([], ["file.txt"])
+        mock_git_instance.get_unmerged_paths.return_value = ["file.txt"]
+        mock_git_instance.is_partial_clone.return_value = False
         self.mock_git.return_value = mock_git_instance
 
+        mock_index = self.mock_branch_index.for_repository.return_value.load.return_value
+        mock_index.entries = {}
+        mock_index.names.return_value = ['main', 'develop']
+
     @pytest.fixture
     def runner(self):
         return CliRunner()
@@ -40,6 +76,15 @@ class TestCLI:
             assert result.exit_code == 0
             mock_merge.assert_called_once()
 
+    def test_main_help_lists_commands(self, runner):
+        result = runner.invoke(main, ['--help'])
+        assert result.exit_code == 0
+        for command in ('merge', 'cache', 'serve', 'submit', 'jobs', 'rerere'):
+            assert f"\n  {command} " in result.output
+        # Help after arguments is the help of the merge command
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--help'])
+        assert '--source' in result.output
+
     def test_main_with_options(self, runner):
         with patch('gimer.cli.merge') as mock_merge:
             result = runner.invoke(main, [
@@ -49,12 +94,171 @@ class TestCLI:
                 '--dry-run',
                 '--cleanup',
                 '--confirm-all',
+                '--clone-strategy', 'blobless',
             ])
             assert result.exit_code == 0
             args = mock_merge.call_args[0]
             config = args[4]
             assert config['dry_run'] is True
             assert config['confirm_all'] is True
+            assert config['clone_strategy'] == 'blobless'
+
+    def test_main_fleet(self, runner, tmp_path):
+        manifest = tmp_path / 'repos.txt'
+        manifest.write_text('https://github.com/user/b.git\n')
+        with patch('gimer.cli.fleet.run_fleet', return_value=[]) as mock_run_fleet:
+            result = runner.invoke(main, [
+                'https://github.com/user/a.git',
+                '--manifest', str(manifest),
+                '--source', 'release',
+                '--target', 'main',
+                '--jobs', '8',
+            ])
+            assert result.exit_code == 0
+            urls, target, source, _config, jobs, _cleanup = mock_run_fleet.call_args[0]
+            assert urls == ['https://github.com/user/a.git', 'https://github.com/user/b.git']
+            assert (target, source, jobs) == ('main', 'release', 8)
+
+    def test_main_fleet_requires_branches(self, runner):
+        result = runner.invoke(main, ['https://github.com/user/a.git', 'https://github.com/user/b.git'])
+        assert result.exit_code == 2
+
+    def test_main_requires_repository(self, runner):
+        result = runner.invoke(main, [])
+        assert result.exit_code == 2
+
+    def test_main_with_profile_and_trace(self, runner, tmp_path):
+        with patch('gimer.cli.merge') as mock_merge:
+            trace = tmp_path / 'trace.json'
+            result = runner.invoke(main, ['https://github.com/user/repo.git', '--profile', '--trace', str(trace)])
+            assert result.exit_code == 0
+            config = mock_merge.call_args[0][4]
+            assert config['profile'] is True
+            assert config['trace'] == trace
+
+    def test_merge_function_profile(self, mocker, tmp_path):
+        mock_git_instance = self.mock_git.return_value
+        mock_print_summary = mocker.patch.object(mock_git_instance.profiler, 'print_summary')
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = ['develop', 'main']
+        self.mock_confirm_ask.return_value = True
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        trace = tmp_path / 'trace.jsonl'
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': False, 'profile': True, 'trace': trace}
+
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        mock_print_summary.assert_called_once()
+        phases = [e.phase for e in mock_git_instance.profiler.events]
+        assert phases == [Phase.PROMPT, Phase.PROMPT, Phase.PROMPT]
+        assert len(trace.read_text().splitlines()) == 3
+
+    def test_merge_function_locks_repository(self):
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'lock_timeout': 5.0}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', {**config, 'dry_run': True})
+
+        assert self.mock_repository_lock.call_args[0] == (repo_path, 5.0)
+        # The real run prepares the repository and merges exclusively; the dry run only shares
+        assert self.mock_repository_lock.return_value.exclusive.call_count == 2
+        assert self.mock_repository_lock.return_value.shared.call_count == 1
+
+    def test_merge_function_fetches_under_exclusive_lock(self):
+        events = []
+
+        @contextmanager
+        def held(kind):
+            events.append(f"{kind} acquired")
+            yield
+            events.append(f"{kind} released")
+
+        lock = self.mock_repository_lock.return_value
+        lock.exclusive.side_effect = lambda: held("exclusive")
+        lock.shared.side_effect = lambda: held("shared")
+        picks = iter(['develop', 'main'])
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = lambda: events.append("pick") or next(picks)
+        self.mock_git.return_value.merge_branch.side_effect = lambda branch: events.append("merge")
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False}
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        assert events == [
+            "exclusive acquired", "exclusive released",
+            "shared acquired", "shared released",
+            "exclusive acquired", "exclusive released",
+            "pick", "pick",
+            "exclusive acquired", "merge", "exclusive released",
+        ]
+
+    def test_main_lock_timeout(self, runner):
+        with patch('gimer.cli.merge', side_effect=LockTimeoutError('locked')):
+            result = runner.invoke(main, ['https://github.com/user/repo.git', '--lock-timeout', '0'])
+            assert result.exit_code == 1
+
+    def test_merge_function_workspace(self, mocker, tmp_path):
+        mock_git_instance = self.mock_git.return_value
+        mocker.patch('gimer.cli.get_workspaces_path', return_value=tmp_path)
+        mock_copy_index = mocker.patch('gimer.cli.copy_branch_index')
+        mock_git_instance.create_workspace.side_effect = lambda cache, workspace, url: (workspace / '.git').mkdir()
+        cwds = []
+        mock_git_instance.merge_branch.side_effect = lambda branch: cwds.append(mock_git_instance.cwd)
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        repo_path.name = 'repo'
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'workspace': True}
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        workspace = mock_git_instance.create_workspace.call_args[0][1]
+        assert workspace.parent == tmp_path
+        assert cwds == [workspace]
+        mock_git_instance.update_cache.assert_called_once_with(repo_path, workspace)
+        assert mock_copy_index.call_args_list == [call(repo_path, workspace), call(workspace, repo_path)]
+        assert mock_git_instance.cwd == repo_path
+        self.mock_shutil_rmtree.assert_called_once_with(workspace, ignore_errors=True)
+
+    def test_merge_function_workspace_of_partial_clone(self, mocker, tmp_path):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.is_partial_clone.return_value = True
+        mocker.patch('gimer.cli.get_workspaces_path', return_value=tmp_path)
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'workspace': True}
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        # Merged in the cache itself
+        mock_git_instance.create_workspace.assert_not_called()
+        mock_git_instance.merge_branch.assert_called_once_with('develop')
+
+    def test_copy_branch_index(self, tmp_path, mocker):
+        # The fixture stubs out the index; these tests need the real one
+        mocker.patch('gimer.cli.BranchIndex', BranchIndex)
+        workspace, cache = tmp_path / 'workspace', tmp_path / 'cache'
+        (workspace / '.git' / 'gimer').mkdir(parents=True)
+        (workspace / '.git' / 'gimer' / 'branches.json').write_text('{"version": 1}')
+        (cache / '.git' / 'gimer').mkdir(parents=True)
+        (cache / '.git' / 'gimer' / 'maintenance.json').write_text('{}')
+
+        copy_branch_index(workspace, cache)
+
+        # Only the index is replaced
+        assert sorted(p.name for p in (cache / '.git' / 'gimer').iterdir()) == ['branches.json', 'maintenance.json']
+        assert (cache / '.git' / 'gimer' / 'branches.json').read_text() == '{"version": 1}'
+
+    def test_copy_branch_index_keeps_newer_index(self, tmp_path, mocker):
+        # The fixture stubs out the index; these tests need the real one
+        mocker.patch('gimer.cli.BranchIndex', BranchIndex)
+        workspace, cache = tmp_path / 'workspace', tmp_path / 'cache'
+        for path, text in ((workspace, 'old'), (cache, 'new')):
+            (path / '.git' / 'gimer').mkdir(parents=True)
+            (path / '.git' / 'gimer' / 'branches.json').write_text(text)
+        os.utime(workspace / '.git' / 'gimer' / 'branches.json', (0, 0))
+
+        copy_branch_index(workspace, cache)
+
+        assert (cache / '.git' / 'gimer' / 'branches.json').read_text() == 'new'
 
     def test_main_user_aborted(self, runner):
         with patch('gimer.cli.merge') as mock_merge:
@@ -81,13 +285,275 @@ class TestCLI:
         merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
 
         mock_git_instance.fetch.assert_called_once()
-        mock_git_instance.checkout_branch.assert_any_call('develop')
-        mock_git_instance.checkout_branch.assert_any_call('main')
-        mock_git_instance.pull_branch.assert_any_call('develop')
-        mock_git_instance.pull_branch.assert_any_call('main')
+        mock_git_instance.checkout_branch.assert_called_once_with('main')
+        mock_git_instance.update_current_branch.assert_called_once_with('main')
+        mock_git_instance.update_branch.assert_called_once_with('develop')
         mock_git_instance.merge_branch.assert_called_once_with('develop')
         mock_git_instance.push_branch.assert_called_once_with('main')
 
+    def test_merge_function_picker_from_branch_index(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_index = self.mock_branch_index.for_repository.return_value.load.return_value
+        mock_index.entries = {'main': Mock(), 'develop': Mock()}
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = ['develop', 'main']
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'sort': 'recent'}
+
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        mock_git_instance.fetch.assert_called_once_with(quiet=True)
+        mock_index.refresh.assert_called_once_with(mock_git_instance.queries)
+        mock_index.save.assert_called_once()
+        mock_index.names.assert_called_once_with('recent')
+        mock_git_instance.merge_branch.assert_called_once_with('develop')
+
+    def test_merge_function_picked_branch_deleted_on_remote(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_index = self.mock_branch_index.for_repository.return_value.load.return_value
+        mock_index.entries = {'main': Mock(), 'develop': Mock()}
+        mock_index.refresh.side_effect = lambda queries: mock_index.entries.pop('develop')
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = ['develop', 'main']
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False}
+
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        mock_git_instance.merge_branch.assert_not_called()
+
+    def test_merge_function_confirm_all_fetches_before_picker(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_index = self.mock_branch_index.for_repository.return_value.load.return_value
+        mock_index.entries = {'main': Mock(), 'develop': Mock()}
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = ['develop', 'main']
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        # The fetch asks for confirmation, so it must not run alongside the picker
+        mock_git_instance.fetch.assert_called_once_with(quiet=False)
+
+    def test_merge_function_single_fetch_for_given_branches(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.network_round_trips = 2
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_git_instance.fetch_branches.assert_called_once_with(['develop', 'main'])
+        mock_git_instance.fetch.assert_not_called()
+        mock_git_instance.get_branches.assert_not_called()
+        self.mock_inquirer_fuzzy.assert_not_called()
+        self.mock_console_print.assert_called_with("⚡Network round-trips: 2")
+
+    def _api_client(self, mocker, monkeypatch, result=('merged', 'abc123')):
+        monkeypatch.setenv('GITHUB_TOKEN', 'secret')
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.network_round_trips = 0
+        mock_git_instance.dry_run = False
+        mock_client = mocker.patch('gimer.github_api.GitHubClient').return_value
+        mock_client.repo_path = '/repos/user/repo'
+        mock_client.requests = 1
+        mock_client.merge.return_value = result
+        return mock_client
+
+    def test_merge_via_api(self, mocker, monkeypatch):
+        mock_client = self._api_client(mocker, monkeypatch)
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'api': True}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config) == MergeOutcome.MERGED
+
+        mock_client.merge.assert_called_once_with('main', 'develop', "Merge branch 'develop' into main")
+        # Nothing is cloned or locked
+        self.mock_repository_lock.assert_not_called()
+        self.mock_git.return_value.clone_repository.assert_not_called()
+        self.mock_console_print.assert_called_with("⚡Network round-trips: 1")
+
+    def test_merge_via_api_picks_branches_from_the_api(self, mocker, monkeypatch):
+        mock_client = self._api_client(mocker, monkeypatch)
+        mock_client.list_branches.return_value = ['main', 'develop']
+        self.mock_inquirer_fuzzy.return_value.execute.side_effect = ['develop', 'main']
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'api': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        mock_client.merge.assert_called_once_with('main', 'develop', "Merge branch 'develop' into main")
+
+    def test_merge_via_api_conflict_merges_locally(self, mocker, monkeypatch):
+        mock_client = self._api_client(mocker, monkeypatch, result=('conflict', None))
+        mock_git_instance = self.mock_git.return_value
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'api': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_client.merge.assert_called_once()
+        mock_git_instance.merge_branch.assert_called_once_with('develop')
+        mock_git_instance.push_branch.assert_called_once_with('main')
+
+    def test_merge_via_api_error(self, mocker, monkeypatch):
+        mock_client = self._api_client(mocker, monkeypatch)
+        mock_client.merge.side_effect = GitHubAPIError("GitHub API error 404: Branch not found", 404)
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'api': True}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config) == MergeOutcome.FAILED
+        self.mock_git.return_value.merge_branch.assert_not_called()
+
+    def test_merge_via_api_dry_run(self, mocker, monkeypatch):
+        mock_client = self._api_client(mocker, monkeypatch)
+        self.mock_git.return_value.dry_run = True
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': True, 'no_confirm': True, 'confirm_all': False, 'api': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_client.merge.assert_not_called()
+
+    def test_api_option_validation(self, runner, monkeypatch):
+        monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--api'])
+        assert result.exit_code == 2
+        assert 'GITHUB_TOKEN' in result.output
+
+        monkeypatch.setenv('GITHUB_TOKEN', 'secret')
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--api', '--chain', 'a,b'])
+        assert result.exit_code == 2
+
+    def test_merge_reports_connection_sharing(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.network_round_trips = 3
+        mock_git_instance.network_commands_run = 3
+        sharing = self.mock_connection_sharing.return_value.__enter__.return_value
+        sharing.handshake_seconds = 0.8
+        sharing.config_args = ('-c', 'core.sshCommand=ssh')
+        sharing.saved_seconds.return_value = 1.6
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False}
+
+        merge(repo_path, 'git@github.com:user/repo.git', 'main', 'develop', config)
+
+        self.mock_connection_sharing.assert_called_once_with('git@github.com:user/repo.git', repo_path)
+        assert mock_git_instance.config_args == ('-c', 'core.sshCommand=ssh')
+        sharing.saved_seconds.assert_called_once_with(3)
+        self.mock_console_print.assert_any_call(
+            "⚡Connection sharing: 3 git commands used one SSH connection, saving about 1.6s."
+        )
+
+    def test_merge_without_connection_sharing(self):
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'share_connections': False}
+        merge(repo_path, 'git@github.com:user/repo.git', 'main', 'develop', config)
+        self.mock_connection_sharing.assert_not_called()
+
+    def test_merge_chain(self, tmp_path):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.queries.path = tmp_path
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'chain': ['r1.0', 'r1.1', 'main']}
+
+        outcome = merge(repo_path, 'https://github.com/user/repo.git', None, None, config)
+
+        assert outcome == MergeOutcome.MERGED
+        mock_git_instance.fetch_branches.assert_called_once_with(['r1.0', 'r1.1', 'main'])
+        assert mock_git_instance.checkout_branch.call_args_list == [call('r1.1'), call('main')]
+        # Only the first branch comes from the remote; later merges use the previous result
+        mock_git_instance.update_branch.assert_called_once_with('r1.0')
+        assert mock_git_instance.merge_branch.call_args_list == [call('r1.0'), call('r1.1')]
+        mock_git_instance.push_branches.assert_called_once_with(['r1.1', 'main'])
+        mock_git_instance.push_branch.assert_not_called()
+
+    def test_merge_chain_stops_at_conflict_and_resumes(self, tmp_path):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.queries.path = tmp_path
+        mock_git_instance.merge_branch.side_effect = [None, GitError('CONFLICT (content): Merge conflict in f')]
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'chain': ['r1.0', 'r1.1', 'main']}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', None, None, config) == MergeOutcome.CONFLICT
+        mock_git_instance.abort_merge.assert_called_once()
+        mock_git_instance.push_branches.assert_not_called()
+        assert ChainState.for_repository(tmp_path).load().completed == 1
+
+        mock_git_instance.reset_mock()
+        mock_git_instance.merge_branch.side_effect = None
+        assert merge(repo_path, 'https://github.com/user/repo.git', None, None, config) == MergeOutcome.MERGED
+        mock_git_instance.checkout_branch.assert_called_once_with('main')
+        mock_git_instance.merge_branch.assert_called_once_with('r1.1')
+        mock_git_instance.push_branches.assert_called_once_with(['r1.1', 'main'])
+        assert not ChainState.for_repository(tmp_path).path.exists()
+
+    def test_merge_batch_octopus(self):
+        mock_git_instance = self.mock_git.return_value
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'sources': ['a', 'b']}
+
+        outcome = merge(repo_path, 'https://github.com/user/repo.git', 'main', None, config)
+
+        assert outcome == MergeOutcome.MERGED
+        mock_git_instance.fetch_branches.assert_called_once_with(['a', 'b', 'main'])
+        mock_git_instance.merge_octopus.assert_called_once_with(['a', 'b'])
+        mock_git_instance.merge_branch.assert_not_called()
+        mock_git_instance.push_branch.assert_called_once_with('main')
+
+    def test_merge_batch_skips_conflicting_sources(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_octopus.side_effect = GitError('ERROR: content conflict in f')
+        mock_git_instance.merge_branch.side_effect = [None, GitError('CONFLICT (content): Merge conflict in f'), None]
+        mock_git_instance.is_merge_in_progress.return_value = True
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'sources': ['a', 'b', 'c']}
+
+        outcome = merge(repo_path, 'https://github.com/user/repo.git', 'main', None, config)
+
+        assert outcome == MergeOutcome.CONFLICT
+        assert mock_git_instance.merge_branch.call_args_list == [call('a'), call('b'), call('c')]
+        assert mock_git_instance.abort_merge.call_count == 2
+        mock_git_instance.push_branch.assert_called_once_with('main')
+
+    def test_merge_batch_nothing_merged_is_not_pushed(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_octopus.side_effect = GitError('ERROR: content conflict in f')
+        mock_git_instance.merge_branch.side_effect = GitError('CONFLICT (content): Merge conflict in f')
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'sources': ['a', 'b']}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', None, config) == MergeOutcome.CONFLICT
+        mock_git_instance.push_branch.assert_not_called()
+
+    def test_main_several_sources(self, runner):
+        with patch('gimer.cli.merge') as mock_merge:
+            result = runner.invoke(main, ['https://github.com/user/repo.git', '--target', 'main', '--source', 'a', '--source', 'b'])
+            assert result.exit_code == 0
+            assert mock_merge.call_args[0][3] is None
+            assert mock_merge.call_args[0][4]['sources'] == ['a', 'b']
+
+    def test_main_several_sources_need_target(self, runner):
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--source', 'a', '--source', 'b'])
+        assert result.exit_code == 2
+
+    def test_main_chain(self, runner):
+        with patch('gimer.cli.merge') as mock_merge:
+            result = runner.invoke(main, ['https://github.com/user/repo.git', '--chain', 'r1.0, r1.1,main'])
+            assert result.exit_code == 0
+            assert mock_merge.call_args[0][4]['chain'] == ['r1.0', 'r1.1', 'main']
+
+    def test_main_chain_conflicting_options(self, runner):
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--chain', 'r1.0,main', '--source', 'dev'])
+        assert result.exit_code == 2
+
+    def test_main_chain_in_workspace(self, runner):
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--chain', 'r1.0,main', '--workspace'])
+        assert result.exit_code == 2
+        assert "--workspace" in result.output
+
     def test_merge_function_clone_if_not_exists(self):
         mock_git_instance = self.mock_git.return_value
         repo_path = self.mock_get_github_repo_path.return_value
@@ -97,7 +563,37 @@ class TestCLI:
 
         merge(repo_path, 'https://github.com/user/repo.git', 'main', 'main', config)
 
-        mock_git_instance.clone_repository.assert_called_once_with('https://github.com/user/repo.git')
+        mock_git_instance.clone_repository.assert_called_once_with('https://github.com/user/repo.git', reference=None)
+
+    def test_merge_function_clone_with_shared_objects(self, mocker):
+        mocker.patch('gimer.cli.get_reference_store_path', return_value=Path('/cache/objects.git'))
+        mocker.patch('gimer.cli.get_repo_namespace', return_value='github.com/user/repo')
+        mock_git_instance = self.mock_git.return_value
+        repo_path = self.mock_get_github_repo_path.return_value
+        (repo_path / '.git').exists.return_value = False
+
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': False, 'shared_objects': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'main', config)
+
+        mock_git_instance.update_reference_store.assert_called_once_with(
+            Path('/cache/objects.git'), 'https://github.com/user/repo.git', 'github.com/user/repo'
+        )
+        mock_git_instance.clone_repository.assert_called_once_with(
+            'https://github.com/user/repo.git', reference=Path('/cache/objects.git')
+        )
+
+    def test_merge_function_link_shared_objects(self, mocker):
+        mocker.patch('gimer.cli.get_reference_store_path', return_value=Path('/cache/objects.git'))
+        mock_git_instance = self.mock_git.return_value
+        repo_path = self.mock_get_github_repo_path.return_value
+
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': False, 'shared_objects': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'main', config)
+
+        mock_git_instance.link_reference_store.assert_called_once_with(Path('/cache/objects.git'))
+        mock_git_instance.clone_repository.assert_not_called()
 
     def test_merge_function_dirty_working_directory(self):
         mock_git_instance = self.mock_git.return_value
@@ -149,9 +645,202 @@ class TestCLI:
         mock_git_instance.resolve_conflicts.assert_called_once()
         mock_git_instance.commit_merge.assert_not_called()
 
+    def test_merge_conflict_resolved_by_recorded_resolutions(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_branch.side_effect = Exception("CONFLICT: merge conflict")
+        mock_git_instance.get_recorded_resolutions.return_value = (["file.txt"], [])
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config) == MergeOutcome.MERGED
+
+        mock_git_instance.enable_rerere.assert_called_once_with(self.mock_get_rerere_path.return_value)
+        mock_git_instance.stage_paths.assert_called_once_with(["file.txt"])
+        mock_git_instance.commit_merge.assert_called_once_with(edit=False)
+        mock_git_instance.abort_merge.assert_not_called()
+        assert mock_git_instance.conflicts_auto_resolved == 1
+        self.mock_console_print.assert_any_call("⚡Conflicts resolved automatically: 1")
+
+    def test_merge_conflict_partly_resolved_by_recorded_resolutions(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_branch.side_effect = Exception("CONFLICT: merge conflict")
+        mock_git_instance.get_recorded_resolutions.return_value = (["a.txt"], ["b.txt"])
+        mock_git_instance.is_merge_in_progress.return_value = True
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': False}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_git_instance.stage_paths.assert_called_once_with(["a.txt"])
+        mock_git_instance.resolve_conflicts.assert_called_once()
+        mock_git_instance.commit_merge.assert_called_once_with()
+
+    def test_merge_failure_is_aborted(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_branch.side_effect = GitError("git merge develop failed: error: commit hook failed")
+        mock_git_instance.get_unmerged_paths.return_value = []
+        mock_git_instance.is_merge_in_progress.return_value = True
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': False, 'confirm_all': False}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config) == MergeOutcome.FAILED
+        mock_git_instance.abort_merge.assert_called_once()
+        mock_git_instance.resolve_conflicts.assert_not_called()
+
+    def test_merge_without_rerere(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.merge_branch.side_effect = Exception("CONFLICT: merge conflict")
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'rerere': False}
+
+        assert merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config) == MergeOutcome.CONFLICT
+
+        mock_git_instance.enable_rerere.assert_not_called()
+        mock_git_instance.get_recorded_resolutions.assert_not_called()
+
+    def test_merge_in_memory(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.are_ancestors.return_value = [False, False]
+        mock_git_instance.merge_tree.return_value = ('tree_hash', [])
+        mock_git_instance.rev_parse.side_effect = ['main_hash', 'develop_hash']
+        mock_git_instance.commit_tree.return_value = 'commit_hash'
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'in_memory': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_git_instance.merge_tree.assert_called_once_with('origin/main', 'origin/develop')
+        mock_git_instance.commit_tree.assert_called_once_with(
+            'tree_hash', ['main_hash', 'develop_hash'], "Merge branch 'develop' into main"
+        )
+        mock_git_instance.push_commit.assert_called_once_with('commit_hash', 'main')
+        mock_git_instance.checkout_branch.assert_not_called()
+        mock_git_instance.merge_branch.assert_not_called()
+
+    def test_merge_in_memory_fast_forward(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.are_ancestors.return_value = [False, True]
+        mock_git_instance.rev_parse.return_value = 'develop_hash'
+
+        merge_in_memory(mock_git_instance, 'main', 'develop')
+
+        mock_git_instance.merge_tree.assert_not_called()
+        mock_git_instance.push_commit.assert_called_once_with('develop_hash', 'main')
+
+    def test_merge_in_memory_conflict_falls_back(self):
+        mock_git_instance = self.mock_git.return_value
+        mock_git_instance.are_ancestors.return_value = [False, False]
+        mock_git_instance.merge_tree.return_value = ('tree_hash', ['conflicted.txt'])
+
+        repo_path = self.mock_get_github_repo_path.return_value
+        config = {'dry_run': False, 'no_confirm': True, 'confirm_all': False, 'in_memory': True}
+
+        merge(repo_path, 'https://github.com/user/repo.git', 'main', 'develop', config)
+
+        mock_git_instance.commit_tree.assert_not_called()
+        mock_git_instance.merge_branch.assert_called_once_with('develop')
+        mock_git_instance.push_branch.assert_called_once_with('main')
+
+    def test_select_branch_small_list_uses_fuzzy(self):
+        self.mock_inquirer_fuzzy.return_value.execute.return_value = 'main'
+        search = BranchSearch(['main', 'develop'])
+        assert select_branch('Select', search) == 'main'
+        self.mock_inquirer_fuzzy.assert_called_once_with('Select', choices=['main', 'develop'])
+
+    def test_select_branch_large_list_uses_indexed_search(self, mocker):
+        mocker.patch('gimer.cli.FUZZY_CHOICES_LIMIT', 1)
+        mock_text = mocker.patch('gimer.cli.inquirer.text')
+        mock_text.return_value.execute.return_value = 'develop'
+        search = BranchSearch(['main', 'develop'])
+
+        assert select_branch('Select', search) == 'develop'
+
+        self.mock_inquirer_fuzzy.assert_not_called()
+        kwargs = mock_text.call_args.kwargs
+        assert kwargs['completer'].completer.search is search
+        assert kwargs['validate']('main') is True
+        assert kwargs['validate']('other') is False
+
     def test_cleanup_repository(self):
         repo_path = "/test/repo"
         cleanup_repository(repo_path)
 
-        self.mock_os_chdir.assert_called_once_with("..")
+        # Commands run with an explicit cwd, so the process never enters the repository
+        self.mock_os_chdir.assert_not_called()
         self.mock_shutil_rmtree.assert_called_once_with(repo_path)
+
+    def test_cache_budget_option(self, runner):
+        with patch('gimer.cli.merge') as mock_merge:
+            result = runner.invoke(main, ['https://github.com/user/repo.git', '--cache-budget', '2G'])
+            assert result.exit_code == 0
+            assert mock_merge.call_args[0][4]['cache_budget'] == 2 * 1024**3
+            self.mock_maintain_cache.assert_called_once_with([self.mock_get_github_repo_path.return_value], 2 * 1024**3, 60)
+
+    def test_cache_budget_invalid(self, runner):
+        result = runner.invoke(main, ['https://github.com/user/repo.git', '--cache-budget', 'lots'])
+        assert result.exit_code == 2
+        assert 'lots' in result.output
+
+    def test_cache_prune_needs_an_option(self, runner, mocker):
+        mock_enforce_budget = mocker.patch('gimer.cache.enforce_budget')
+        result = runner.invoke(main, ['cache', 'prune'])
+        assert result.exit_code == 2
+        mock_enforce_budget.assert_not_called()
+
+    def test_cache_prune(self, runner, mocker):
+        mock_enforce_budget = mocker.patch('gimer.cache.enforce_budget', return_value=[])
+        result = runner.invoke(main, ['cache', 'prune', '--older-than', '7'])
+        assert result.exit_code == 0
+        mock_enforce_budget.assert_called_once_with(sys.maxsize, older_than=7 * 24 * 60 * 60, measure=True)
+
+        mock_enforce_budget.reset_mock()
+        runner.invoke(main, ['cache', 'prune', '--all'])
+        assert mock_enforce_budget.call_args[0][0] == 0
+
+    def test_cache_lists_by_default(self, runner, mocker):
+        mock_list_entries = mocker.patch('gimer.cache.list_entries', return_value=[])
+        result = runner.invoke(main, ['cache'])
+        assert result.exit_code == 0
+        mock_list_entries.assert_called_once()
+
+    def test_maintain_cache(self, mocker):
+        mock_record_use = mocker.patch('gimer.cache.record_use')
+        mock_enforce_budget = mocker.patch('gimer.cache.enforce_budget', return_value=[])
+        repo_path = Path('/cache/github.com/user/repo')
+
+        maintain_cache([repo_path], None)
+        mock_record_use.assert_called_once_with(repo_path, measure=False)
+        mock_enforce_budget.assert_not_called()
+
+        maintain_cache([repo_path], 1024)
+        mock_enforce_budget.assert_called_once_with(1024, keep={repo_path})
+
+    def test_maintain_cache_schedules_maintenance(self, mocker):
+        mocker.patch('gimer.cache.record_use')
+        mock_schedule = mocker.patch('gimer.maintenance.schedule')
+        repo_path = Path('/cache/github.com/user/repo')
+
+        maintain_cache([repo_path], None, 30)
+        mock_schedule.assert_called_once_with([repo_path], 30)
+
+        mock_schedule.reset_mock()
+        maintain_cache([repo_path], None)
+        mock_schedule.assert_not_called()
+
+    def test_dry_run_skips_maintenance(self, runner):
+        with patch('gimer.cli.merge'):
+            runner.invoke(main, ['https://github.com/user/repo.git', '--dry-run'])
+        assert self.mock_maintain_cache.call_args[0][2] == 0
+
+    def test_cache_maintain(self, runner, mocker, tmp_path):
+        mock_maintain_repository = mocker.patch('gimer.maintenance.maintain_repository')
+        mock_maintain_repository.return_value.before = {'status': 0.02}
+        mock_maintain_repository.return_value.after = {'status': 0.01}
+        result = runner.invoke(main, ['cache', 'maintain', '--time-budget', '5', str(tmp_path)])
+        assert result.exit_code == 0
+        mock_maintain_repository.assert_called_once_with(tmp_path, 5, False)
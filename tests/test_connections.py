@@ -0,0 +1,95 @@
+import subprocess
+from unittest.mock import Mock
+
+import pytest
+
+from gimer.connections import ConnectionSharing, ssh_destination
+
+
+class TestConnectionSharing:
+    @pytest.fixture(autouse=True)
+    def _common_mocks(self, mocker, monkeypatch):
+        monkeypatch.delenv('GIT_SSH', raising=False)
+        monkeypatch.delenv('GIT_SSH_COMMAND', raising=False)
+        self.mock_git_config = mocker.patch('gimer.connections._git_config', return_value=[])
+        self.mock_run = mocker.patch('gimer.connections.subprocess.run', return_value=Mock(returncode=1))
+
+    def _commands(self):
+        return [c[0][0] for c in self.mock_run.call_args_list]
+
+    @pytest.mark.parametrize(("url", "expected"), [
+        ("git@github.com:user/repo.git", ("git@github.com", None)),
+        ("github.com:user/repo.git", ("github.com", None)),
+        ("ssh://git@example.com:2222/user/repo.git", ("git@example.com", "2222")),
+        ("ssh://example.com/user/repo.git", ("example.com", None)),
+        ("https://github.com/user/repo.git", None),
+        ("file:///tmp/repo.git", None),
+        ("C:\\repos\\repo.git", None),
+    ])
+    def test_ssh_destination(self, url, expected):
+        assert ssh_destination(url) == expected
+
+    def test_ssh_master_is_shared_and_closed(self):
+        with ConnectionSharing("ssh://git@example.com:2222/user/repo.git") as sharing:
+            control_dir = sharing.control_dir
+            assert control_dir.is_dir()
+            connect = self._commands()[0]
+            assert connect[0] == "ssh"
+            assert f"ControlPath={control_dir}/%C" in connect
+            assert connect[-4:] == ["-p", "2222", "git@example.com", "exit"]
+            assert sharing.config_args[0] == "-c"
+            assert sharing.config_args[1].startswith("core.sshCommand=ssh -o ControlMaster=auto -o ")
+            assert sharing.handshake_seconds > 0
+
+        assert self._commands()[-1][-5:] == ["-O", "exit", "-p", "2222", "git@example.com"]
+        assert not control_dir.exists()
+        assert sharing.config_args == ()
+
+    def test_ssh_keeps_configured_ssh_command(self):
+        self.mock_git_config.return_value = ["ssh -i '/keys/deploy key'"]
+        with ConnectionSharing("git@github.com:user/repo.git") as sharing:
+            assert self._commands()[0][:3] == ["ssh", "-i", "/keys/deploy key"]
+            assert "core.sshCommand=ssh -i '/keys/deploy key' -o" in sharing.config_args[1]
+
+    def test_ssh_connection_failure_disables_sharing(self):
+        self.mock_run.return_value = Mock(returncode=255)
+        with ConnectionSharing("git@github.com:user/repo.git") as sharing:
+            assert sharing.config_args == ()
+            assert sharing.control_dir is None
+        # Nothing to tear down
+        assert len(self._commands()) == 1
+
+    def test_ssh_connection_timeout_disables_sharing(self):
+        self.mock_run.side_effect = subprocess.TimeoutExpired("ssh", 30)
+        with ConnectionSharing("git@github.com:user/repo.git") as sharing:
+            assert sharing.config_args == ()
+
+    def test_git_ssh_command_is_respected(self, monkeypatch):
+        monkeypatch.setenv('GIT_SSH_COMMAND', 'ssh -v')
+        with ConnectionSharing("git@github.com:user/repo.git") as sharing:
+            assert sharing.config_args == ()
+        self.mock_run.assert_not_called()
+
+    def test_https_credential_cache(self):
+        with ConnectionSharing("https://github.com/user/repo.git") as sharing:
+            socket = sharing.control_dir / "credentials"
+            assert sharing.config_args == (
+                "-c", f"credential.helper=cache --timeout=900 --socket={socket}",
+            )
+        assert sharing.control_dir is None
+
+    def test_https_with_credential_helper(self):
+        self.mock_git_config.return_value = ["osxkeychain"]
+        with ConnectionSharing("https://github.com/user/repo.git") as sharing:
+            assert sharing.config_args == ()
+
+    def test_local_remote(self):
+        with ConnectionSharing("file:///tmp/repo.git") as sharing:
+            assert sharing.config_args == ()
+        self.mock_run.assert_not_called()
+
+    def test_saved_seconds(self):
+        sharing = ConnectionSharing("git@github.com:user/repo.git")
+        sharing.handshake_seconds = 0.5
+        assert sharing.saved_seconds(4) == 1.5
+        assert sharing.saved_seconds(0) == 0
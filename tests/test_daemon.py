@@ -0,0 +1,178 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from gimer.cli import main
+from gimer.daemon import DaemonError, MergeServer, request
+from gimer.fleet import FleetResult
+
+
+class FakeJobs:
+    """Stand-in for the merge workers that records when each job ran."""
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.outcome = "merged"
+        self.delay = 0.2
+
+    def run(self, repo_url, target_branch, source_branch, config, log_path):
+        with self.lock:
+            self.events.append(("start", repo_url, source_branch))
+        log_path.write_text(f"merging {source_branch} into {target_branch}\n")
+        time.sleep(self.delay)
+        with self.lock:
+            self.events.append(("end", repo_url, source_branch))
+        if self.outcome == "error":
+            raise RuntimeError("worker died")
+        if self.outcome == "crash":
+            raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+        return FleetResult(repo_url, self.outcome, self.delay, log_path)
+
+    def index(self, kind, repo_url, source_branch):
+        return self.events.index((kind, repo_url, source_branch))
+
+
+@pytest.fixture
+def fake_jobs():
+    return FakeJobs()
+
+
+@pytest.fixture
+def socket_path(mocker, fake_jobs):
+    mocker.patch('gimer.daemon.get_github_repo_path', side_effect=Path)
+    # Unix socket paths must stay short, which pytest's tmp_path may not be
+    socket_dir = Path(tempfile.mkdtemp(prefix="gimer-test-", dir="/tmp"))
+    socket_path = socket_dir / "gimer.sock"
+    ready = threading.Event()
+    state = {}
+
+    async def serve():
+        server = MergeServer(
+            2, socket_dir, executor=ThreadPoolExecutor(2), run_job=fake_jobs.run, finish_job=lambda *_args: None,
+        )
+        unix_server = await asyncio.start_unix_server(server.handle, path=str(socket_path))
+        state["loop"], state["stop"] = asyncio.get_running_loop(), asyncio.Event()
+        ready.set()
+        await state["stop"].wait()
+        unix_server.close()
+        await server.shutdown()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    thread.start()
+    ready.wait(5)
+    yield socket_path
+    state["loop"].call_soon_threadsafe(state["stop"].set)
+    thread.join(5)
+    shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def _submit(socket_path, *jobs, wait=True):
+    specs = [
+        {"repo_url": url, "target_branch": "main", "source_branch": source, "config": {}}
+        for url, source in jobs
+    ]
+    return list(request(socket_path, {"type": "submit", "jobs": specs, "wait": wait}))
+
+
+class TestMergeServer:
+    def test_streams_output_and_result(self, socket_path):
+        replies = _submit(socket_path, ("github.com/user/repo", "feature"))
+        assert [r["type"] for r in replies] == ["accepted", "output", "done"]
+        assert replies[0]["jobs"][0]["state"] == "queued"
+        assert replies[1]["text"] == "merging feature into main\n"
+        assert replies[2]["outcome"] == "merged"
+        assert replies[2]["state"] == "done"
+
+    def test_serializes_jobs_per_repository(self, socket_path, fake_jobs):
+        _submit(
+            socket_path,
+            ("github.com/user/a", "first"),
+            ("github.com/user/a", "second"),
+            ("github.com/user/b", "other"),
+        )
+        # Jobs on one repository run in the order they were submitted
+        assert fake_jobs.index("end", "github.com/user/a", "first") < fake_jobs.index("start", "github.com/user/a", "second")
+        # Other repositories do not wait for them
+        assert fake_jobs.index("start", "github.com/user/b", "other") < fake_jobs.index("end", "github.com/user/a", "first")
+
+    def test_status(self, socket_path):
+        accepted = _submit(socket_path, ("github.com/user/repo", "feature"), wait=False)
+        assert [r["type"] for r in accepted] == ["accepted"]
+        jobs = next(request(socket_path, {"type": "status"}))["jobs"]
+        assert [(job["id"], job["repo_url"]) for job in jobs] == [(1, "github.com/user/repo")]
+        assert jobs[0]["state"] in {"queued", "running"}
+
+    def test_failed_job(self, socket_path, fake_jobs):
+        fake_jobs.outcome = "error"
+        done = _submit(socket_path, ("github.com/user/repo", "feature"))[-1]
+        assert (done["outcome"], done["error"]) == ("failed", "worker died")
+
+    def test_replaces_broken_workers(self, socket_path, fake_jobs, mocker):
+        mock_pool = mocker.patch('gimer.daemon.ProcessPoolExecutor', side_effect=lambda **_kwargs: ThreadPoolExecutor(2))
+        fake_jobs.outcome = "crash"
+        done = _submit(socket_path, ("github.com/user/repo", "feature"))[-1]
+        assert (done["outcome"], done["error"]) == ("failed", "A worker process died during the job.")
+        mock_pool.assert_called_once()
+
+        fake_jobs.outcome = "merged"
+        assert _submit(socket_path, ("github.com/user/repo", "feature"))[-1]["outcome"] == "merged"
+
+    @pytest.mark.parametrize("message", [
+        {"type": "restart"},
+        {"type": "submit", "jobs": [{"repo_url": "github.com/user/repo"}]},
+    ])
+    def test_invalid_request(self, socket_path, message):
+        with pytest.raises(DaemonError):
+            list(request(socket_path, message))
+
+    def test_no_daemon(self, tmp_path):
+        with pytest.raises(DaemonError, match="No gimer daemon"):
+            list(request(tmp_path / "missing.sock", {"type": "status"}))
+
+
+class TestSubmitCommand:
+    @pytest.fixture
+    def mock_request(self, mocker):
+        def replies(_socket_path, message):
+            self.message = message
+            yield {"type": "accepted", "jobs": [{"id": 1, "repo_url": message["jobs"][0]["repo_url"]}]}
+            yield {"type": "output", "job": 1, "text": "merging\n"}
+            yield {
+                "type": "done", "id": 1, "repo_url": message["jobs"][0]["repo_url"], "state": "done",
+                "outcome": self.outcome, "seconds": 0.5, "error": "", "log_path": "/tmp/job.log",
+            }
+
+        self.outcome = "merged"
+        return mocker.patch('gimer.daemon.request', side_effect=replies)
+
+    def test_submit(self, mock_request):
+        result = CliRunner().invoke(
+            main, ['submit', 'https://github.com/user/repo.git', '--source', 'dev', '--target', 'main', '--trace', 'trace.json'],
+        )
+        assert result.exit_code == 0, result.output
+        assert "merging" in result.output
+        spec = self.message["jobs"][0]
+        assert (spec["repo_url"], spec["source_branch"], spec["target_branch"]) == ("https://github.com/user/repo.git", "dev", "main")
+        assert spec["config"]["no_confirm"] is True
+        assert spec["config"]["trace"] is None
+        assert self.message["wait"] is True
+
+    def test_submit_conflict_fails(self, mock_request):
+        self.outcome = "conflict"
+        result = CliRunner().invoke(main, ['submit', 'https://github.com/user/repo.git', '--source', 'dev', '--target', 'main'])
+        assert result.exit_code == 1
+
+    def test_submit_needs_branches(self, mock_request):
+        result = CliRunner().invoke(main, ['submit', 'https://github.com/user/repo.git'])
+        assert result.exit_code == 2
+        assert "branch picker" in result.output
+        mock_request.assert_not_called()
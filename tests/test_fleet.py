@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gimer.cli import MergeOutcome
+from gimer.fleet import FleetResult, merge_repository, read_manifest, run_fleet
+from gimer.git import GitError
+
+URLS = ['https://github.com/user/a.git', 'https://github.com/user/b.git', 'https://github.com/user/c.git']
+CONFIG = {'dry_run': False, 'no_confirm': False, 'confirm_all': False, 'trace': None}
+
+
+class TestReadManifest:
+    def test_skips_comments_and_blank_lines(self, tmp_path):
+        manifest = tmp_path / 'repos.txt'
+        manifest.write_text('# fleet\nhttps://github.com/user/a.git\n\n  https://github.com/user/b.git  # b\n')
+        assert read_manifest(manifest) == URLS[:2]
+
+
+class TestMergeRepository:
+    @pytest.fixture(autouse=True)
+    def _common_mocks(self, mocker):
+        self.mock_merge = mocker.patch('gimer.fleet.merge')
+        mocker.patch('gimer.fleet.get_github_repo_path')
+
+    def test_logs_output_and_returns_outcome(self, tmp_path):
+        def fake_merge(*args):
+            # Output of git itself, which writes to the inherited descriptors
+            os.write(1, b'Fast-forward\n')
+            return MergeOutcome.MERGED
+        self.mock_merge.side_effect = fake_merge
+        log_path = tmp_path / 'a.log'
+        result = merge_repository(URLS[0], 'main', 'release', CONFIG, log_path)
+        assert result.outcome == MergeOutcome.MERGED
+        assert result.log_path == log_path
+        assert 'Fast-forward' in log_path.read_text()
+
+    def test_error_is_summarized(self, tmp_path):
+        self.mock_merge.side_effect = GitError('git push origin main failed: rejected\n ! [rejected] main\n')
+        result = merge_repository(URLS[0], 'main', 'release', CONFIG, tmp_path / 'a.log')
+        assert result.outcome == MergeOutcome.FAILED
+        assert result.error == ' ! [rejected] main'
+
+    def test_prompt_fails_instead_of_waiting(self, tmp_path):
+        self.mock_merge.side_effect = lambda *args: input()
+        result = merge_repository(URLS[0], 'main', 'release', CONFIG, tmp_path / 'a.log')
+        assert result.outcome == MergeOutcome.FAILED
+
+
+class TestRunFleet:
+    @pytest.fixture(autouse=True)
+    def _common_mocks(self, mocker):
+        mocker.patch('gimer.fleet.ProcessPoolExecutor', ThreadPoolExecutor)
+        self.mock_merge_repository = mocker.patch('gimer.fleet.merge_repository')
+        self.mock_merge = mocker.patch('gimer.fleet.merge')
+        self.mock_confirm_ask = mocker.patch('gimer.fleet.Confirm.ask', return_value=True)
+        self.mock_console_print = mocker.patch('gimer.fleet.console.print')
+        mocker.patch('gimer.fleet.get_github_repo_path')
+        mocker.patch('gimer.fleet.maintain_cache')
+        outcomes = {URLS[0]: MergeOutcome.MERGED, URLS[1]: MergeOutcome.CONFLICT, URLS[2]: MergeOutcome.FAILED}
+        self.mock_merge_repository.side_effect = lambda url, *args: FleetResult(url, outcomes[url], 1.0)
+
+    def test_unattended_workers_and_conflict_queue(self):
+        self.mock_merge.return_value = MergeOutcome.MERGED
+        results = run_fleet(URLS, 'main', 'release', CONFIG, jobs=2)
+        assert [r.repo_url for r in results] == URLS
+        assert [r.outcome for r in results] == [MergeOutcome.MERGED, MergeOutcome.MERGED, MergeOutcome.FAILED]
+        worker_config = self.mock_merge_repository.call_args[0][3]
+        assert worker_config['no_confirm'] is True
+        # Only the conflicted repository is merged again interactively
+        self.mock_merge.assert_called_once()
+        assert self.mock_merge.call_args[0][1] == URLS[1]
+        assert self.mock_merge.call_args[0][4]['no_confirm'] is False
+
+    def test_no_confirm_leaves_conflicts_queued(self):
+        results = run_fleet(URLS, 'main', 'release', {**CONFIG, 'no_confirm': True}, jobs=2)
+        assert results[1].outcome == MergeOutcome.CONFLICT
+        self.mock_confirm_ask.assert_not_called()
+        self.mock_merge.assert_not_called()
+
+    def test_declined(self):
+        self.mock_confirm_ask.return_value = False
+        assert run_fleet(URLS, 'main', 'release', CONFIG, jobs=2) == []
+        self.mock_merge_repository.assert_not_called()
@@ -1,9 +1,17 @@
 import subprocess
+import time
+from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
 
-from gimer.git import Git, GitError, UserAbortedError
+from gimer.git import (
+    Git,
+    GitError,
+    GitTimeoutError,
+    UserAbortedError,
+    fast_state_config,
+)
 
 
 class TestGit:
@@ -19,6 +27,14 @@ class TestGit:
         mock_result.stdout = ""
         self.mock_subprocess_run.return_value = mock_result
 
+        self.mock_popen = mocker.patch('gimer.git.subprocess.Popen')
+        self.mock_process = self.mock_popen.return_value.__enter__.return_value
+        self.mock_process.stdout = iter([])
+        self.mock_process.wait.return_value = 0
+
+    def _streamed_commands(self):
+        return [c[0][0] for c in self.mock_popen.call_args_list]
+
     @pytest.fixture
     def git(self):
         return Git(dry_run=False, no_confirm=True, confirm_all=False)
@@ -68,6 +84,7 @@ class TestGit:
         self.mock_console_print.assert_called_once_with("[yellow]≫ git status[/yellow]")
         self.mock_subprocess_run.assert_called_once_with(
             ["git", "status"],
+            cwd=None,
             check=True,
             capture_output=True,
             stderr=None,
@@ -102,38 +119,203 @@ class TestGit:
 
     def test_clone_repository(self, git):
         git.clone_repository("https://github.com/user/repo.git")
-        self.mock_subprocess_run.assert_called_once_with(
+        self.mock_popen.assert_called_once_with(
             ["git", "clone", "https://github.com/user/repo.git", "/current/dir"],
-            check=True,
-            capture_output=False,
+            cwd=None,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True
+            text=True,
+            errors="replace",
         )
 
-    def test_get_branches(self, git):
-        self.mock_subprocess_run.return_value.stdout = "origin/main\norigin/develop\norigin/HEAD"
+    def test_clone_repository_blobless(self):
+        git = Git(no_confirm=True, clone_strategy="blobless")
+        git.clone_repository("https://github.com/user/repo.git")
+        assert self._streamed_commands() == [
+            ["git", "clone", "--filter=blob:none", "https://github.com/user/repo.git", "/current/dir"],
+        ]
+
+    def test_clone_repository_with_reference(self, git):
+        git.clone_repository("https://github.com/user/repo.git", reference=Path("/cache/objects.git"))
+        assert self.mock_popen.call_args[0][0] == [
+            "git", "clone", "--reference-if-able", "/cache/objects.git",
+            "https://github.com/user/repo.git", "/current/dir",
+        ]
+
+    def test_update_reference_store(self, git, tmp_path):
+        git.update_reference_store(tmp_path, "https://github.com/user/repo.git", "github.com/user/repo")
+        assert [c[0][0] for c in self.mock_subprocess_run.call_args_list] == [
+            ["git", "init", "--bare", str(tmp_path)],
+            ["git", "-C", str(tmp_path), "config", "gc.pruneExpire", "never"],
+        ]
+        assert self._streamed_commands() == [
+            ["git", "-C", str(tmp_path), "fetch", "--no-tags", "https://github.com/user/repo.git",
+             "+refs/heads/*:refs/remotes/github.com/user/repo/*"],
+        ]
+
+    def test_link_reference_store(self, git, tmp_path):
+        store = tmp_path / "objects.git"
+        (store / "objects").mkdir(parents=True)
+        (tmp_path / "repo" / ".git" / "objects").mkdir(parents=True)
+        self.mock_os_getcwd.return_value = str(tmp_path / "repo")
+
+        git.link_reference_store(store)
+        git.link_reference_store(store)
+
+        alternates = tmp_path / "repo" / ".git" / "objects" / "info" / "alternates"
+        assert alternates.read_text() == f"{store / 'objects'}\n"
+
+    @pytest.fixture
+    def shallow_git(self, tmp_path):
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".git" / "shallow").write_text("0123456789abcdef0123456789abcdef01234567\n")
+        return Git(no_confirm=True, cwd=tmp_path)
+
+    def test_fetch_shallow(self, shallow_git):
+        # A repository cloned shallow stays shallow, without --clone-strategy
+        shallow_git.fetch()
+        assert self._streamed_commands() == [["git", "fetch", "--depth=1", "origin"]]
+
+    def test_ensure_merge_base_full_clone(self, git):
+        git.ensure_merge_base("main", "develop")
+        self.mock_subprocess_run.assert_not_called()
+
+    def test_ensure_merge_base_deepens_shallow_clone(self, shallow_git):
+        no_merge_base = subprocess.CalledProcessError(1, "git")
+        self.mock_subprocess_run.side_effect = [no_merge_base, no_merge_base, Mock(stdout="")]
+        shallow_git.ensure_merge_base("main", "develop")
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [["git", "merge-base", "main", "develop"]] * 3
+        assert self._streamed_commands() == [
+            ["git", "fetch", "--deepen=64", "origin"],
+            ["git", "fetch", "--deepen=128", "origin"],
+        ]
+
+    def test_is_partial_clone(self, git, mocker):
+        mocker.patch('gimer.git.RepositoryQueries')
+        self.mock_subprocess_run.return_value = Mock(stdout="true\n", returncode=0)
+        assert git.is_partial_clone() is True
+        assert self.mock_subprocess_run.call_args[0][0] == ["git", "config", "--bool", "--get", "remote.origin.promisor"]
+        self.mock_subprocess_run.return_value = Mock(stdout="", returncode=1)
+        assert git.is_partial_clone() is False
+
+    def test_get_branches(self, git, mocker):
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries')
+        mock_queries.return_value.remote_branches.return_value = ["main", "develop"]
         branches = git.get_branches()
         assert branches == ["main", "develop"]
+        mock_queries.assert_called_once_with(Path("/current/dir"))
+        self.mock_subprocess_run.assert_not_called()
+
+    def test_queries_follow_current_directory(self, git, mocker):
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries')
+        mock_queries.return_value.path = Path("/current/dir")
+        git.get_branches()
+        git.get_branches()
+        self.mock_os_getcwd.return_value = "/other/dir"
+        git.get_branches()
+        assert mock_queries.call_count == 2
+        mock_queries.return_value.close.assert_called_once()
 
     def test_check_working_directory_clean_true(self, git):
-        self.mock_subprocess_run.return_value.stdout = ""
         assert git.check_working_directory_clean() is True
+        assert self._streamed_commands() == [["git", "status", "--porcelain", "--no-renames"]]
 
     def test_check_working_directory_clean_false(self, git):
-        self.mock_subprocess_run.return_value.stdout = "M modified_file.py"
+        self.mock_process.stdout = iter(["M modified_file.py\n", "?? untracked.py\n"])
         assert git.check_working_directory_clean() is False
+        # The rest of the output is not needed, so the command is stopped
+        self.mock_process.kill.assert_called_once()
+
+    def test_stream_git_command_failure(self, git):
+        self.mock_process.stdout = iter(["partial\n"])
+        self.mock_process.wait.return_value = 128
+        with pytest.raises(GitError):
+            list(git._stream_git_command("status", "--porcelain"))
+
+    def test_run_streamed_git_command_prints_output(self, git):
+        self.mock_process.stdout = iter([
+            "Receiving objects:  50% (1/2)\n",
+            "Receiving objects: 100% (2/2), done.\n",
+            "From example.com\n",
+        ])
+        git._run_streamed_git_command("fetch", "origin")
+        printed = [c.args[0] for c in self.mock_console_print.call_args_list if c.args]
+        assert printed == [
+            "[yellow]≫ git fetch origin[/yellow]",
+            "Receiving objects: 100% (2/2), done.",
+            "From example.com",
+        ]
+
+    def test_run_streamed_git_command_failure_keeps_output_tail(self, git):
+        self.mock_process.stdout = iter([f"line {i}\n" for i in range(100)] + ["CONFLICT (content): a.txt\n"])
+        self.mock_process.wait.return_value = 1
+        with pytest.raises(GitError) as exc_info:
+            git._run_streamed_git_command("merge", "--no-edit", "develop")
+        message = str(exc_info.value)
+        assert "CONFLICT (content): a.txt" in message
+        assert "line 0\n" not in message
 
-    def test_clean_working_directory(self, git):
+    def test_clean_working_directory_resets_changed_paths(self, git):
+        self.mock_subprocess_run.return_value.stdout = " M a.py\0A  new file\0?? build/\0"
         git.clean_working_directory()
-        assert self.mock_subprocess_run.call_count == 2
-        calls = self.mock_subprocess_run.call_args_list
-        assert calls[0][0][0] == ["git", "clean", "-fdx"]
-        assert calls[1][0][0] == ["git", "reset", "--hard"]
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [
+            ["git", "status", "--porcelain", "-z", "--no-renames"],
+            ["git", "restore", "--source=HEAD", "--staged", "--worktree", "--", ":(literal)a.py", ":(literal)new file"],
+            ["git", "clean", "-fdx", "--", ":(literal)build/"],
+        ]
+
+    def test_clean_working_directory_nothing_changed(self, git):
+        git.clean_working_directory()
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [["git", "status", "--porcelain", "-z", "--no-renames"]]
+
+    def test_clean_working_directory_full_reset_during_merge(self, git, mocker):
+        mocker.patch.object(git, 'is_merge_in_progress', return_value=True)
+        git.clean_working_directory()
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [["git", "clean", "-fdx"], ["git", "reset", "--hard"]]
+
+    def test_clean_working_directory_full_reset_for_many_paths(self, git, mocker):
+        mocker.patch('gimer.git.RESET_PATHS_LIMIT', 1)
+        self.mock_subprocess_run.return_value.stdout = " M a.py\0 M b.py\0"
+        git.clean_working_directory()
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands[1:] == [["git", "clean", "-fdx"], ["git", "reset", "--hard"]]
+
+    def test_clean_working_directory_falls_back_when_restore_fails(self, git):
+        status = Mock(stdout=" M a.py\0")
+        self.mock_subprocess_run.side_effect = [
+            status, subprocess.CalledProcessError(128, "git restore"), Mock(), Mock(),
+        ]
+        git.clean_working_directory()
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands[2:] == [["git", "clean", "-fdx"], ["git", "reset", "--hard"]]
+
+    def test_configure_fast_state_sets_missing_config(self, git, mocker):
+        mocker.patch('gimer.git.platform.system', return_value="Darwin")
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries').return_value
+        mock_queries.path = Path("/current/dir")
+        mock_queries.config_values.return_value = {
+            "core.untrackedCache": "true", "feature.manyFiles": None, "core.fsmonitor": "false",
+        }
+        git.configure_fast_state()
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [
+            ["git", "config", "feature.manyFiles", "true"],
+            ["git", "config", "core.fsmonitor", "true"],
+        ]
+
+    def test_fast_state_config_without_fsmonitor_on_linux(self, mocker):
+        mocker.patch('gimer.git.platform.system', return_value="Linux")
+        assert "core.fsmonitor" not in fast_state_config()
 
     def test_checkout_branch(self, git):
         git.checkout_branch("develop")
         self.mock_subprocess_run.assert_called_once_with(
             ["git", "checkout", "develop"],
+            cwd=None,
             check=True,
             capture_output=False,
             stderr=subprocess.STDOUT,
@@ -142,56 +324,203 @@ class TestGit:
 
     def test_fetch(self, git):
         git.fetch()
-        self.mock_subprocess_run.assert_called_once_with(
+        self.mock_popen.assert_called_once_with(
             ["git", "fetch", "origin"],
-            check=True,
-            capture_output=False,
+            cwd=None,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True
+            text=True,
+            errors="replace",
         )
 
-    def test_pull_branch(self, git):
-        git.pull_branch("main")
-        self.mock_subprocess_run.assert_called_once_with(
-            ["git", "pull", "origin", "main"],
-            check=True,
-            capture_output=False,
+    def test_fetch_quiet(self, git):
+        git.fetch(quiet=True)
+        self.mock_popen.assert_not_called()
+        self.mock_console_print.assert_not_called()
+        assert self.mock_subprocess_run.call_args[0][0] == ["git", "fetch", "origin"]
+
+    def test_fetch_branches(self, git):
+        git.fetch_branches(["develop", "main", "main"])
+        assert self.mock_popen.call_args[0][0] == [
+            "git", "fetch", "origin",
+            "+refs/heads/develop:refs/remotes/origin/develop",
+            "+refs/heads/main:refs/remotes/origin/main",
+        ]
+
+    def test_update_branch(self, git):
+        git.update_branch("develop")
+        assert self.mock_subprocess_run.call_args[0][0] == [
+            "git", "fetch", ".", "+refs/remotes/origin/develop:refs/heads/develop",
+        ]
+
+    def test_update_current_branch(self, git):
+        git.update_current_branch("main")
+        assert self.mock_popen.call_args[0][0] == ["git", "merge", "--no-edit", "origin/main"]
+
+    def test_update_current_branch_deepens_shallow_clone(self, shallow_git):
+        self.mock_subprocess_run.side_effect = [subprocess.CalledProcessError(1, "git"), Mock(stdout="")]
+        shallow_git.update_current_branch("main")
+        assert self.mock_subprocess_run.call_args_list[0][0][0] == ["git", "merge-base", "main", "origin/main"]
+        assert self._streamed_commands() == [
+            ["git", "fetch", "--deepen=64", "origin"],
+            ["git", "merge", "--no-edit", "origin/main"],
+        ]
+
+    def test_network_round_trips(self, git):
+        git.fetch_branches(["main"])
+        git.update_branch("develop")
+        git.checkout_branch("main")
+        git.update_current_branch("main")
+        git.update_reference_store(Path("/cache/objects.git"), "https://github.com/user/repo.git", "ns")
+        git.push_branch("main")
+        assert git.network_round_trips == 3
+        assert git.network_commands_run == 3
+
+    @pytest.mark.parametrize(("args", "network"), [
+        (("clone", "--reference-if-able", "/cache/objects.git", "https://github.com/user/repo.git", "/repo"), True),
+        (("clone", "--quiet", "--local", "/cache/repo", "/workspace"), False),
+        (("fetch", ".", "refs/remotes/origin/main:refs/heads/main"), False),
+        (("-C", "/cache/objects.git", "fetch", "--no-tags", "https://github.com/user/repo.git"), True),
+        (("status", "--porcelain"), False),
+    ])
+    def test_is_network_command(self, args, network):
+        assert Git._is_network_command(args) is network
+
+    def test_dry_run_runs_no_network_commands(self, git_dry_run):
+        git_dry_run.fetch_branches(["main"])
+        assert git_dry_run.network_round_trips == 1
+        assert git_dry_run.network_commands_run == 0
+
+    def test_config_args_are_passed_to_every_command(self, git):
+        git.config_args = ("-c", "core.sshCommand=ssh -o ControlMaster=auto")
+        git.checkout_branch("main")
+        git.fetch()
+        assert self.mock_subprocess_run.call_args[0][0] == ["git", *git.config_args, "checkout", "main"]
+        assert self.mock_popen.call_args[0][0] == ["git", *git.config_args, "fetch", "origin"]
+
+    def test_create_workspace(self, git, tmp_path):
+        cache, workspace = tmp_path / "cache", tmp_path / "workspace"
+        self.mock_subprocess_run.return_value = Mock(stdout="main\n")
+        git.create_workspace(cache, workspace, "https://github.com/user/repo.git")
+        commands = [c[0][0] for c in self.mock_subprocess_run.call_args_list]
+        assert commands == [
+            ["git", "clone", "--quiet", "--local", str(cache), str(workspace)],
+            ["git", "-C", str(workspace), "remote", "set-url", "origin", "https://github.com/user/repo.git"],
+            ["git", "-C", str(workspace), "fetch", "--quiet", "--no-tags", "--prune", str(cache),
+             "+refs/remotes/origin/*:refs/remotes/origin/*"],
+            ["git", "-C", str(workspace), "symbolic-ref", "--short", "HEAD"],
+            ["git", "-C", str(workspace), "checkout", "--quiet", "--detach"],
+            ["git", "-C", str(workspace), "branch", "--quiet", "-D", "main"],
+        ]
+        # Copying from the cache and back never touches the network
+        git.update_cache(cache, workspace)
+        assert git.network_round_trips == 0
+
+    def test_merge_octopus(self, git):
+        git.merge_octopus(["feature-a", "feature-b"])
+        self.mock_popen.assert_called_once_with(
+            ["git", "merge", "--no-edit", "feature-a", "feature-b"],
+            cwd=None,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True
+            text=True,
+            errors="replace",
+        )
+
+    def test_push_branches_atomic(self, git):
+        git.push_branches(["release/1.1", "main", "main"])
+        self.mock_popen.assert_called_once_with(
+            ["git", "push", "--atomic", "origin", "release/1.1", "main"],
+            cwd=None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
         )
 
     def test_push_branch(self, git):
         git.push_branch("main")
-        self.mock_subprocess_run.assert_called_once_with(
+        self.mock_popen.assert_called_once_with(
             ["git", "push", "origin", "main"],
-            check=True,
-            capture_output=False,
+            cwd=None,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True
+            text=True,
+            errors="replace",
         )
 
     def test_merge_branch(self, git):
         git.merge_branch("develop")
-        self.mock_subprocess_run.assert_called_once_with(
+        self.mock_popen.assert_called_once_with(
             ["git", "merge", "--no-edit", "develop"],
-            check=True,
-            capture_output=False,
+            cwd=None,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             text=True,
+            errors="replace",
         )
 
-    def test_is_merge_in_progress_true(self, git):
-        self.mock_subprocess_run.return_value.stdout = "merge_head_hash"
+    def test_is_merge_in_progress_true(self, git, mocker):
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries')
+        mock_queries.return_value.is_merge_in_progress.return_value = True
         assert git.is_merge_in_progress() is True
+        self.mock_subprocess_run.assert_not_called()
 
-    def test_is_merge_in_progress_false(self, git):
-        self.mock_subprocess_run.side_effect = GitError("No MERGE_HEAD")
+    def test_is_merge_in_progress_false(self, git, mocker):
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries')
+        mock_queries.return_value.is_merge_in_progress.return_value = False
         assert git.is_merge_in_progress() is False
 
+    def test_rev_parse(self, git, mocker):
+        mock_queries = mocker.patch('gimer.git.RepositoryQueries')
+        mock_queries.return_value.resolve.return_value = "commit_hash"
+        assert git.rev_parse("origin/main") == "commit_hash"
+        mock_queries.return_value.resolve.return_value = None
+        with pytest.raises(GitError):
+            git.rev_parse("origin/missing")
+
+    def test_merge_tree_clean(self, git):
+        self.mock_subprocess_run.return_value.stdout = "tree_hash\n"
+        assert git.merge_tree("origin/main", "origin/develop") == ("tree_hash", [])
+        self.mock_subprocess_run.assert_called_once_with(
+            ["git", "merge-tree", "--write-tree", "--name-only", "--no-messages", "origin/main", "origin/develop"],
+            cwd=None,
+            check=False,
+            capture_output=True,
+            stderr=None,
+            text=True,
+        )
+
+    def test_merge_tree_conflict(self, git):
+        self.mock_subprocess_run.return_value.stdout = "tree_hash\na.txt\nb.txt\n"
+        assert git.merge_tree("origin/main", "origin/develop") == ("tree_hash", ["a.txt", "b.txt"])
+
+    def test_merge_tree_failure(self, git):
+        self.mock_subprocess_run.return_value.stdout = ""
+        with pytest.raises(GitError):
+            git.merge_tree("origin/main", "origin/develop")
+
+    def test_commit_tree(self, git):
+        self.mock_subprocess_run.return_value.stdout = "commit_hash\n"
+        assert git.commit_tree("tree_hash", ["a", "b"], "Merge") == "commit_hash"
+        assert self.mock_subprocess_run.call_args[0][0] == [
+            "git", "commit-tree", "tree_hash", "-p", "a", "-p", "b", "-m", "Merge",
+        ]
+
+    def test_is_ancestor(self, git):
+        assert git.is_ancestor("a", "b") is True
+        self.mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, "git")
+        assert git.is_ancestor("a", "b") is False
+
+    def test_push_commit(self, git):
+        git.push_commit("commit_hash", "main")
+        assert self.mock_popen.call_args[0][0] == ["git", "push", "origin", "commit_hash:refs/heads/main"]
+
     def test_resolve_conflicts(self, git):
         git.resolve_conflicts()
         self.mock_subprocess_run.assert_called_once_with(
             ["git", "mergetool"],
+            cwd=None,
             check=True,
             capture_output=False,
             stderr=subprocess.STDOUT,
@@ -202,6 +531,7 @@ class TestGit:
         git.abort_merge()
         self.mock_subprocess_run.assert_called_once_with(
             ["git", "merge", "--abort"],
+            cwd=None,
             check=True,
             capture_output=False,
             stderr=subprocess.STDOUT,
@@ -212,8 +542,46 @@ class TestGit:
         git.commit_merge()
         self.mock_subprocess_run.assert_called_once_with(
             ["git", "commit"],
+            cwd=None,
             check=True,
             capture_output=False,
             stderr=subprocess.STDOUT,
             text=True
         )
+
+
+class TestCommandsInRepository:
+    # Runs `sleep` through a shell alias, so the git process stays alive for a while
+    SLOW_COMMAND = ("-c", "alias.slow=!sleep 5", "slow")
+
+    @pytest.fixture
+    def git(self, tmp_path, mocker):
+        mocker.patch('gimer.git.console.print')
+        for args in (("init", "-b", "main"), ("commit", "--allow-empty", "-m", "initial"),
+                     ("checkout", "-b", "feature"), ("commit", "--allow-empty", "-m", "feature")):
+            subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=tmp_path, check=True, capture_output=True)
+        return Git(no_confirm=True, cwd=tmp_path)
+
+    def test_are_ancestors(self, git):
+        assert git.are_ancestors([("main", "feature"), ("feature", "main")]) == [True, False]
+
+    def test_run_with_timeout_stops_command(self, git):
+        start = time.perf_counter()
+        with pytest.raises(GitTimeoutError):
+            git.run_with_timeout(*self.SLOW_COMMAND, timeout=0.2)
+        assert time.perf_counter() - start < 2
+
+    def test_run_with_timeout_failure(self, git):
+        with pytest.raises(GitError, match="unknown"):
+            git.run_with_timeout("rev-parse", "--verify", "unknown", timeout=10)
+
+    def test_run_with_timeout_lets_git_remove_its_locks(self, git, tmp_path):
+        # git holds the lock of a ref while the reference-transaction hook runs
+        hooks = tmp_path / "hooks"
+        hooks.mkdir()
+        (hooks / "reference-transaction").write_text("#!/bin/sh\nsleep 5\n")
+        (hooks / "reference-transaction").chmod(0o755)
+        git.config_args = ("-c", f"core.hooksPath={hooks}")
+        with pytest.raises(GitTimeoutError):
+            git.run_with_timeout("update-ref", "refs/heads/moved", "HEAD", timeout=0.5)
+        assert not (tmp_path / ".git" / "refs" / "heads" / "moved.lock").exists()
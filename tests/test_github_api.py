@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+
+import pytest
+
+from gimer.github_api import (
+    ETagCache,
+    GitHubAPIError,
+    GitHubClient,
+    MergeResult,
+    RateLimitError,
+    parse_repository,
+)
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    """Stand-in for the few GitHub endpoints gimer uses."""
+
+    branches: ClassVar[list[str]] = [f"branch-{i}" for i in range(150)]
+    merge_status = 201
+    # Responses served before the real one, e.g. rate limit errors
+    queued: ClassVar[list[tuple[int, dict[str, str], dict | bytes]]] = []
+    requests: ClassVar[list[tuple[str, str, dict[str, str], dict | None]]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, headers=None, body=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        data = body if isinstance(body, bytes) else b"" if body is None else json.dumps(body).encode()
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _record(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        self.requests.append((self.command, self.path, self.headers, body))
+        if self.queued:
+            self._send(*self.queued.pop(0))
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._record():
+            return
+        assert self.path.startswith("/repos/user/repo/branches?per_page=100")
+        page = 2 if "page=2" in self.path else 1
+        etag = f'"branches-{page}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, {"ETag": etag})
+            return
+        headers = {"ETag": etag}
+        if page == 1:
+            headers["Link"] = f'<http://{self.headers["Host"]}/repos/user/repo/branches?per_page=100&page=2>; rel="next"'
+        names = self.branches[:100] if page == 1 else self.branches[100:]
+        self._send(200, headers, [{"name": name} for name in names])
+
+    def do_POST(self):
+        if not self._record():
+            return
+        assert self.path == "/repos/user/repo/merges"
+        assert self.headers["Authorization"] == "Bearer secret"
+        if self.merge_status == 201:
+            self._send(201, {}, {"sha": "abc123"})
+        elif self.merge_status == 409:
+            self._send(409, {}, {"message": "Merge conflict"})
+        elif self.merge_status == 404:
+            self._send(404, {}, {"message": "Base does not exist"})
+        else:
+            self._send(self.merge_status)
+
+
+@pytest.fixture
+def server():
+    FakeGitHub.requests = []
+    FakeGitHub.queued = []
+    FakeGitHub.merge_status = 201
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server, tmp_path):
+    return GitHubClient("secret", "user", "repo", base_url=server, cache=ETagCache(tmp_path / "etags.json"), sleep=lambda _: None)
+
+
+class TestGitHubClient:
+    @pytest.mark.parametrize(("url", "expected"), [
+        ("https://github.com/user/repo.git", ("user", "repo")),
+        ("https://github.com/user/repo", ("user", "repo")),
+        ("git@github.com:user/repo.git", ("user", "repo")),
+    ])
+    def test_parse_repository(self, url, expected):
+        assert parse_repository(url) == expected
+
+    def test_merge(self, client):
+        assert client.merge("main", "feature", "Merge branch 'feature' into main") == (MergeResult.MERGED, "abc123")
+        _method, _path, headers, body = FakeGitHub.requests[0]
+        assert body == {"base": "main", "head": "feature", "commit_message": "Merge branch 'feature' into main"}
+        assert headers["X-GitHub-Api-Version"] == "2022-11-28"
+        assert client.requests == 1
+
+    @pytest.mark.parametrize(("status", "result"), [(204, MergeResult.UP_TO_DATE), (409, MergeResult.CONFLICT)])
+    def test_merge_results(self, client, status, result):
+        FakeGitHub.merge_status = status
+        assert client.merge("main", "feature", "message") == (result, None)
+
+    def test_merge_error(self, client):
+        FakeGitHub.merge_status = 404
+        with pytest.raises(GitHubAPIError, match="Base does not exist") as exc_info:
+            client.merge("missing", "feature", "message")
+        assert exc_info.value.status == 404
+
+    def test_list_branches_follows_pages(self, client):
+        assert client.list_branches() == FakeGitHub.branches
+        assert client.requests == 2
+
+    def test_list_branches_revalidates_with_etags(self, server, tmp_path):
+        cache_path = tmp_path / "etags.json"
+        GitHubClient("secret", "user", "repo", base_url=server, cache=ETagCache(cache_path)).list_branches()
+        FakeGitHub.requests = []
+
+        # A new client, as in the next gimer run, reads the cache from disk
+        client = GitHubClient("secret", "user", "repo", base_url=server, cache=ETagCache(cache_path))
+        assert client.list_branches() == FakeGitHub.branches
+        assert [headers.get("If-None-Match") for _, _, headers, _ in FakeGitHub.requests] == ['"branches-1"', '"branches-2"']
+
+    def test_waits_for_secondary_rate_limit(self, client):
+        waits = []
+        client.on_wait = waits.append
+        FakeGitHub.queued = [(403, {"Retry-After": "2"}, {"message": "secondary rate limit"})]
+        assert client.merge("main", "feature", "message") == (MergeResult.MERGED, "abc123")
+        assert waits == [2.0]
+        assert client.requests == 2
+
+    def test_waits_for_primary_rate_limit_reset(self, client):
+        reset = str(int(time.time()) + 5)
+        FakeGitHub.queued = [(429, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}, {})]
+        assert client.merge("main", "feature", "message") == (MergeResult.MERGED, "abc123")
+
+    def test_long_rate_limit_fails(self, client):
+        reset = str(int(time.time()) + 3600)
+        FakeGitHub.queued = [(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}, {})]
+        with pytest.raises(RateLimitError):
+            client.merge("main", "feature", "message")
+        assert client.requests == 1
+
+    def test_forbidden_without_rate_limit(self, client):
+        FakeGitHub.queued = [(403, {"X-RateLimit-Remaining": "4999"}, {"message": "Resource not accessible"})]
+        with pytest.raises(GitHubAPIError, match="Resource not accessible"):
+            client.merge("main", "feature", "message")
+
+    def test_error_without_json(self, client):
+        FakeGitHub.queued = [(502, {}, b"<html>Bad Gateway</html>")]
+        with pytest.raises(GitHubAPIError, match="502: no details"):
+            client.merge("main", "feature", "message")
+
+    def test_connection_error(self, tmp_path):
+        client = GitHubClient("secret", "user", "repo", base_url="http://127.0.0.1:9")
+        with pytest.raises(GitHubAPIError):
+            client.merge("main", "feature", "message")
+
+
+class TestETagCache:
+    def test_keeps_the_most_recent_entries(self, tmp_path, mocker):
+        mocker.patch('gimer.github_api.ETAG_CACHE_ENTRIES', 2)
+        cache = ETagCache(tmp_path / "etags.json")
+        for i in range(3):
+            cache.put(f"url-{i}", f'"{i}"', [i], None)
+        cache.save()
+        assert list(ETagCache(tmp_path / "etags.json").entries) == ["url-1", "url-2"]
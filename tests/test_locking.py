@@ -0,0 +1,57 @@
+import os
+import time
+
+import pytest
+
+from gimer.locking import LockTimeoutError, RepositoryLock
+
+
+class TestRepositoryLock:
+    @pytest.fixture
+    def repo_path(self, tmp_path):
+        return tmp_path / "github.com" / "user" / "repo"
+
+    def test_lock_file_next_to_repository(self, repo_path):
+        lock = RepositoryLock(repo_path)
+        with lock.exclusive():
+            assert lock.path == repo_path.parent / "repo.lock"
+            assert lock.path.exists()
+        assert not repo_path.exists()
+
+    def test_exclusive_excludes_others(self, repo_path):
+        with RepositoryLock(repo_path).exclusive():
+            with pytest.raises(LockTimeoutError), RepositoryLock(repo_path, timeout=0.1).exclusive():
+                pass
+            with pytest.raises(LockTimeoutError), RepositoryLock(repo_path, timeout=0).shared():
+                pass
+        with RepositoryLock(repo_path, timeout=0).exclusive():
+            pass
+
+    @pytest.mark.skipif(os.name != "posix", reason="Windows locks are always exclusive")
+    def test_shared_locks_coexist(self, repo_path):
+        with RepositoryLock(repo_path).shared(), RepositoryLock(repo_path, timeout=0).shared():
+            with pytest.raises(LockTimeoutError), RepositoryLock(repo_path, timeout=0).exclusive():
+                pass
+
+    @pytest.mark.skipif(os.name != "posix", reason="Windows locks are always exclusive")
+    def test_upgrade_shared_lock(self, repo_path):
+        lock = RepositoryLock(repo_path)
+        with lock.shared():
+            with lock.exclusive():
+                with pytest.raises(LockTimeoutError), RepositoryLock(repo_path, timeout=0).shared():
+                    pass
+            # Shared again after the inner block
+            with RepositoryLock(repo_path, timeout=0).shared():
+                pass
+            with pytest.raises(LockTimeoutError), RepositoryLock(repo_path, timeout=0).exclusive():
+                pass
+        with RepositoryLock(repo_path, timeout=0).exclusive():
+            pass
+
+    def test_waits_and_reports(self, repo_path):
+        waits = []
+        lock = RepositoryLock(repo_path, timeout=0.3, on_wait=lambda: waits.append(time.monotonic()))
+        with RepositoryLock(repo_path).exclusive(), pytest.raises(LockTimeoutError):
+            with lock.exclusive():
+                pass
+        assert len(waits) == 1
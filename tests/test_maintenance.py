@@ -0,0 +1,95 @@
+import json
+import subprocess
+import time
+
+import pytest
+
+from gimer.git import Git, GitError, GitTimeoutError
+from gimer.locking import RepositoryLock
+from gimer.maintenance import (
+    MAINTENANCE_TASKS,
+    is_due,
+    maintain_repository,
+    run_maintenance,
+    schedule,
+)
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git(origin, "init", "-q", "-b", "main")
+    for i in range(3):
+        (origin / "file").write_text(str(i))
+        _git(origin, "add", "file")
+        _git(origin, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", str(i))
+    path = tmp_path / "repos" / "github.com" / "user" / "repo"
+    path.parent.mkdir(parents=True)
+    _git(tmp_path, "clone", "-q", str(origin), str(path))
+    return path
+
+
+class TestMaintenance:
+    def test_run_maintenance_writes_commit_graph(self, repo_path, mocker):
+        mocker.patch('gimer.git.console')
+        report = run_maintenance(Git(no_confirm=True, cwd=repo_path), time_budget=60)
+
+        assert report.completed == list(MAINTENANCE_TASKS)
+        assert not report.skipped
+        assert (repo_path / ".git" / "objects" / "info" / "commit-graphs").is_dir() or (
+            repo_path / ".git" / "objects" / "info" / "commit-graph"
+        ).exists()
+        assert set(report.before) == {"merge-base", "status"}
+        assert set(report.after) == {"merge-base", "status"}
+        assert not is_due(repo_path)
+
+    def test_run_maintenance_stops_at_the_budget(self, repo_path, mocker):
+        mocker.patch('gimer.git.console')
+        git = Git(no_confirm=True, cwd=repo_path)
+        mock_run = mocker.patch.object(git, 'run_with_timeout', side_effect=GitTimeoutError("timed out"))
+        report = run_maintenance(git, time_budget=1)
+
+        # Tasks that run out of time are reported as skipped, not failed
+        assert report.skipped == list(MAINTENANCE_TASKS)
+        assert mock_run.call_count >= 1
+
+    def test_run_maintenance_records_failures(self, repo_path, mocker):
+        git = Git(no_confirm=True, cwd=repo_path)
+        mocker.patch.object(git, 'run_with_timeout', side_effect=[None, GitError("failed"), None, None])
+        report = run_maintenance(git, time_budget=60)
+        assert report.failed == [MAINTENANCE_TASKS[1]]
+
+    def test_is_due(self, repo_path, tmp_path):
+        assert is_due(repo_path)
+        assert not is_due(tmp_path / "missing")
+        state = repo_path / ".git" / "gimer" / "maintenance.json"
+        state.parent.mkdir(parents=True, exist_ok=True)
+        state.write_text(json.dumps({"last_run": time.time() - 2 * 24 * 60 * 60}))
+        assert is_due(repo_path)
+        assert not is_due(repo_path, interval=3 * 24 * 60 * 60)
+
+    def test_maintain_repository_skips_repositories_in_use(self, repo_path, mocker):
+        mock_run_maintenance = mocker.patch('gimer.maintenance.run_maintenance')
+        with RepositoryLock(repo_path).exclusive():
+            assert maintain_repository(repo_path, 10) is None
+        mock_run_maintenance.assert_not_called()
+
+    def test_schedule_starts_one_background_process(self, repo_path, tmp_path, mocker):
+        mocker.patch('gimer.maintenance.get_repos_path', return_value=tmp_path / "repos")
+        mock_popen = mocker.patch('gimer.maintenance.subprocess.Popen')
+
+        assert schedule([repo_path, tmp_path / "missing"], 30)
+
+        command = mock_popen.call_args[0][0]
+        assert command[-4:] == ["maintain", "--time-budget", "30", str(repo_path)]
+        assert mock_popen.call_args.kwargs["start_new_session"] is True
+
+    def test_schedule_nothing_due(self, repo_path, mocker):
+        mock_popen = mocker.patch('gimer.maintenance.subprocess.Popen')
+        assert not schedule([repo_path], 0)
+        mock_popen.assert_not_called()
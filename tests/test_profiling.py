@@ -0,0 +1,67 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from gimer.profiling import Phase, Profiler, command_phase
+
+
+class TestProfiling:
+    @pytest.fixture
+    def profiler(self, mocker):
+        mock_time = mocker.patch('gimer.profiling.time.perf_counter')
+        mock_time.side_effect = [0.0, 1.0, 3.0, 3.0, 3.5, 4.0]
+        profiler = Profiler()
+        with profiler.span("git fetch origin", Phase.FETCH) as event:
+            event.exit_code = 0
+            event.output_bytes = 10
+        with profiler.span("confirm", Phase.PROMPT):
+            pass
+        return profiler
+
+    @pytest.mark.parametrize(("args", "phase"), [
+        (("clone", "url", "dir"), Phase.CLONE),
+        (("fetch", "origin"), Phase.FETCH),
+        (("fetch", ".", "refs/remotes/origin/a:refs/heads/a"), Phase.CHECKOUT),
+        (("-C", "/store", "fetch", "url"), Phase.FETCH),
+        (("merge", "--no-edit", "a"), Phase.MERGE),
+        (("push", "origin", "main"), Phase.PUSH),
+        (("config", "core.x"), Phase.OTHER),
+    ])
+    def test_command_phase(self, args, phase):
+        assert command_phase(args) == phase
+
+    def test_span(self, profiler):
+        fetch, confirm = profiler.events
+        assert (fetch.name, fetch.phase, fetch.start, fetch.duration) == ("git fetch origin", Phase.FETCH, 1.0, 2.0)
+        assert (fetch.exit_code, fetch.output_bytes) == (0, 10)
+        assert (confirm.start, confirm.duration) == (3.0, 0.5)
+
+    def test_span_records_failures(self):
+        profiler = Profiler()
+        with pytest.raises(RuntimeError), profiler.span("git push", Phase.PUSH):
+            raise RuntimeError
+        assert len(profiler.events) == 1
+
+    def test_phase_totals(self, profiler):
+        assert profiler.phase_totals() == {Phase.FETCH: 2.0, Phase.PROMPT: 0.5}
+
+    def test_print_summary(self, profiler):
+        console = Mock()
+        profiler.print_summary(console)
+        assert console.print.call_count == 2
+
+    def test_write_chrome_trace(self, profiler, tmp_path):
+        path = tmp_path / "trace.json"
+        profiler.write_trace(path)
+        events = json.loads(path.read_text())["traceEvents"]
+        assert events[0]["name"] == "git fetch origin"
+        assert events[0]["ph"] == "X"
+        assert (events[0]["ts"], events[0]["dur"]) == (1_000_000, 2_000_000)
+        assert events[0]["args"] == {"exit_code": 0, "output_bytes": 10}
+
+    def test_write_json_lines(self, profiler, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        profiler.write_trace(path)
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["phase"] for line in lines] == [Phase.FETCH, Phase.PROMPT]
@@ -0,0 +1,80 @@
+import subprocess
+
+import pytest
+
+from gimer.queries import RepositoryQueries
+
+
+def _git(path, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=gimer", "-c", "user.email=gimer@example.com", *args],
+        cwd=path,
+        check=True,
+        capture_output=True,
+    )
+
+
+class TestRepositoryQueries:
+    @pytest.fixture
+    def repo_path(self, tmp_path):
+        remote = tmp_path / "remote"
+        remote.mkdir()
+        _git(remote, "init", "-b", "main")
+        (remote / "file.txt").write_text("main\n")
+        _git(remote, "add", "file.txt")
+        _git(remote, "commit", "-m", "initial")
+        _git(remote, "branch", "feature/one")
+        _git(tmp_path, "clone", str(remote), "clone")
+        return tmp_path / "clone"
+
+    @pytest.fixture
+    def queries(self, repo_path):
+        queries = RepositoryQueries(repo_path)
+        yield queries
+        queries.close()
+
+    def test_remote_branches(self, queries):
+        assert sorted(queries.remote_branches()) == ["feature/one", "main"]
+
+    def test_remote_branches_unknown_remote(self, queries):
+        assert queries.remote_branches("upstream") == []
+
+    def test_remote_branch_tips_and_commit_dates(self, queries, repo_path):
+        head = subprocess.run(
+            ["git", "log", "-1", "--format=%H %ct"], cwd=repo_path, check=True, capture_output=True, text=True
+        ).stdout.split()
+        assert queries.remote_branch_tips() == {"main": head[0], "feature/one": head[0]}
+        assert queries.commit_dates([head[0]]) == {head[0]: int(head[1])}
+
+    def test_current_branch(self, queries, repo_path):
+        assert queries.current_branch() == "main"
+        _git(repo_path, "checkout", "--detach")
+        assert queries.current_branch() is None
+
+    def test_resolve(self, queries, repo_path):
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=repo_path, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        assert queries.resolve("origin/main") == head
+        assert queries.resolve("origin/missing") is None
+
+    def test_is_merge_in_progress(self, queries, repo_path):
+        assert queries.is_merge_in_progress() is False
+        (repo_path / ".git" / "MERGE_HEAD").write_text("0" * 40)
+        assert queries.is_merge_in_progress() is True
+
+    def test_config_values(self, queries, repo_path):
+        _git(repo_path, "config", "core.untrackedCache", "true")
+        _git(repo_path, "config", "feature.manyFiles", "True")
+        assert queries.config_values(["core.untrackedCache", "feature.manyFiles", "core.fsmonitor"]) == {
+            "core.untrackedCache": "true",
+            "feature.manyFiles": "true",
+            "core.fsmonitor": None,
+        }
+
+    def test_not_a_repository(self, tmp_path):
+        queries = RepositoryQueries(tmp_path)
+        assert queries.remote_branches() == []
+        assert queries.current_branch() is None
+        assert queries.resolve("HEAD") is None
+        assert queries.is_merge_in_progress() is False
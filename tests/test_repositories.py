@@ -2,7 +2,12 @@ from pathlib import Path
 
 import pytest
 
-from gimer.repositories import get_github_repo_path, get_repos_path
+from gimer.repositories import (
+    get_github_repo_path,
+    get_reference_store_path,
+    get_repo_namespace,
+    get_repos_path,
+)
 
 
 class TestRepositories:
@@ -61,3 +66,11 @@ class TestRepositories:
         expected = get_repos_path() / "github.com" / "user" / "repo"
         assert repo_path == expected
         self.mock_mkdir.assert_called_with(parents=True, exist_ok=True)
+
+    def test_get_reference_store_path(self):
+        store = get_reference_store_path()
+        assert store == Path.home() / "Library" / "Caches" / "gimer" / "objects.git"
+
+    def test_get_repo_namespace(self):
+        repo_path = get_repos_path() / "github.com" / "user" / "repo"
+        assert get_repo_namespace(repo_path) == "github.com/user/repo"
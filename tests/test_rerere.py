@@ -0,0 +1,182 @@
+import io
+import subprocess
+import tarfile
+
+import pytest
+from click.testing import CliRunner
+
+from gimer.cli import MergeOutcome, main, merge_one
+from gimer.git import Git, GitError
+from gimer.rerere import export_resolutions, import_resolutions, list_resolutions
+
+CONFLICT = "0123456789abcdef0123456789abcdef01234567"
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def _write_resolution(store, conflict=CONFLICT, postimage=b"resolved\n"):
+    (store / conflict).mkdir(parents=True)
+    (store / conflict / "preimage").write_bytes(b"<<<<<<<\nours\n=======\ntheirs\n>>>>>>>\n")
+    if postimage is not None:
+        (store / conflict / "postimage").write_bytes(postimage)
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    for key in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{key}_NAME", "t")
+        monkeypatch.setenv(f"GIT_{key}_EMAIL", "t@t")
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git(origin, "init", "-q", "-b", "main")
+    (origin / "file").write_text("a\nb\nc\n")
+    _git(origin, "add", "file")
+    _git(origin, "commit", "-q", "-m", "base")
+    _git(origin, "checkout", "-q", "-b", "feature")
+    (origin / "file").write_text("a\nfeature\nc\n")
+    _git(origin, "commit", "-q", "-am", "feature")
+    _git(origin, "checkout", "-q", "main")
+    (origin / "file").write_text("a\nmain\nc\n")
+    _git(origin, "commit", "-q", "-am", "main")
+    return origin
+
+
+class TestSharedResolutions:
+    def _merge(self, tmp_path, origin, store, name):
+        clone = tmp_path / name
+        _git(tmp_path, "clone", "-q", str(origin), str(clone))
+        git = Git(no_confirm=True, cwd=clone)
+        git.enable_rerere(store)
+        with pytest.raises(GitError, match="CONFLICT"):
+            git.merge_branch("origin/feature")
+        return git, clone
+
+    def test_resolution_is_replayed_in_another_clone(self, tmp_path, origin):
+        store = tmp_path / "rr-cache"
+        git, clone = self._merge(tmp_path, origin, store, "first")
+        assert (clone / ".git" / "rr-cache").resolve() == store.resolve()
+        assert git.get_recorded_resolutions() == ([], ["file"])
+        (clone / "file").write_text("a\nmain and feature\nc\n")
+        git.stage_paths(["file"])
+        git.commit_merge(edit=False)
+        assert len(list_resolutions(store)) == 1
+
+        git, clone = self._merge(tmp_path, origin, store, "second")
+        assert git.get_recorded_resolutions() == (["file"], [])
+        assert (clone / "file").read_text() == "a\nmain and feature\nc\n"
+
+    def test_many_conflicts_are_reported_as_conflicts(self, tmp_path, origin):
+        # Enough "Recorded preimage" lines to push every CONFLICT line out of the error
+        _git(origin, "checkout", "-q", "feature")
+        for i in range(25):
+            (origin / f"file{i}").write_text("a\nfeature\nc\n")
+        _git(origin, "add", ".")
+        _git(origin, "commit", "-q", "-m", "feature files")
+        _git(origin, "checkout", "-q", "main")
+        for i in range(25):
+            (origin / f"file{i}").write_text("a\nmain\nc\n")
+        _git(origin, "add", ".")
+        _git(origin, "commit", "-q", "-m", "main files")
+        clone = tmp_path / "clone"
+        _git(tmp_path, "clone", "-q", str(origin), str(clone))
+        git = Git(no_confirm=True, cwd=clone)
+        git.enable_rerere(tmp_path / "rr-cache")
+
+        assert merge_one(git, "origin/feature", {}) == MergeOutcome.CONFLICT
+        assert not git.is_merge_in_progress()
+
+    def test_existing_resolutions_move_to_the_store(self, tmp_path, origin):
+        clone = tmp_path / "clone"
+        _git(tmp_path, "clone", "-q", str(origin), str(clone))
+        _write_resolution(clone / ".git" / "rr-cache")
+        store = tmp_path / "rr-cache"
+        git = Git(no_confirm=True, cwd=clone)
+
+        git.enable_rerere(store)
+        git.enable_rerere(store)
+
+        assert (clone / ".git" / "rr-cache").is_symlink()
+        assert (store / CONFLICT / "postimage").read_bytes() == b"resolved\n"
+
+    def test_resolutions_stay_without_links(self, tmp_path, origin, mocker):
+        clone = tmp_path / "clone"
+        _git(tmp_path, "clone", "-q", str(origin), str(clone))
+        _write_resolution(clone / ".git" / "rr-cache")
+        mocker.patch('gimer.git.Path.symlink_to', side_effect=OSError("symbolic links are not allowed"))
+
+        Git(no_confirm=True, cwd=clone).enable_rerere(tmp_path / "rr-cache")
+
+        assert not (clone / ".git" / "rr-cache").is_symlink()
+        assert (clone / ".git" / "rr-cache" / CONFLICT / "postimage").read_bytes() == b"resolved\n"
+
+
+class TestArchives:
+    def test_export_and_import(self, tmp_path):
+        store = tmp_path / "store"
+        _write_resolution(store)
+        # Conflicts nobody resolved yet are not exported
+        _write_resolution(store, "f" * 40, postimage=None)
+        archive = tmp_path / "resolutions.tar.gz"
+        assert export_resolutions(store, archive) == 1
+
+        other = tmp_path / "other"
+        assert import_resolutions(other, archive) == 1
+        assert (other / CONFLICT / "postimage").read_bytes() == b"resolved\n"
+        # Importing again adds nothing
+        assert import_resolutions(other, archive) == 0
+
+    def test_import_keeps_existing_resolutions(self, tmp_path):
+        source, store = tmp_path / "source", tmp_path / "store"
+        _write_resolution(source, postimage=b"theirs\n")
+        _write_resolution(store, postimage=b"ours\n")
+        archive = tmp_path / "resolutions.tar.gz"
+        export_resolutions(source, archive)
+
+        assert import_resolutions(store, archive) == 0
+        assert (store / CONFLICT / "postimage").read_bytes() == b"ours\n"
+
+    def test_import_skips_other_files(self, tmp_path):
+        archive = tmp_path / "evil.tar.gz"
+        with tarfile.open(archive, "w:gz") as tar:
+            for name in ("../escape", f"{CONFLICT}/../../escape", f"{CONFLICT}/hooks", "/etc/passwd"):
+                data = b"x"
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        store = tmp_path / "store" / "rr-cache"
+
+        assert import_resolutions(store, archive) == 0
+        assert not store.exists()
+        assert not (tmp_path / "escape").exists()
+
+
+class TestRerereCommand:
+    @pytest.fixture
+    def store(self, tmp_path, mocker):
+        store = tmp_path / "rr-cache"
+        mocker.patch('gimer.cli.get_rerere_path', return_value=store)
+        return store
+
+    def test_export_and_import(self, store, tmp_path):
+        _write_resolution(store)
+        archive = tmp_path / "resolutions.tar.gz"
+        result = CliRunner().invoke(main, ['rerere', 'export', str(archive)])
+        assert result.exit_code == 0, result.output
+        assert "Exported 1 resolutions" in result.output
+
+        (store / CONFLICT / "postimage").unlink()
+        result = CliRunner().invoke(main, ['rerere', 'import', str(archive)])
+        assert result.exit_code == 0, result.output
+        assert "Imported 1 new resolutions." in result.output
+
+        result = CliRunner().invoke(main, ['rerere'])
+        assert "1 recorded resolutions" in result.output
+
+    def test_import_invalid_archive(self, store, tmp_path):
+        archive = tmp_path / "resolutions.tar.gz"
+        archive.write_text("not an archive")
+        result = CliRunner().invoke(main, ['rerere', 'import', str(archive)])
+        assert result.exit_code == 1
+        assert "is not a resolution archive" in result.output
@@ -0,0 +1,52 @@
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HEAVY_MODULES = ("github", "git", "InquirerPy", "prompt_toolkit", "rich")
+STARTUP_BUDGET_MS = float(os.environ.get("GIMER_STARTUP_BUDGET_MS", "100"))
+RUNS = 7
+ROOT = Path(__file__).parent.parent
+
+
+def _median_runtime(*args: str) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class TestStartup:
+    def test_import_does_not_load_heavy_dependencies(self):
+        code = (
+            "import sys, gimer.cli; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+        assert result.stdout.strip() == ""
+
+    def test_help_startup_time(self):
+        interpreter = _median_runtime("-c", "pass")
+        gimer = _median_runtime("-m", "gimer.cli", "--help")
+        overhead_ms = (gimer - interpreter) * 1000
+        assert overhead_ms < STARTUP_BUDGET_MS, f"gimer --help took {overhead_ms:.0f}ms on top of interpreter startup"
+
+    def test_lazy_imports_are_bundled(self):
+        # PyInstaller only follows import statements, so lazy imports must be listed in the spec
+        spec = ast.parse((ROOT / "gimer.spec").read_text())
+        hidden_imports = next(k.value for k in ast.walk(spec) if isinstance(k, ast.keyword) and k.arg == "hiddenimports")
+        bundled = {e.value for e in hidden_imports.elts if isinstance(e, ast.Constant)}
+        collected = {e.value.args[0].value for e in hidden_imports.elts if isinstance(e, ast.Starred)}
+        assert collected == {"gimer"}
+        for path in (ROOT / "gimer").glob("*.py"):
+            for node in ast.walk(ast.parse(path.read_text())):
+                if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "lazy_import":
+                    module = node.args[0].value
+                    assert module.startswith("gimer.") or module in bundled or module in sys.stdlib_module_names, (
+                        f"{path.name} imports {module} lazily but gimer.spec does not bundle it"
+                    )